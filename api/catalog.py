@@ -0,0 +1,219 @@
+"""
+Windwalker treaty catalog (Python fallback)
+
+Every treaty and tribe held in memory as compact records, indexed by id,
+signing year and tribe, so the treaty and tribe listings and detail pages
+are served without a database round trip. The corpus is a few thousand
+rows that only change when a scraper or the linker runs; the server
+builds a new catalog when Postgres notifies it of a change
+(sourcing/migrations/006_catalog_notify.sql), reading again only the
+treaties or the tribes if the other half's tables are unchanged.
+
+Orderings match the SQL listings, so a page cursor from one can be
+continued by the other. Treaties are ordered by (signed_date, id) with
+undated ones last. ISO dates and lowercase UUID strings sort the same
+way in Python as the date and uuid types do in Postgres. Tribes are
+ordered by (name, id) under the database's collation, which Python can't
+reproduce, so they are kept in the order they were loaded in
+(ORDER BY name, id) and positioned by rank rather than by comparing
+names.
+"""
+
+from bisect import bisect_left, bisect_right
+
+class TreatyRecord:
+    """One raw_treaties row: the list-view fields and what the detail page needs
+
+    `tribes` is a tuple of (id, name) parties; `source` is a (name,
+    reliability) pair shared by every treaty from the same data source.
+    """
+
+    __slots__ = ('id', 'name', 'signed_date', 'signed_date_text', 'ratified_date', 'year',
+                 'tribes', 'us_commissioners', 'signatories', 'preamble', 'articles',
+                 'statutes_at_large', 'kappler_volume', 'kappler_page', 'validated',
+                 'source_url', 'source')
+
+    def __init__(self, row, tribes, source):
+        self.id = row['id']
+        self.name = row['name']
+        self.signed_date = row['signed_date']
+        self.signed_date_text = row['date_signed_text']
+        self.ratified_date = row['ratified_date']
+        self.year = int(self.signed_date[:4]) if self.signed_date else None
+        self.tribes = tuple((t['id'], t['name']) for t in tribes)
+        self.us_commissioners = row['us_commissioners'] or []
+        self.signatories = row['signatories'] or []
+        self.preamble = row['preamble']
+        self.articles = row['articles'] or []
+        self.statutes_at_large = row['statutes_at_large_citation']
+        self.kappler_volume = row['kappler_volume']
+        self.kappler_page = row['kappler_page']
+        self.validated = row['is_validated']
+        self.source_url = row['source_url']
+        self.source = source
+
+    @property
+    def kappler_ref(self):
+        if not self.kappler_volume:
+            return None
+        return f"Kappler Vol. {self.kappler_volume}, p. {self.kappler_page}"
+
+    def summary(self):
+        """List-view representation, as treaty_summary() builds from a row"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'signed_date': self.signed_date,
+            'tribes': [{'id': tribe_id, 'name': name} for tribe_id, name in self.tribes],
+            'status': 'Active' if self.validated else 'Unknown',
+            'certainty': 'Verified' if self.validated else 'Reported',
+            'kappler_ref': self.kappler_ref,
+        }
+
+    def detail(self):
+        """Representation served by /api/v1/treaties/:id"""
+        source_name, source_reliability = self.source
+        return {
+            'id': self.id,
+            'name': self.name,
+            'alternate_names': [],
+            'signed_date': self.signed_date,
+            'signed_date_text': self.signed_date_text,
+            'ratified_date': self.ratified_date,
+            'proclaimed_date': None,
+            'tribes': [{'id': tribe_id, 'name': name} for tribe_id, name in self.tribes],
+            'us_commissioners': self.us_commissioners,
+            'tribal_signatories': self.signatories,
+            'status': 'Active' if self.validated else 'Unknown',
+            'violations': [],
+            'affecting_laws': [],
+            'preamble': self.preamble,
+            'articles': self.articles,
+            'ceded_territory_acres': None,
+            'reserved_territory_acres': None,
+            'boundary_certainty': 'Verified' if self.validated else 'Reported',
+            'sources': [{
+                'name': source_name,
+                'source_type': 'Government',
+                'url': self.source_url,
+                'reliability': source_reliability,
+                'accessed_date': None
+            }],
+            'kappler_citation': self.kappler_ref,
+            'statutes_at_large': self.statutes_at_large
+        }
+
+class TribeRecord:
+    """One raw_tribes row: the list-view fields, plus every column's value
+    (names in Catalog.tribe_columns) for the detail page"""
+
+    __slots__ = ('id', 'name', 'alternate_names', 'region', 'state',
+                 'federally_recognized', 'certainty', 'treaty_count', 'values')
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.name = row['name']
+        self.alternate_names = row['alternate_names'] or []
+        self.region = row['region']
+        self.state = row['state']
+        self.federally_recognized = row['federally_recognized']
+        self.certainty = row['name_evidentiality']
+        self.treaty_count = row['treaty_count']
+        self.values = tuple(row.values())
+
+    def summary(self):
+        """List-view representation served by /api/v1/tribes"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'alternate_names': self.alternate_names,
+            'region': self.region,
+            'state': self.state,
+            'federally_recognized': self.federally_recognized,
+            'treaty_count': self.treaty_count,
+            'certainty': self.certainty
+        }
+
+def _treaty_key(treaty):
+    # Undated treaties sort after every dated one, then by id
+    return (treaty.signed_date is None, treaty.signed_date or '', treaty.id)
+
+class Catalog:
+    """Immutable snapshot of the treaties and tribes with their indexes
+
+    A reload builds a new Catalog and swaps it in whole, so a request that
+    holds one sees a consistent view for as long as it needs it.
+    """
+
+    def __init__(self, treaties, tribes, tribe_columns, generation=0):
+        """`tribes` must be in the database's (name, id) order"""
+        self.generation = generation
+        self.tribe_columns = tuple(tribe_columns)
+
+        treaties = sorted(treaties, key=_treaty_key)
+        self.treaties = {t.id: t for t in treaties}
+        cut = bisect_left([t.signed_date is None for t in treaties], True)
+        self.dated = treaties[:cut]
+        self.dated_keys = [(t.signed_date, t.id) for t in self.dated]
+        self.dated_years = [t.year for t in self.dated]
+        self.undated = treaties[cut:]
+        self.undated_ids = [t.id for t in self.undated]
+
+        self.tribe_order = list(tribes)
+        self.tribes = {t.id: t for t in self.tribe_order}
+        self.tribe_ranks = {t.id: rank for rank, t in enumerate(self.tribe_order)}
+
+        # Treaties per linked tribe, in listing order
+        self.tribe_treaties = {}
+        for treaty in treaties:
+            for tribe_id in dict.fromkeys(tribe_id for tribe_id, _ in treaty.tribes):
+                if tribe_id in self.tribes:
+                    self.tribe_treaties.setdefault(tribe_id, []).append(treaty)
+
+    def __len__(self):
+        return len(self.treaties)
+
+    def treaty_page(self, year=None, year_end=None, after=None, limit=100):
+        """(treaties, total): up to `limit` treaties signed in year..year_end
+        (inclusive; None leaves that end open) following `after`
+
+        `after` is the (signed_date, id) of the last treaty already sent,
+        signed_date None for an undated one. Undated treaties are only
+        listed when neither year bound is given.
+        """
+        lo = 0 if year is None else bisect_left(self.dated_years, year)
+        hi = len(self.dated) if year_end is None else bisect_right(self.dated_years, year_end)
+        undated = year is None and year_end is None
+        total = max(0, hi - lo) + (len(self.undated) if undated else 0)
+
+        if after is None:
+            start, undated_start = lo, 0
+        elif after[0] is not None:
+            start, undated_start = max(lo, bisect_right(self.dated_keys, after)), 0
+        else:
+            start, undated_start = hi, bisect_right(self.undated_ids, after[1])
+        page = self.dated[start:max(start, min(hi, start + limit))]
+        if undated and len(page) < limit:
+            page = page + self.undated[undated_start:undated_start + limit - len(page)]
+        return page, total
+
+    def tribe_page(self, after=None, limit=100):
+        """(tribes, total): up to `limit` tribes following the (name, id) `after`
+
+        None if `after` is no longer a tribe of that name in the catalog.
+        Where it would fall then depends on the collation, and only the
+        database can tell.
+        """
+        if after is None:
+            start = 0
+        else:
+            name, tribe_id = after
+            tribe = self.tribes.get(tribe_id)
+            if tribe is None or tribe.name != name:
+                return None
+            start = self.tribe_ranks[tribe_id] + 1
+        return self.tribe_order[start:start + limit], len(self.tribe_order)
+
+    def tribe_detail(self, tribe):
+        """Every raw_tribes column of `tribe`, as SELECT * returns them"""
+        return dict(zip(self.tribe_columns, tribe.values))
@@ -0,0 +1,326 @@
+"""
+Windwalker metrics (Python fallback)
+
+In-process counters, histograms and gauges, rendered in the Prometheus
+text exposition format for /metrics. Also keeps per-request-thread
+database timings, for the request DB-time histogram and the slow-request
+log.
+
+Pre-forked workers share one port, so a scrape reaches whichever worker
+accepts it. With share() each worker also writes its metrics to a
+directory common to all of them, and renders the sum over every worker:
+counters and histograms added up, gauges reported per worker.
+"""
+
+import json
+import os
+import threading
+from bisect import bisect_left
+
+# Upper bounds (seconds) for latency histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds (bytes) for size histograms
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _sample_lines(name, labelnames, values):
+    for labelvalues, value in values:
+        yield f"{name}{_labels(labelnames, labelvalues)} {_number(value)}"
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count per combination of label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def state(self):
+        """{labelvalues: count}"""
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(state, other):
+        """Add another process's state() into `state`"""
+        for labelvalues, value in other.items():
+            state[labelvalues] = state.get(labelvalues, 0) + value
+
+    def samples(self, state=None):
+        state = self.state() if state is None else state
+        return _sample_lines(self.name, self.labelnames, sorted(state.items()))
+
+class Histogram:
+    """Cumulative-bucket histogram per combination of label values"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), sum
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def state(self):
+        """{labelvalues: (per-bucket counts, sum)}"""
+        with self._lock:
+            return {k: (list(v[0]), v[1]) for k, v in self._series.items()}
+
+    @staticmethod
+    def merge(state, other):
+        """Add another process's state() into `state`"""
+        for labelvalues, (counts, total) in other.items():
+            mine = state.get(labelvalues)
+            if mine is None:
+                state[labelvalues] = (list(counts), total)
+            elif len(mine[0]) == len(counts):
+                # (Bucket bounds differ only across a restart onto new code)
+                state[labelvalues] = ([a + b for a, b in zip(mine[0], counts)], mine[1] + total)
+
+    def samples(self, state=None):
+        state = self.state() if state is None else state
+        bounds = self.buckets + (float('inf'),)
+        for labelvalues, (counts, total) in sorted(state.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _labels(self.labelnames, labelvalues, (('le', _number(bound)),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_number(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+class Gauge:
+    """Values read at scrape time from `collect`, which returns
+    [(labelvalues, value)] (or a bare number when there are no labels)"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=(), collect=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def state(self):
+        """{labelvalues: value} as collected now"""
+        try:
+            values = self.collect()
+        except Exception:
+            return {}
+        if values is None:
+            return {}
+        if not isinstance(values, (list, tuple)):
+            values = [((), values)]
+        return {tuple(labelvalues): value for labelvalues, value in values}
+
+    def samples(self, state=None):
+        state = self.state() if state is None else state
+        return _sample_lines(self.name, self.labelnames, state.items())
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+        # SharedDirectory while this process's metrics are shared
+        self.shared = None
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def states(self):
+        """{metric name: state()} for every metric"""
+        with self._lock:
+            metrics = list(self._metrics)
+        return {metric.name: metric.state() for metric in metrics}
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (0.0.4)
+
+        When shared, the sum over every process writing to the directory;
+        gauges get a `worker` label with the process id.
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        shared = self.shared
+        others = shared.read_others() if shared is not None else []
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            state = metric.state()
+            if shared is None:
+                lines.extend(metric.samples(state))
+            elif metric.kind == 'gauge':
+                values = [(labelvalues + (os.getpid(),), value) for labelvalues, value in state.items()]
+                for pid, alive, states in others:
+                    if alive:
+                        values.extend((labelvalues + (pid,), value)
+                                      for labelvalues, value in states.get(metric.name, {}).items())
+                lines.extend(_sample_lines(metric.name, metric.labelnames + ('worker',), values))
+            else:
+                for _, _, states in others:
+                    metric.merge(state, states.get(metric.name, {}))
+                lines.extend(metric.samples(state))
+        return '\n'.join(lines) + '\n'
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class SharedDirectory:
+    """This process's side of metrics shared between processes in `path`
+
+    Every `interval` seconds, and once more on close(), the registry's
+    states are written to <path>/<pid>.json. read_others() returns what
+    the other processes last wrote, so a scrape lags them by at most
+    `interval`. Files of processes that have exited are kept, so their
+    counts stay in the totals; their gauges are left out.
+    """
+
+    def __init__(self, registry, path, interval=1.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.filename = os.path.join(path, f"{os.getpid()}.json")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        states = {name: [[list(labelvalues), value] for labelvalues, value in state.items()]
+                  for name, state in self.registry.states().items()}
+        temp = f"{self.filename}.tmp"
+        with open(temp, 'w') as f:
+            json.dump(states, f)
+        os.replace(temp, self.filename)
+
+    def read_others(self):
+        """[(pid, alive, {metric name: state})] of every other process"""
+        others = []
+        for entry in sorted(os.listdir(self.path)):
+            stem, ext = os.path.splitext(entry)
+            if ext != '.json' or not stem.isdigit() or int(stem) == os.getpid():
+                continue
+            try:
+                with open(os.path.join(self.path, entry)) as f:
+                    states = json.load(f)
+            except (OSError, ValueError):
+                continue
+            states = {name: {tuple(labelvalues): tuple(value) if isinstance(value, list) else value
+                             for labelvalues, value in items}
+                      for name, items in states.items()}
+            others.append((int(stem), _pid_alive(int(stem)), states))
+        return others
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"Could not share metrics: {e}")
+
+    def start(self):
+        self.write()
+        self._thread = threading.Thread(target=self._run, name='metrics-share', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the writer, leaving a final copy of this process's counts"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def counter(name, help_text, labelnames=()):
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+def histogram(name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+def gauge(name, help_text, labelnames=(), collect=None):
+    return REGISTRY.register(Gauge(name, help_text, labelnames, collect))
+
+def render():
+    return REGISTRY.render()
+
+def share(path, interval=1.0):
+    """Render the metrics of every process sharing `path` (see SharedDirectory)"""
+    REGISTRY.shared = SharedDirectory(REGISTRY, path, interval)
+    REGISTRY.shared.start()
+
+def stop_sharing():
+    if REGISTRY.shared is not None:
+        REGISTRY.shared.close()
+        REGISTRY.shared = None
+
+# ============================================================================
+# Per-request database timing
+# ============================================================================
+
+_request = threading.local()
+
+def begin_request(keep_statements=False):
+    """Start timing the current thread's request; with `keep_statements`
+    the text of every statement it runs is kept for the slow-request log"""
+    _request.db_seconds = 0.0
+    _request.statements = [] if keep_statements else None
+
+def record_statement(statement, seconds):
+    """Attribute a statement to the current thread's request, if any"""
+    if getattr(_request, 'db_seconds', None) is None:
+        return
+    _request.db_seconds += seconds
+    if _request.statements is not None:
+        _request.statements.append((statement, seconds))
+
+def end_request():
+    """(DB seconds, [(statement, seconds)] or None) for the finished request"""
+    db_seconds = getattr(_request, 'db_seconds', None) or 0.0
+    statements = getattr(_request, 'statements', None)
+    _request.db_seconds = None
+    _request.statements = None
+    return db_seconds, statements
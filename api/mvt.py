@@ -0,0 +1,320 @@
+"""
+Windwalker vector tiles (Python fallback)
+
+A small Mapbox Vector Tile (MVT 2.1) encoder, plus the Web Mercator
+projection and clipping needed to cut GeoJSON features into z/x/y tiles.
+Mirrors the constants and tile math in api/src/routes/tiles.sigil.
+
+Spec: https://github.com/mapbox/vector-tile-spec
+"""
+
+import math
+import struct
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+MAX_ZOOM = 14
+MIN_ZOOM = 0
+
+# Web Mercator is undefined at the poles
+MAX_LATITUDE = 85.0511287798066
+
+GEOM_POINT = 1
+GEOM_LINESTRING = 2
+GEOM_POLYGON = 3
+
+_CMD_MOVE_TO = 1
+_CMD_LINE_TO = 2
+_CMD_CLOSE_PATH = 7
+
+# ============================================================================
+# Tile math
+# ============================================================================
+
+def tile_to_bbox(z, x, y):
+    """Geographic bounding box (min_lng, min_lat, max_lng, max_lat) of a tile"""
+    n = float(1 << z)
+    lon_min = x / n * 360.0 - 180.0
+    lon_max = (x + 1) / n * 360.0 - 180.0
+    lat_max = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / n))))
+    lat_min = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * (y + 1) / n))))
+    return (lon_min, lat_min, lon_max, lat_max)
+
+def buffered_tile_bbox(z, x, y, buffer=TILE_BUFFER, extent=TILE_EXTENT):
+    """Tile bounding box grown by `buffer` tile pixels on every side"""
+    pad = buffer / float(extent)
+    n = float(1 << z)
+    lon_min = (x - pad) / n * 360.0 - 180.0
+    lon_max = (x + 1 + pad) / n * 360.0 - 180.0
+    lat_max = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * (y - pad) / n))))
+    lat_min = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * (y + 1 + pad) / n))))
+    return (lon_min, max(lat_min, -MAX_LATITUDE), lon_max, min(lat_max, MAX_LATITUDE))
+
+def tiles_covering(bbox, z):
+    """Range (x0, y0, x1, y1) of tiles at zoom z covering a lng/lat bbox"""
+    n = 1 << z
+    wx0, wy1 = project(bbox[0], bbox[1])
+    wx1, wy0 = project(bbox[2], bbox[3])
+    clamp = lambda v: min(n - 1, max(0, int(v * n)))
+    return clamp(wx0), clamp(wy0), clamp(wx1), clamp(wy1)
+
+def simplify_for_zoom(z):
+    """Simplification tolerance in degrees for a zoom level (higher zoom, less)"""
+    if z <= 2:
+        return 0.1
+    if z <= 5:
+        return 0.01
+    if z <= 8:
+        return 0.001
+    if z <= 11:
+        return 0.0001
+    return 0.00001
+
+def project(lng, lat):
+    """Longitude/latitude to Web Mercator world coordinates in [0, 1]"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    s = math.sin(math.radians(lat))
+    x = (lng + 180.0) / 360.0
+    y = 0.5 - math.log((1.0 + s) / (1.0 - s)) / (4.0 * math.pi)
+    return x, y
+
+def project_polygons(polygons):
+    """Project GeoJSON polygon coordinates (list of rings) to world coordinates"""
+    return [[[project(p[0], p[1]) for p in ring] for ring in rings] for rings in polygons]
+
+# ============================================================================
+# Clipping and quantization
+# ============================================================================
+
+def _clip_edge(points, inside, intersect):
+    out = []
+    if not points:
+        return out
+    prev = points[-1]
+    prev_in = inside(prev)
+    for point in points:
+        cur_in = inside(point)
+        if cur_in:
+            if not prev_in:
+                out.append(intersect(prev, point))
+            out.append(point)
+        elif prev_in:
+            out.append(intersect(prev, point))
+        prev, prev_in = point, cur_in
+    return out
+
+def clip_ring(ring, lo, hi):
+    """Sutherland-Hodgman clip of a polygon ring to the square [lo, hi]^2"""
+    def at_x(x):
+        return lambda a, b: (x, a[1] + (b[1] - a[1]) * (x - a[0]) / (b[0] - a[0]))
+
+    def at_y(y):
+        return lambda a, b: (a[0] + (b[0] - a[0]) * (y - a[1]) / (b[1] - a[1]), y)
+
+    points = _clip_edge(ring, lambda p: p[0] >= lo, at_x(lo))
+    points = _clip_edge(points, lambda p: p[0] <= hi, at_x(hi))
+    points = _clip_edge(points, lambda p: p[1] >= lo, at_y(lo))
+    points = _clip_edge(points, lambda p: p[1] <= hi, at_y(hi))
+    return points
+
+def _drop_collinear(ring):
+    # Removes points on a straight run or at the tip of a zero-width spike,
+    # both of which grid snapping and clipping along tile edges produce
+    changed = True
+    while changed and len(ring) >= 3:
+        changed = False
+        out = []
+        n = len(ring)
+        for i in range(n):
+            ax, ay = out[-1] if out else ring[i - 1]
+            bx, by = ring[i]
+            cx, cy = ring[(i + 1) % n]
+            if (bx - ax) * (cy - ay) - (by - ay) * (cx - ax) == 0:
+                changed = True
+                continue
+            out.append(ring[i])
+        ring = out
+    return ring
+
+def ring_area(ring):
+    """Signed shoelace area in tile coordinates (y down: positive is clockwise)"""
+    area = 0
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        area += ring[j][0] * ring[i][1] - ring[i][0] * ring[j][1]
+        j = i
+    return area / 2.0
+
+def tile_polygons(world_polygons, z, x, y, extent=TILE_EXTENT, buffer=TILE_BUFFER):
+    """Cut projected polygons to one tile as integer rings in tile coordinates
+
+    Rings are clipped to the buffered tile, snapped to the tile grid and
+    stripped of repeated points. Polygons whose exterior ring disappears
+    are dropped along with their holes.
+    """
+    scale = float(1 << z) * extent
+    ox = x * extent
+    oy = y * extent
+    lo = -buffer
+    hi = extent + buffer
+
+    result = []
+    for rings in world_polygons:
+        out_rings = []
+        for k, ring in enumerate(rings):
+            pts = [(wx * scale - ox, wy * scale - oy) for wx, wy in ring]
+            xs = [p[0] for p in pts]
+            ys = [p[1] for p in pts]
+            if max(xs) < lo or min(xs) > hi or max(ys) < lo or min(ys) > hi:
+                if k == 0:
+                    break
+                continue
+            if min(xs) < lo or max(xs) > hi or min(ys) < lo or max(ys) > hi:
+                pts = clip_ring(pts, lo, hi)
+
+            snapped = []
+            for px, py in pts:
+                point = (int(round(px)), int(round(py)))
+                if not snapped or snapped[-1] != point:
+                    snapped.append(point)
+            while len(snapped) > 1 and snapped[0] == snapped[-1]:
+                snapped.pop()
+            snapped = _drop_collinear(snapped)
+
+            if len(snapped) < 3 or ring_area(snapped) == 0:
+                if k == 0:
+                    break
+                continue
+            out_rings.append(snapped)
+        if out_rings:
+            result.append(out_rings)
+    return result
+
+def tile_point(lng, lat, z, x, y, extent=TILE_EXTENT):
+    """Integer tile coordinates of a longitude/latitude inside tile z/x/y"""
+    wx, wy = project(lng, lat)
+    scale = float(1 << z) * extent
+    return int(round(wx * scale - x * extent)), int(round(wy * scale - y * extent))
+
+# ============================================================================
+# Geometry commands
+# ============================================================================
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+def _command(cmd, count):
+    return (cmd & 0x7) | (count << 3)
+
+def encode_polygon_geometry(polygons):
+    """Command stream for integer polygons (exterior ring first, then holes)"""
+    geometry = []
+    cx = cy = 0
+    for rings in polygons:
+        for k, ring in enumerate(rings):
+            # Exterior rings must have positive area and holes negative
+            area = ring_area(ring)
+            if (k == 0) == (area < 0):
+                ring = ring[::-1]
+            x, y = ring[0]
+            geometry += [_command(_CMD_MOVE_TO, 1), _zigzag(x - cx), _zigzag(y - cy)]
+            cx, cy = x, y
+            geometry.append(_command(_CMD_LINE_TO, len(ring) - 1))
+            for x, y in ring[1:]:
+                geometry += [_zigzag(x - cx), _zigzag(y - cy)]
+                cx, cy = x, y
+            geometry.append(_command(_CMD_CLOSE_PATH, 1))
+    return geometry
+
+def encode_point_geometry(points):
+    """Command stream for one or more integer points"""
+    geometry = [_command(_CMD_MOVE_TO, len(points))]
+    cx = cy = 0
+    for x, y in points:
+        geometry += [_zigzag(x - cx), _zigzag(y - cy)]
+        cx, cy = x, y
+    return geometry
+
+# ============================================================================
+# Protobuf encoding
+# ============================================================================
+
+def _varint(n):
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+def _field(number, wire_type):
+    return _varint((number << 3) | wire_type)
+
+def _length_delimited(number, payload):
+    return _field(number, 2) + _varint(len(payload)) + payload
+
+def _packed(number, values):
+    return _length_delimited(number, b''.join(_varint(v) for v in values))
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return _field(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _field(5, 0) + _varint(value)
+        return _field(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack('<d', value)
+    return _length_delimited(1, str(value).encode('utf-8'))
+
+class Layer:
+    """One named MVT layer; property keys and values are de-duplicated"""
+
+    def __init__(self, name, extent=TILE_EXTENT):
+        self.name = name
+        self.extent = extent
+        self.features = []
+        self._keys = {}
+        self._values = {}
+
+    def __len__(self):
+        return len(self.features)
+
+    def _tags(self, properties):
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(self._keys.setdefault(key, len(self._keys)))
+            value_key = (type(value).__name__, value)
+            tags.append(self._values.setdefault(value_key, len(self._values)))
+        return tags
+
+    def add_feature(self, geom_type, geometry, properties, feature_id=None):
+        if not geometry:
+            return
+        payload = b''
+        if isinstance(feature_id, int) and feature_id >= 0:
+            payload += _field(1, 0) + _varint(feature_id)
+        tags = self._tags(properties)
+        if tags:
+            payload += _packed(2, tags)
+        payload += _field(3, 0) + _varint(geom_type)
+        payload += _packed(4, geometry)
+        self.features.append(payload)
+
+    def encode(self):
+        payload = _field(15, 0) + _varint(2)
+        payload += _length_delimited(1, self.name.encode('utf-8'))
+        for feature in self.features:
+            payload += _length_delimited(2, feature)
+        for key in self._keys:
+            payload += _length_delimited(3, key.encode('utf-8'))
+        for _, value in self._values:
+            payload += _length_delimited(4, _encode_value(value))
+        payload += _field(5, 0) + _varint(self.extent)
+        return payload
+
+def encode_tile(layers):
+    """Serialize layers into an (uncompressed) MVT tile"""
+    return b''.join(_length_delimited(3, layer.encode()) for layer in layers)
@@ -0,0 +1,236 @@
+"""
+Windwalker pre-fork supervisor (Python fallback)
+
+Runs N copies of the API server as child processes on one listening
+socket, which the supervisor binds and the children inherit, so request
+handling is spread over every core instead of sharing one GIL. Each child
+writes to a pipe from its accept loop as a heartbeat. Children that exit
+are replaced, and children whose heartbeats stop are killed and replaced.
+
+SIGHUP restarts the children gracefully: replacements start first, and the
+old children are only told to finish their in-flight requests and exit
+once every replacement is accepting. SIGTERM or SIGINT stops them all.
+"""
+
+import os
+import select
+import signal
+import subprocess
+import time
+
+# A child that exits sooner than this after starting is replaced only after
+# a delay, doubling up to RESPAWN_MAX_DELAY, so a crashing build doesn't spin
+RESPAWN_MIN_UPTIME = 5.0
+RESPAWN_MAX_DELAY = 30.0
+
+class Heartbeat:
+    """Child side of the heartbeat pipe; beat() is rate-limited to `interval`"""
+
+    def __init__(self, fd, interval):
+        self.fd = fd
+        self.interval = interval
+        self.last = 0.0
+        # Never block the accept loop on a supervisor that stopped reading
+        os.set_blocking(fd, False)
+
+    def beat(self):
+        """Returns False once the supervisor has gone away"""
+        now = time.monotonic()
+        if now - self.last < self.interval:
+            return True
+        self.last = now
+        try:
+            os.write(self.fd, b'.')
+        except BrokenPipeError:
+            return False
+        except BlockingIOError:
+            pass
+        return True
+
+class Worker:
+    """A child process and the read end of its heartbeat pipe
+
+    `state` is 'starting' until the first heartbeat, then 'running';
+    'retiring' while its replacement starts during a restart, and
+    'stopping' once it has been told to exit (or killed).
+    """
+
+    def __init__(self, process, fd):
+        self.process = process
+        self.fd = fd
+        self.state = 'starting'
+        self.started = time.monotonic()
+        self.last_beat = self.started
+        self.stopping_at = None
+        self.eof = False
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+class Supervisor:
+    """Keeps `count` children of `argv` serving on `sock`
+
+    Children are started as `argv + ['--listen-fd', N, '--heartbeat-fd', M]`.
+    `tick`, if given, is called about once a second from the supervision
+    loop for work that should happen once per server rather than once per
+    child.
+    """
+
+    def __init__(self, sock, count, argv, heartbeat_interval=1.0, heartbeat_timeout=30.0,
+                 shutdown_timeout=30.0, tick=None):
+        self.sock = sock
+        self.count = count
+        self.argv = list(argv)
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.tick = tick
+        self.workers = []
+        self.respawn_delay = 0.0
+        self.respawn_at = 0.0
+        self._stop = False
+        self._restart = False
+
+    def _request_stop(self, signum, frame):
+        self._stop = True
+
+    def _request_restart(self, signum, frame):
+        self._restart = True
+
+    def _in_state(self, *states):
+        return [w for w in self.workers if w.state in states]
+
+    def spawn(self):
+        read_fd, write_fd = os.pipe()
+        listen_fd = self.sock.fileno()
+        argv = self.argv + ['--listen-fd', str(listen_fd), '--heartbeat-fd', str(write_fd)]
+        try:
+            process = subprocess.Popen(argv, pass_fds=(listen_fd, write_fd))
+        except OSError:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        worker = Worker(process, read_fd)
+        self.workers.append(worker)
+        print(f"Started worker {worker.pid}")
+        return worker
+
+    def stop_worker(self, worker, kill=False):
+        if worker.process.poll() is None:
+            if kill:
+                worker.process.kill()
+            else:
+                worker.process.terminate()
+        if worker.stopping_at is None:
+            worker.stopping_at = time.monotonic()
+        worker.state = 'stopping'
+
+    def read_heartbeats(self, timeout):
+        open_fds = {w.fd: w for w in self.workers if not w.eof}
+        if not open_fds:
+            time.sleep(timeout)
+            return
+        readable, _, _ = select.select(list(open_fds), [], [], timeout)
+        now = time.monotonic()
+        for fd in readable:
+            worker = open_fds[fd]
+            if os.read(fd, 4096):
+                worker.last_beat = now
+                if worker.state == 'starting':
+                    worker.state = 'running'
+            else:
+                # The child has exited (or closed the pipe); reap() collects it
+                worker.eof = True
+
+    def reap(self):
+        now = time.monotonic()
+        for worker in list(self.workers):
+            status = worker.process.poll()
+            if status is None:
+                continue
+            self.workers.remove(worker)
+            os.close(worker.fd)
+            if worker.state == 'stopping':
+                continue
+            print(f"Worker {worker.pid} exited unexpectedly with status {status}")
+            if now - worker.started < RESPAWN_MIN_UPTIME:
+                self.respawn_delay = min(max(self.respawn_delay * 2, 1.0), RESPAWN_MAX_DELAY)
+                self.respawn_at = now + self.respawn_delay
+            else:
+                self.respawn_delay = 0.0
+
+    def check_heartbeats(self):
+        now = time.monotonic()
+        for worker in self._in_state('starting', 'running', 'retiring'):
+            if now - worker.last_beat > self.heartbeat_timeout:
+                print(f"Worker {worker.pid} sent no heartbeat for {now - worker.last_beat:.0f}s; killing it")
+                self.stop_worker(worker, kill=True)
+        for worker in self._in_state('stopping'):
+            if now - worker.stopping_at > self.shutdown_timeout and worker.process.poll() is None:
+                print(f"Worker {worker.pid} did not exit within {self.shutdown_timeout:.0f}s; killing it")
+                worker.process.kill()
+
+    def replace_missing(self):
+        if time.monotonic() < self.respawn_at:
+            return
+        for _ in range(self.count - len(self._in_state('starting', 'running'))):
+            self.spawn()
+
+    def begin_restart(self):
+        print(f"Restarting {self.count} workers")
+        for worker in self._in_state('starting', 'running'):
+            worker.state = 'retiring'
+        self.respawn_at = 0.0
+        self.replace_missing()
+
+    def finish_restart(self):
+        """Retire the old children once every replacement is accepting"""
+        retiring = self._in_state('retiring')
+        if not retiring or self._in_state('starting'):
+            return
+        if len(self._in_state('running')) < self.count:
+            return
+        for worker in retiring:
+            self.stop_worker(worker)
+
+    def stop_all(self):
+        for worker in self.workers:
+            self.stop_worker(worker)
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self.workers and time.monotonic() < deadline:
+            time.sleep(0.1)
+            self.reap()
+        for worker in self.workers:
+            print(f"Worker {worker.pid} did not exit within {self.shutdown_timeout:.0f}s; killing it")
+            worker.process.kill()
+            worker.process.wait()
+            os.close(worker.fd)
+        self.workers = []
+
+    def run(self):
+        """Supervise until SIGTERM or SIGINT"""
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGHUP, self._request_restart)
+        try:
+            self.replace_missing()
+            while not self._stop:
+                if self._restart:
+                    self._restart = False
+                    self.begin_restart()
+                self.read_heartbeats(min(1.0, self.heartbeat_interval))
+                self.reap()
+                self.check_heartbeats()
+                self.finish_restart()
+                self.replace_missing()
+                if self.tick is not None:
+                    try:
+                        self.tick()
+                    except Exception as e:
+                        print(f"Supervisor task failed: {e}")
+        finally:
+            print("Stopping workers...")
+            self.stop_all()
+            self.sock.close()
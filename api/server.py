@@ -6,38 +6,2390 @@ Serves the REST API while Sigil toolchain is being set up.
 Connects to the same PostgreSQL database.
 """
 
+import argparse
+import base64
+import csv
+import datetime
+import decimal
+import gzip
+import hashlib
+import io
 import json
+import mimetypes
 import os
+import re
+import select
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
 import time
+import uuid
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from http.server import HTTPServer, SimpleHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
-from urllib.request import urlopen, Request
 from urllib.error import URLError
+from urllib.parse import urlparse, parse_qs, urlencode, unquote
+from urllib.request import urlopen, Request
+
 import psycopg2
+import psycopg2.errors
+from psycopg2.extensions import connection as PgConnection, TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INERROR
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import PoolError
+
+import metrics
+import mvt
+import prefork
+import simplify
+from catalog import Catalog, TreatyRecord, TribeRecord
+from spatial import BoundaryIndex, feature_id
+from suggest import SuggestIndex
+
+try:
+    import brotli
+except ImportError:  # optional: responses fall back to gzip only
+    brotli = None
 
 # Native-Land.ca API key
 NATIVE_LAND_API_KEY = os.environ.get('NATIVE_LAND_API_KEY', 'I4Fi9hqW-544NkOMBnpF-')
 
-# Simple cache for boundaries (refreshes every 24 hours)
-_boundaries_cache = {'data': None, 'timestamp': 0, 'ttl': 86400}
-
 # Configuration
 HOST = os.environ.get('HOST', '127.0.0.1')
 PORT = int(os.environ.get('PORT', '8080'))
 DATABASE_URL = os.environ.get('DATABASE_URL', 'postgresql://localhost/windwalker_staging')
 STATIC_DIR = os.environ.get('STATIC_DIR', '../web/dist')
+# Files under STATIC_DIR up to this size are served from memory, compressed
+# once at the highest levels, and re-read when they change on disk (checked
+# at most every STATIC_CHECK_INTERVAL seconds; 0 never re-checks)
+STATIC_CACHE_MAX_FILE_BYTES = int(os.environ.get('STATIC_CACHE_MAX_FILE_BYTES', str(8 * 1024 * 1024)))
+STATIC_CHECK_INTERVAL = float(os.environ.get('STATIC_CHECK_INTERVAL', '2'))
+STATIC_GZIP_LEVEL = int(os.environ.get('STATIC_GZIP_LEVEL', '9'))
+STATIC_BROTLI_QUALITY = int(os.environ.get('STATIC_BROTLI_QUALITY', '11'))
+# Lifetime of asset URLs carrying their content hash (`app.js?v=...`)
+STATIC_IMMUTABLE_MAX_AGE = int(os.environ.get('STATIC_IMMUTABLE_MAX_AGE', '31536000'))
+
+# Concurrency: requests are handled on a bounded pool of worker threads so a
+# slow upstream fetch or query only occupies one worker
+MAX_WORKERS = int(os.environ.get('MAX_WORKERS', '16'))
+LISTEN_BACKLOG = int(os.environ.get('LISTEN_BACKLOG', '128'))
+# Keep-alive: HTTP/1.1 connections stay open between requests, but an idle
+# one still holds its worker thread, so it is closed after KEEPALIVE_TIMEOUT
+# seconds without a request, after KEEPALIVE_MAX_REQUESTS requests, or as
+# soon as other connections are queued waiting for a thread
+KEEPALIVE_TIMEOUT = float(os.environ.get('KEEPALIVE_TIMEOUT', '5'))
+# How often an idle keep-alive connection checks whether it should give up
+# its thread (other connections queued, or the server draining)
+KEEPALIVE_POLL_INTERVAL = float(os.environ.get('KEEPALIVE_POLL_INTERVAL', '0.1'))
+KEEPALIVE_MAX_REQUESTS = int(os.environ.get('KEEPALIVE_MAX_REQUESTS', '100'))
+# Limits on POST /api/v1/batch
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '20'))
+BATCH_MAX_BODY_BYTES = int(os.environ.get('BATCH_MAX_BODY_BYTES', '65536'))
+# Admission control: each route (named as in /metrics) runs at most its limit
+# of requests at once, ROUTE_LIMIT_DEFAULT unless ROUTE_LIMITS says otherwise
+# ("route=N,..."). Up to ADMISSION_MAX_WAITING more wait, each for at most
+# ADMISSION_WAIT_MS, and the rest are shed with a 503 (or a stale cached copy)
+ROUTE_LIMIT_DEFAULT = int(os.environ.get('ROUTE_LIMIT_DEFAULT', str(MAX_WORKERS)))
+ROUTE_LIMITS = os.environ.get(
+    'ROUTE_LIMITS', f"/api/v1/export=2,/api/v1/search={max(1, MAX_WORKERS // 2)},"
+                    f"/api/v1/geo/bbox={max(1, MAX_WORKERS // 2)}")
+ADMISSION_MAX_WAITING = int(os.environ.get('ADMISSION_MAX_WAITING', str(MAX_WORKERS)))
+ADMISSION_WAIT_MS = float(os.environ.get('ADMISSION_WAIT_MS', '1000'))
+# Requests that waited longer than this for a worker thread are shed unless
+# they can be answered from cache: their client has likely given up
+ADMISSION_MAX_QUEUE_MS = float(os.environ.get('ADMISSION_MAX_QUEUE_MS', '2000'))
+# Time budget per request, counted from accept; database statements get what
+# is left of it as their statement_timeout. 0 disables. Exports are exempt.
+REQUEST_DEADLINE_MS = float(os.environ.get('REQUEST_DEADLINE_MS', '10000'))
+# Retry-After (seconds) on shed requests
+RETRY_AFTER = int(os.environ.get('RETRY_AFTER', '1'))
+# Pre-fork: with WORKERS > 0 (or --workers N) a supervisor binds the port and
+# runs that many server processes on it, each with its own thread and
+# database pools, and restarts any that exit or stop heartbeating
+WORKERS = int(os.environ.get('WORKERS', '0'))
+WORKER_HEARTBEAT_INTERVAL = float(os.environ.get('WORKER_HEARTBEAT_INTERVAL', '1'))
+WORKER_HEARTBEAT_TIMEOUT = float(os.environ.get('WORKER_HEARTBEAT_TIMEOUT', '30'))
+# How long a stopping worker may spend finishing in-flight requests
+WORKER_SHUTDOWN_TIMEOUT = float(os.environ.get('WORKER_SHUTDOWN_TIMEOUT', '30'))
+# How often (seconds) each worker writes its metrics for the others' /metrics
+WORKER_METRICS_INTERVAL = float(os.environ.get('WORKER_METRICS_INTERVAL', '1'))
+
+# Boundaries: served from memory (or the on-disk snapshot after a restart) and
+# refreshed from upstream in the background once older than BOUNDARIES_TTL.
+# Point BOUNDARIES_URL at a local stand-in server for testing.
+CACHE_DIR = os.environ.get('CACHE_DIR', '.cache')
+BOUNDARIES_URL = os.environ.get('BOUNDARIES_URL', 'https://d2u5ssx9zi93qh.cloudfront.net/treaties.geojson')
+BOUNDARIES_SNAPSHOT = os.environ.get('BOUNDARIES_SNAPSHOT', os.path.join(CACHE_DIR, 'boundaries.geojson'))
+BOUNDARIES_TTL = int(os.environ.get('BOUNDARIES_TTL', '86400'))
+BOUNDARIES_RETRY_INTERVAL = int(os.environ.get('BOUNDARIES_RETRY_INTERVAL', '300'))
+BOUNDARIES_FETCH_TIMEOUT = float(os.environ.get('BOUNDARIES_FETCH_TIMEOUT', '30'))
+# Under --workers only the supervisor fetches boundaries; workers serve the
+# snapshot it writes and check it for changes this often (seconds)
+BOUNDARIES_SNAPSHOT_POLL = float(os.environ.get('BOUNDARIES_SNAPSHOT_POLL', '5'))
+# Grid cell size (degrees) of the in-memory spatial index over boundaries
+SPATIAL_CELL_DEGREES = float(os.environ.get('SPATIAL_CELL_DEGREES', '1.0'))
+GEO_BBOX_MAX_LIMIT = int(os.environ.get('GEO_BBOX_MAX_LIMIT', '500'))
+# Largest `limit` accepted by /api/v1/search
+SEARCH_MAX_LIMIT = int(os.environ.get('SEARCH_MAX_LIMIT', '100'))
+SUGGEST_MAX_LIMIT = int(os.environ.get('SUGGEST_MAX_LIMIT', '20'))
+# Default page sizes of the keyset-paginated listings, and the largest
+# `limit` either accepts
+TREATY_PAGE_SIZE = int(os.environ.get('TREATY_PAGE_SIZE', '500'))
+TRIBE_PAGE_SIZE = int(os.environ.get('TRIBE_PAGE_SIZE', '100'))
+LIST_MAX_LIMIT = int(os.environ.get('LIST_MAX_LIMIT', '1000'))
+# Rows fetched from the server-side cursor, and sent as one chunk, at a
+# time by /api/v1/export
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+# Last year on the timeline slider; at this year app.js shows every boundary,
+# including those with no year in their name
+TIMELINE_LAST_YEAR = 1871
+
+# Vector tiles: rendered tiles are kept in an in-memory LRU and written under
+# TILE_CACHE_DIR, keyed by a digest of the data they were rendered from
+TILE_CACHE_DIR = os.environ.get('TILE_CACHE_DIR', os.path.join(CACHE_DIR, 'tiles'))
+TILE_CACHE_MAX_ENTRIES = int(os.environ.get('TILE_CACHE_MAX_ENTRIES', '4096'))
+TILE_CACHE_MAX_BYTES = int(os.environ.get('TILE_CACHE_MAX_BYTES', str(128 * 1024 * 1024)))
+TILE_MAX_AGE = int(os.environ.get('TILE_MAX_AGE', '86400'))
+
+# Response cache: final encoded bytes (plus gzip/brotli variants) keyed by
+# route and query, dropped when the underlying data version changes
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '512'))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '5'))
+# How often the database data version is re-checked
+DATA_VERSION_TTL = float(os.environ.get('DATA_VERSION_TTL', '5'))
+
+# Treaty catalog: every treaty and tribe held in memory and reloaded when
+# Postgres notifies a change (migration 006); CATALOG=0 queries the database
+# on every request instead
+CATALOG = os.environ.get('CATALOG', '1') != '0'
+CATALOG_CHANNEL = 'windwalker_catalog'
+# A reload waits for this many seconds without further notifications, so a
+# scrape committing row by row costs one reload, but never longer than
+# CATALOG_MAX_DELAY after the first notification
+CATALOG_DEBOUNCE = float(os.environ.get('CATALOG_DEBOUNCE', '1'))
+CATALOG_MAX_DELAY = float(os.environ.get('CATALOG_MAX_DELAY', '10'))
+# Wait before reconnecting the listener, or retrying a failed load
+CATALOG_RETRY_INTERVAL = float(os.environ.get('CATALOG_RETRY_INTERVAL', '5'))
+# How often an idle listener checks its connection is still alive
+CATALOG_PING_INTERVAL = float(os.environ.get('CATALOG_PING_INTERVAL', '60'))
+
+# Browser cache lifetimes (seconds). API responses carry strong ETags, so once
+# max-age runs out a repeat visit costs a conditional request and a 304.
+API_MAX_AGE = int(os.environ.get('API_MAX_AGE', '60'))
+SOURCES_MAX_AGE = int(os.environ.get('SOURCES_MAX_AGE', '3600'))
+BOUNDARIES_MAX_AGE = int(os.environ.get('BOUNDARIES_MAX_AGE', '3600'))
+
+# Requests slower than this many milliseconds are logged with every SQL
+# statement they ran (0 disables the slow-request log)
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '0'))
+# Longest statement text written to the slow-request log
+SLOW_LOG_SQL_CHARS = int(os.environ.get('SLOW_LOG_SQL_CHARS', '2000'))
+
+# Database pool: connections are reused across requests instead of paying a
+# TCP/auth handshake and backend fork on every API hit
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', str(MAX_WORKERS)))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+DB_POOL_IDLE_TIMEOUT = float(os.environ.get('DB_POOL_IDLE_TIMEOUT', '300'))
+DB_HEALTHCHECK_AFTER = float(os.environ.get('DB_HEALTHCHECK_AFTER', '30'))
+
+# A treaty's treaty_tribes links (see treaty_tribes); `t` is raw_treaties
+TREATY_LINKS_COLUMN = """
+            (SELECT jsonb_agg(jsonb_build_object('id', tt.tribe_id::text, 'party', tt.party_name))
+             FROM treaty_tribes tt WHERE tt.treaty_id = t.id) as tribe_links"""
+
+# List-view treaty columns (see treaty_summary); `t` is raw_treaties
+TREATY_SUMMARY_COLUMNS = """
+            t.id::text,
+            t.title as name,
+            t.date_signed::text as signed_date,
+            t.tribal_parties_text as tribes,
+            CASE WHEN t.is_validated THEN 'Active' ELSE 'Unknown' END as status,
+            CASE WHEN t.is_validated THEN 'Verified' ELSE 'Reported' END as certainty,
+            t.kappler_volume,
+            t.kappler_page,""" + TREATY_LINKS_COLUMN
+
+# Detail-view treaty columns (see get_treaty); `t` is raw_treaties, `ds` its source
+TREATY_DETAIL_COLUMNS = """
+            t.id::text,
+            t.title as name,
+            t.date_signed_text,
+            t.date_signed::text as signed_date,
+            t.date_ratified::text as ratified_date,
+            t.tribal_parties_text as tribes,
+            t.us_commissioners_text as us_commissioners,
+            t.signatures_text as signatories,
+            t.preamble,
+            t.articles_text as articles,
+            t.statutes_at_large_citation,
+            t.kappler_volume,
+            t.kappler_page,
+            t.is_validated,
+            t.source_url,
+            ds.name as source_name,
+            ds.reliability as source_reliability,""" + TREATY_LINKS_COLUMN
+
+# Hot queries, prepared once per pooled connection and then run with EXECUTE
+PREPARED_QUERIES = {
+    # One page of treaties in (date_signed, id) order, undated treaties last.
+    # $1/$2 bound date_signed (inclusive/exclusive), $3/$4 is the last dated
+    # row already sent, $5 the last undated one (NULL: leave undated out),
+    # $6 the page size. Each branch is a range scan on
+    # idx_raw_treaties_date_signed_id (migration 005). The branches are
+    # merged on the date and uuid values, not their text forms.
+    'treaty_page': ('date, date, date, uuid, uuid, int', """
+        SELECT * FROM (
+            (SELECT 0 AS undated, t.date_signed AS sort_date, t.id AS sort_id,""" + TREATY_SUMMARY_COLUMNS + """
+             FROM raw_treaties t
+             WHERE t.date_signed >= $1 AND t.date_signed < $2
+               AND (t.date_signed, t.id) > ($3, $4)
+             ORDER BY t.date_signed ASC, t.id ASC
+             LIMIT $6)
+            UNION ALL
+            (SELECT 1 AS undated, t.date_signed AS sort_date, t.id AS sort_id,""" + TREATY_SUMMARY_COLUMNS + """
+             FROM raw_treaties t
+             WHERE $5::uuid IS NOT NULL AND t.date_signed IS NULL AND t.id > $5
+             ORDER BY t.id ASC
+             LIMIT $6)
+        ) page
+        ORDER BY undated, sort_date, sort_id
+        LIMIT $6
+    """),
+    'treaty_count': ('date, date, boolean', """
+        SELECT
+            (SELECT count(*) FROM raw_treaties WHERE date_signed >= $1 AND date_signed < $2)
+            + (SELECT count(*) FROM raw_treaties WHERE $3 AND date_signed IS NULL) AS total
+    """),
+    # Every dated treaty, in the order the timeline index needs
+    'treaty_timeline': ('', """
+        SELECT""" + TREATY_SUMMARY_COLUMNS + """,
+            EXTRACT(YEAR FROM t.date_signed)::int as year
+        FROM raw_treaties t
+        WHERE t.date_signed IS NOT NULL
+        ORDER BY t.date_signed ASC, t.id ASC
+    """),
+    'treaty_detail': ('uuid', """
+        SELECT""" + TREATY_DETAIL_COLUMNS + """
+        FROM raw_treaties t
+        JOIN data_sources ds ON t.source_id = ds.id
+        WHERE t.id = $1
+    """),
+    # One page of tribes in (name, id) order, after the row ($1, $2)
+    'tribe_page': ('text, uuid, int', """
+        SELECT
+            id::text,
+            name,
+            alternate_names,
+            region,
+            state,
+            federally_recognized,
+            name_evidentiality::text as certainty,
+            treaty_count
+        FROM raw_tribes
+        WHERE (name, id) > ($1, $2)
+        ORDER BY name ASC, id ASC
+        LIMIT $3
+    """),
+    'tribe_count': ('', """
+        SELECT count(*) AS total FROM raw_tribes
+    """),
+    'tribe_detail': ('uuid', """
+        SELECT * FROM raw_tribes WHERE id = $1
+    """),
+    # A tribe's treaties through the treaty_tribes links (migration 004)
+    'tribe_treaties': ('uuid', """
+        SELECT""" + TREATY_SUMMARY_COLUMNS + """
+        FROM treaty_tribes link
+        JOIN raw_treaties t ON t.id = link.treaty_id
+        WHERE link.tribe_id = $1
+        ORDER BY t.date_signed ASC NULLS LAST, t.id ASC
+    """),
+    # Ranked treaty and tribe matches in one round trip; needs the indexes
+    # and functions from sourcing/migrations/002_search_indexes.sql.
+    # $1 query, $2 escaped ILIKE pattern, $3 limit
+    'search': ('text, text, int', """
+        WITH q AS (
+            SELECT websearch_to_tsquery('english', $1) AS tsq
+        ),
+        hits AS (
+            (SELECT 'treaty' AS entity_type, t.id, t.title,
+                    t.preamble AS body, NULL::text AS place,
+                    ts_rank_cd(treaty_search_vector(t.title, t.preamble, t.articles_text), q.tsq)
+                        + word_similarity($1, t.title) AS score
+             FROM raw_treaties t, q
+             WHERE treaty_search_vector(t.title, t.preamble, t.articles_text) @@ q.tsq
+                OR t.title ILIKE $2
+                OR $1 <% t.title
+             ORDER BY score DESC
+             LIMIT $3)
+            UNION ALL
+            (SELECT 'tribe' AS entity_type, r.id, r.name AS title,
+                    jsonb_array_text(r.alternate_names) AS body,
+                    concat_ws(', ', r.state, r.region) AS place,
+                    ts_rank_cd(tribe_search_vector(r.name, r.alternate_names), q.tsq)
+                        + word_similarity($1, tribe_search_names(r.name, r.alternate_names)) AS score
+             FROM raw_tribes r, q
+             WHERE tribe_search_vector(r.name, r.alternate_names) @@ q.tsq
+                OR tribe_search_names(r.name, r.alternate_names) ILIKE $2
+                OR $1 <% tribe_search_names(r.name, r.alternate_names)
+             ORDER BY score DESC
+             LIMIT $3)
+        ),
+        ranked AS (
+            SELECT * FROM hits ORDER BY score DESC LIMIT $3
+        )
+        -- Headlines are the expensive part, so only the returned rows get one
+        SELECT
+            entity_type,
+            id::text,
+            title,
+            CASE entity_type
+                WHEN 'treaty' THEN ts_headline('english', COALESCE(NULLIF(body, ''), title), q.tsq,
+                                               'MaxFragments=1, MaxWords=30, MinWords=12')
+                ELSE NULLIF(concat_ws(' · ',
+                    NULLIF(ts_headline('english', body, q.tsq, 'HighlightAll=true'), ''),
+                    NULLIF(place, '')), '')
+            END AS snippet,
+            score
+        FROM ranked, q
+        ORDER BY score DESC
+    """),
+    # Every name the autocomplete index should know
+    'suggest_entries': ('', """
+        SELECT 'treaty' AS entity_type, id::text, title AS text FROM raw_treaties
+        UNION ALL
+        SELECT 'tribe', id::text, name FROM raw_tribes
+        UNION ALL
+        SELECT 'tribe', id::text, jsonb_array_elements_text(alternate_names)
+        FROM raw_tribes
+        WHERE jsonb_typeof(alternate_names) = 'array'
+    """),
+    'source_list': ('', """
+        SELECT source_id as id, name, source_type::text as type,
+               base_url, last_scraped::text, reliability
+        FROM data_sources
+        ORDER BY reliability DESC
+    """),
+    'tribe_points': ('float8, float8, float8, float8', """
+        SELECT id::text, name, state, federally_recognized,
+               ST_X(headquarters_location) AS lng, ST_Y(headquarters_location) AS lat
+        FROM raw_tribes
+        WHERE headquarters_location && ST_MakeEnvelope($1, $2, $3, $4, 4326)
+    """),
+    'tribe_extent': ('', """
+        SELECT ST_XMin(e) AS min_lng, ST_YMin(e) AS min_lat,
+               ST_XMax(e) AS max_lng, ST_YMax(e) AS max_lat
+        FROM (SELECT ST_Extent(headquarters_location) AS e FROM raw_tribes) extent
+    """),
+    # treaty_geometries is not part of the staging schema yet; the treaty
+    # tile layer stays empty until it exists
+    'treaty_geometries_exist': ('', """
+        SELECT to_regclass('treaty_geometries') IS NOT NULL AS present
+    """),
+    'treaty_shapes': ('float8, float8, float8, float8, float8', """
+        SELECT
+            t.id::text,
+            t.title as name,
+            EXTRACT(YEAR FROM t.date_signed)::int as signed_year,
+            CASE WHEN t.is_validated THEN 'Active' ELSE 'Unknown' END as status,
+            CASE WHEN t.is_validated THEN 'Verified' ELSE 'Reported' END as certainty,
+            ST_AsGeoJSON(ST_Simplify(tg.geometry, $5)) as geometry
+        FROM raw_treaties t
+        JOIN treaty_geometries tg ON tg.treaty_id = t.id
+        WHERE tg.geometry && ST_MakeEnvelope($1, $2, $3, $4, 4326)
+    """),
+    'treaty_extent': ('', """
+        SELECT ST_XMin(e) AS min_lng, ST_YMin(e) AS min_lat,
+               ST_XMax(e) AS max_lng, ST_YMax(e) AS max_lat
+        FROM (SELECT ST_Extent(geometry) AS e FROM treaty_geometries) extent
+    """),
+    # Changes whenever a scrape run starts or finishes or any served row is
+    # inserted, updated or deleted
+    'data_version': ('', """
+        SELECT concat_ws('/',
+            (SELECT count(*) || ':' || COALESCE(max(GREATEST(started_at, finished_at))::text, '')
+             FROM scrape_runs),
+            (SELECT count(*) || ':' || COALESCE(max(updated_at)::text, '') FROM raw_treaties),
+            (SELECT count(*) || ':' || COALESCE(max(updated_at)::text, '') FROM raw_tribes),
+            (SELECT count(*) || ':' || COALESCE(max(linked_at)::text, '') FROM treaty_tribes),
+            (SELECT COALESCE(max(updated_at)::text, '') FROM data_sources)
+        ) AS version
+    """),
+}
+
+# ============================================================================
+# Metrics (exposed at /metrics)
+# ============================================================================
+
+HTTP_REQUEST_DURATION = metrics.histogram(
+    'windwalker_http_request_duration_seconds', 'Time to handle a request, by route',
+    ('route', 'method', 'status'))
+HTTP_REQUEST_DB_TIME = metrics.histogram(
+    'windwalker_http_request_db_seconds', 'Time a request spent in database statements, by route',
+    ('route',))
+HTTP_RESPONSE_BYTES = metrics.histogram(
+    'windwalker_http_response_bytes', 'Bytes written per response, headers included, by route',
+    ('route',), metrics.SIZE_BUCKETS)
+DB_QUERY_DURATION = metrics.histogram(
+    'windwalker_db_query_duration_seconds', 'Database statement time, by prepared query or statement type',
+    ('query',))
+CACHE_LOOKUPS = metrics.counter(
+    'windwalker_cache_lookups_total', 'Cache lookups by cache and result', ('cache', 'result'))
+UPSTREAM_FETCHES = metrics.counter(
+    'windwalker_upstream_fetches_total', 'Fetches from upstream services by outcome', ('upstream', 'outcome'))
+UPSTREAM_FETCH_DURATION = metrics.histogram(
+    'windwalker_upstream_fetch_duration_seconds', 'Time to fetch from upstream services', ('upstream',))
+
+REQUESTS_SHED = metrics.counter(
+    'windwalker_requests_shed_total', 'Requests refused or answered stale under load', ('route', 'reason'))
+
+def _pool_connections():
+    pool = _db_pool
+    if pool is None:
+        return None
+    idle = len(pool._idle)
+    return [(('idle',), idle), (('in_use',), pool._size - idle)]
+
+def _boundaries_age():
+    timestamp = _boundaries_cache['timestamp']
+    return time.time() - timestamp if _boundaries_cache['data'] is not None else None
+
+metrics.gauge('windwalker_db_pool_connections', 'Pooled database connections by state', ('state',),
+              _pool_connections)
+metrics.gauge('windwalker_response_cache_bytes', 'Bytes held by the API response cache',
+              collect=lambda: _response_cache._bytes)
+metrics.gauge('windwalker_response_cache_entries', 'Responses held by the API response cache',
+              collect=lambda: len(_response_cache._entries))
+metrics.gauge('windwalker_boundaries_age_seconds', 'Age of the served treaty boundaries',
+              collect=_boundaries_age)
+
+_STATEMENT_RE = re.compile(r'\s*(EXECUTE|PREPARE)\s+(\w+)|\s*(\w+)', re.IGNORECASE)
+
+def statement_label(statement):
+    """Low-cardinality metric label for a statement: the prepared query's
+    name for EXECUTE, otherwise the lowercased leading keyword"""
+    if isinstance(statement, bytes):
+        statement = statement[:64].decode('utf-8', 'replace')
+    match = _STATEMENT_RE.match(statement or '')
+    if match is None:
+        return 'other'
+    if match.group(1):
+        return match.group(2) if match.group(1).upper() == 'EXECUTE' else 'prepare'
+    return match.group(3).lower()
+
+class TimedCursor(RealDictCursor):
+    """RealDictCursor that records the duration of every statement it runs"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            elapsed = time.perf_counter() - started
+            DB_QUERY_DURATION.observe(elapsed, statement_label(query))
+            metrics.record_statement(self.query or query, elapsed)
+
+class PooledConnection(PgConnection):
+    """psycopg2 connection that tracks its prepared statements and idle time"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.last_used = time.monotonic()
+        # Session statement_timeout in ms, None for the server default
+        self.statement_timeout = None
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of reusable PostgreSQL connections
+
+    Callers block (up to `timeout` seconds) when all `maxconn` connections are
+    checked out. Idle connections are pinged before reuse once they have been
+    idle for DB_HEALTHCHECK_AFTER seconds, and broken ones are replaced.
+    """
+
+    def __init__(self, dsn, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = max(maxconn, minconn, 1)
+        self.timeout = timeout
+        self._idle = []  # LIFO so the hottest connections are reused first
+        self._size = 0
+        self._cond = threading.Condition()
+        for _ in range(minconn):
+            self._idle.append(self._connect())
+            self._size += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, connection_factory=PooledConnection,
+                                cursor_factory=TimedCursor)
+        conn.autocommit = True
+        return conn
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        if time.monotonic() - conn.last_used < DB_HEALTHCHECK_AFTER:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout=None):
+        deadline = time.monotonic() + (self.timeout if timeout is None else min(timeout, self.timeout))
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolError('Timed out waiting for a database connection')
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn = self._idle.pop()
+                else:
+                    conn = None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._forget()
+                    raise
+            if self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            try:
+                if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if discard or conn.closed:
+            self._discard(conn)
+            return
+
+        now = time.monotonic()
+        conn.last_used = now
+        expired = []
+        with self._cond:
+            self._idle.append(conn)
+            # Trim connections that have sat unused at the bottom of the stack
+            while (len(self._idle) > self.minconn
+                   and now - self._idle[0].last_used > DB_POOL_IDLE_TIMEOUT):
+                expired.append(self._idle.pop(0))
+                self._size -= 1
+            self._cond.notify()
+        for old in expired:
+            old.close()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        self._forget()
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn in idle:
+            conn.close()
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool():
+    """Get the process-wide connection pool, creating it on first use"""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = ConnectionPool(DATABASE_URL)
+    return _db_pool
+
+def _pool_wait():
+    """How long the current request may wait for a pooled connection"""
+    deadline = request_deadline()
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise Overloaded('Request deadline exceeded')
+    return remaining
+
+def _apply_statement_timeout(conn):
+    """Give the connection what is left of the current request's deadline as
+    its statement_timeout, or the server default outside a deadline"""
+    deadline = request_deadline()
+    timeout = None
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise Overloaded('Request deadline exceeded')
+        timeout = max(1, int(remaining * 1000))
+    if timeout == conn.statement_timeout:
+        return
+    with conn.cursor() as cur:
+        if timeout is None:
+            cur.execute('RESET statement_timeout')
+        else:
+            cur.execute('SET statement_timeout = %s', (timeout,))
+    conn.statement_timeout = timeout
+
+@contextmanager
+def db_cursor():
+    """Borrow a pooled connection for the duration of a `with` block
+
+    The connection always goes back to the pool, rolled back if a statement
+    failed and discarded if the connection itself broke.
+    """
+    batch = getattr(_request_state, 'batch', None)
+    if batch is not None:
+        with batch.connection().cursor() as cur:
+            yield cur
+        return
+
+    pool = get_db_pool()
+    conn = pool.getconn(_pool_wait())
+    discard = False
+    try:
+        _apply_statement_timeout(conn)
+        with conn.cursor() as cur:
+            yield cur
+    except psycopg2.errors.QueryCanceled:
+        raise  # a statement timeout leaves the connection usable
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        discard = True
+        raise
+    finally:
+        pool.putconn(conn, discard=discard)
+
+@contextmanager
+def db_snapshot():
+    """Borrow a pooled connection inside a read-only REPEATABLE READ transaction
+
+    Every statement in the block sees the same snapshot of the data, and
+    server-side (named) cursors, which need a transaction, can be opened
+    on the connection. The transaction is rolled back afterwards.
+    """
+    pool = get_db_pool()
+    conn = pool.getconn(_pool_wait())
+    discard = False
+    try:
+        _apply_statement_timeout(conn)
+        conn.autocommit = False
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        yield conn
+    except psycopg2.errors.QueryCanceled:
+        raise
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        discard = True
+        raise
+    finally:
+        if not discard and not conn.closed:
+            try:
+                conn.rollback()
+                conn.autocommit = True
+            except psycopg2.Error:
+                discard = True
+        pool.putconn(conn, discard=discard)
+
+class BatchSnapshot:
+    """One connection and snapshot (see db_snapshot) shared by the
+    sub-requests of a batch, opened when the first of them needs it
+
+    While it is installed for a thread, db_cursor() hands out cursors on
+    this connection. Each sub-request that uses it runs under a savepoint,
+    so one that fails doesn't leave the transaction aborted for the rest.
+    """
+
+    def __init__(self):
+        self._stack = ExitStack()
+        self.conn = None
+        self.savepoint = False
+        # current_data_version() as of the first sub-request that asked
+        self.data_version = None
+        self.data_version_read = False
+
+    def connection(self):
+        if self.conn is None:
+            self.conn = self._stack.enter_context(db_snapshot())
+        if not self.savepoint:
+            with self.conn.cursor() as cur:
+                cur.execute('SAVEPOINT batch_item')
+            self.savepoint = True
+        return self.conn
+
+    def end_item(self):
+        if self.savepoint and self.conn.info.transaction_status == TRANSACTION_STATUS_INERROR:
+            with self.conn.cursor() as cur:
+                cur.execute('ROLLBACK TO SAVEPOINT batch_item')
+        self.savepoint = False
+
+    def close(self):
+        self._stack.close()
+
+@contextmanager
+def outside_batch():
+    """Run a block's queries on a connection of their own, even during a batch"""
+    batch = getattr(_request_state, 'batch', None)
+    _request_state.batch = None
+    try:
+        yield
+    finally:
+        _request_state.batch = batch
+
+def _prepare(cur, name):
+    arg_types, sql = PREPARED_QUERIES[name]
+    signature = f" ({arg_types})" if arg_types else ""
+    cur.execute(f"PREPARE {name}{signature} AS {sql}")
+    cur.connection.prepared.add(name)
+
+def execute_prepared(cur, name, params=()):
+    """Run one of PREPARED_QUERIES, preparing it on this connection if needed"""
+    conn = cur.connection
+    if name not in conn.prepared:
+        _prepare(cur, name)
+
+    placeholders = ', '.join(['%s'] * len(params))
+    statement = f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}"
+    try:
+        cur.execute(statement, params)
+    except psycopg2.errors.FeatureNotSupported:
+        # "cached plan must not change result type" after a migration:
+        # drop the stale plan and prepare it again
+        if not conn.autocommit:
+            raise
+        cur.execute(f"DEALLOCATE {name}")
+        conn.prepared.discard(name)
+        _prepare(cur, name)
+        cur.execute(statement, params)
+
+def content_digest(raw):
+    """Short, stable digest of a byte string"""
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+class BoundaryShapes:
+    """Boundary polygons projected to Web Mercator, computed lazily per feature
+
+    When simplified `levels` are available, each zoom uses the geometry of
+    its zoom band instead of the full-resolution polygon.
+    """
+
+    def __init__(self, index, digest, levels=None):
+        self.index = index
+        self.digest = digest
+        self.levels = levels
+        # Tiles cut from simplified geometry are cached apart from full-res ones
+        self.tag = f"{digest}-z" if levels else digest
+        self._projected = {}
+
+    def projected(self, i, zoom):
+        band = simplify.band_for_zoom(zoom) if self.levels else None
+        shape = self._projected.get((band, i))
+        if shape is None:
+            source = self.index.features if band is None else self.levels[band]
+            geometry = source[i].get('geometry') or {}
+            if geometry.get('type') == 'Polygon':
+                polygons = [geometry['coordinates']]
+            elif geometry.get('type') == 'MultiPolygon':
+                polygons = geometry['coordinates']
+            else:
+                polygons = []
+            shape = mvt.project_polygons(polygons)
+            self._projected[(band, i)] = shape
+        return shape
+
+# Treaty boundaries cache (stale-while-revalidate)
+_boundaries_cache = {'data': None, 'index': None, 'shapes': None, 'digest': None,
+                     'levels': None, 'simplifier': None,
+                     'timestamp': 0, 'ttl': BOUNDARIES_TTL, 'version': 0,
+                     'retry_at': 0, 'error': None,
+                     # Set in pre-fork workers: "refreshing" reloads the snapshot
+                     'shared': False, 'checked_at': 0}
+# Held for the duration of an upstream fetch so only one runs at a time
+_boundaries_fetch_lock = threading.Lock()
+# Serializes swapping in new boundaries and their simplified levels
+_boundaries_install_lock = threading.Lock()
+
+def install_boundaries(data, timestamp, digest):
+    """Make a boundaries FeatureCollection the one served to clients
+
+    `digest` identifies the content (it survives restarts, unlike `version`)
+    and names the on-disk tile cache for this dataset.
+    """
+    features = data.get('features', [])
+    # Give every feature a top-level id so clients and the index agree on it
+    for i, feature in enumerate(features):
+        if feature.get('id') is None:
+            feature['id'] = feature_id(feature, i)
+    index = BoundaryIndex(features, SPATIAL_CELL_DEGREES)
+
+    with _boundaries_install_lock:
+        _boundaries_cache['index'] = index
+        _boundaries_cache['shapes'] = BoundaryShapes(index, digest)
+        _boundaries_cache['levels'] = None
+        _boundaries_cache['digest'] = digest
+        _boundaries_cache['data'] = data
+        _boundaries_cache['timestamp'] = timestamp
+        _boundaries_cache['version'] += 1
+        _boundaries_cache['error'] = None
+        _boundaries_cache['retry_at'] = 0
+        version = _boundaries_cache['version']
+
+    # Full-resolution data is served until the simplified levels are ready
+    simplifier = threading.Thread(target=simplify_boundaries, args=(version, data, index, digest),
+                                  name='boundaries-simplify', daemon=True)
+    _boundaries_cache['simplifier'] = simplifier
+    simplifier.start()
+
+def simplify_boundaries(version, data, index, digest):
+    """Build per-zoom-band simplified copies of the boundaries and install them"""
+    started = time.time()
+    try:
+        levels = simplify.build_levels(index.features)
+    except Exception as e:
+        print(f"Boundary simplification failed, serving full resolution: {e}")
+        return
+
+    with _boundaries_install_lock:
+        if _boundaries_cache['version'] != version:
+            return  # superseded by a newer refresh
+        _boundaries_cache['levels'] = [{**data, 'features': features} for features in levels]
+        _boundaries_cache['shapes'] = BoundaryShapes(index, digest, levels)
+        # Responses cached before the levels existed are full resolution
+        _boundaries_cache['version'] += 1
+    print(f"Simplified boundaries into {len(levels)} zoom bands in {time.time() - started:.1f}s")
+
+def boundaries_for_zoom(zoom):
+    """The boundaries FeatureCollection to serve at a zoom level"""
+    data = get_boundaries_data()
+    levels = _boundaries_cache['levels']
+    band = simplify.band_for_zoom(zoom) if zoom is not None else None
+    if levels is None or band is None:
+        return data
+    return levels[band]
+
+def load_boundaries_snapshot(path=BOUNDARIES_SNAPSHOT):
+    """Load the last good boundaries from disk; returns False if unavailable"""
+    try:
+        timestamp = os.path.getmtime(path)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        digest = content_digest(raw)
+        if digest == _boundaries_cache['digest']:
+            # Rewritten with the same content: nothing to rebuild
+            _boundaries_cache['timestamp'] = timestamp
+            return True
+        data = json.loads(raw)
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable boundaries snapshot {path}: {e}")
+        return False
+
+    install_boundaries(data, timestamp, digest)
+    print(f"Loaded {len(data.get('features', []))} boundaries from snapshot {path}")
+    return True
+
+def save_boundaries_snapshot(raw, path=BOUNDARIES_SNAPSHOT):
+    """Atomically replace the on-disk snapshot with freshly fetched GeoJSON"""
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(raw)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write boundaries snapshot {path}: {e}")
+
+def fetch_boundaries():
+    """Fetch the boundaries GeoJSON from upstream, returning (raw, data)"""
+    req = Request(BOUNDARIES_URL, headers={'User-Agent': 'Windwalker/1.0'})
+    with urlopen(req, timeout=BOUNDARIES_FETCH_TIMEOUT) as response:
+        raw = response.read()
+
+    data = json.loads(raw.decode('utf-8'))
+    if not isinstance(data, dict) or not isinstance(data.get('features'), list):
+        raise ValueError('Upstream boundaries are not a GeoJSON FeatureCollection')
+    return raw, data
+
+def _refresh_boundaries_locked():
+    # Caller must hold _boundaries_fetch_lock
+    if _boundaries_cache['shared']:
+        if not load_boundaries_snapshot():
+            error = URLError(f"no boundaries snapshot at {BOUNDARIES_SNAPSHOT} yet")
+            _boundaries_cache['error'] = error
+            _boundaries_cache['retry_at'] = time.time() + BOUNDARIES_SNAPSHOT_POLL
+            raise error
+        return
+
+    started = time.perf_counter()
+    try:
+        raw, data = fetch_boundaries()
+    except Exception as e:
+        UPSTREAM_FETCHES.inc('boundaries', 'error')
+        _boundaries_cache['error'] = e
+        _boundaries_cache['retry_at'] = time.time() + BOUNDARIES_RETRY_INTERVAL
+        raise
+    finally:
+        UPSTREAM_FETCH_DURATION.observe(time.perf_counter() - started, 'boundaries')
+    UPSTREAM_FETCHES.inc('boundaries', 'ok')
+
+    install_boundaries(data, time.time(), content_digest(raw))
+    save_boundaries_snapshot(raw)
+
+def refresh_boundaries_async():
+    """Start a background refresh unless one is already running"""
+    if not _boundaries_fetch_lock.acquire(blocking=False):
+        return
+
+    def run():
+        source = BOUNDARIES_SNAPSHOT if _boundaries_cache['shared'] else BOUNDARIES_URL
+        try:
+            _refresh_boundaries_locked()
+            print(f"Refreshed {len(_boundaries_cache['data']['features'])} boundaries from {source}")
+        except Exception as e:
+            print(f"Boundary refresh failed, serving cached copy: {e}")
+        finally:
+            _boundaries_fetch_lock.release()
+
+    threading.Thread(target=run, name='boundaries-refresh', daemon=True).start()
+
+def _revalidate_boundaries():
+    cache = _boundaries_cache
+    now = time.time()
+    if cache['shared']:
+        # The supervisor keeps the snapshot fresh; reload when it is rewritten
+        if now - cache['checked_at'] >= BOUNDARIES_SNAPSHOT_POLL:
+            cache['checked_at'] = now
+            try:
+                changed = os.path.getmtime(BOUNDARIES_SNAPSHOT) != cache['timestamp']
+            except OSError:
+                changed = False
+            if changed:
+                refresh_boundaries_async()
+        return
+    if now - cache['timestamp'] >= cache['ttl'] and now >= cache['retry_at']:
+        refresh_boundaries_async()
+
+def boundaries_version():
+    """Version of the served boundaries, or None while the cache is cold"""
+    if _boundaries_cache['data'] is None:
+        return None
+    _revalidate_boundaries()
+    return _boundaries_cache['version']
+
+def get_boundaries_data():
+    """Return the cached boundaries, refreshing in the background when stale
+
+    Only a completely cold cache (no snapshot on disk) blocks the caller on
+    the upstream fetch, and concurrent callers share that single fetch.
+    After a failed fetch, callers get the last error until the retry interval
+    has passed rather than each waiting on upstream again.
+    """
+    cache = _boundaries_cache
+    if cache['data'] is not None:
+        fresh = time.time() - cache['timestamp'] < cache['ttl']
+        CACHE_LOOKUPS.inc('boundaries', 'hit' if fresh else 'stale')
+        _revalidate_boundaries()
+        return cache['data']
+
+    CACHE_LOOKUPS.inc('boundaries', 'miss')
+    now = time.time()
+    with _boundaries_fetch_lock:
+        if cache['data'] is None:
+            if cache['error'] is not None and now < cache['retry_at']:
+                raise cache['error']
+            _refresh_boundaries_locked()
+    return cache['data']
+
+def get_boundary_index():
+    """Spatial index over the current boundaries (see get_boundaries_data)"""
+    get_boundaries_data()
+    return _boundaries_cache['index']
+
+def warm_boundaries():
+    """Load the snapshot at startup and refresh it in the background if stale"""
+    load_boundaries_snapshot()
+    if _boundaries_cache['shared']:
+        return
+    if time.time() - _boundaries_cache['timestamp'] >= _boundaries_cache['ttl']:
+        refresh_boundaries_async()
+
+def refresh_boundaries_snapshot():
+    """Supervisor task under --workers: refetch the snapshot once it is stale
+
+    Workers pick the new file up themselves (see _revalidate_boundaries), so
+    upstream is fetched once per server rather than once per worker.
+    """
+    now = time.time()
+    try:
+        age = now - os.path.getmtime(BOUNDARIES_SNAPSHOT)
+    except OSError:
+        age = float('inf')
+    if age < BOUNDARIES_TTL or now < _boundaries_cache['retry_at']:
+        return
+    if not _boundaries_fetch_lock.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            raw, data = fetch_boundaries()
+            save_boundaries_snapshot(raw)
+            print(f"Refreshed {len(data['features'])} boundaries from {BOUNDARIES_URL}")
+        except Exception as e:
+            print(f"Boundary refresh failed, workers keep the current snapshot: {e}")
+        finally:
+            # Also throttles retries when the snapshot could not be written
+            _boundaries_cache['retry_at'] = time.time() + BOUNDARIES_RETRY_INTERVAL
+            _boundaries_fetch_lock.release()
+
+    threading.Thread(target=run, name='boundaries-refresh', daemon=True).start()
+
+# ============================================================================
+# Admission control
+# ============================================================================
+
+class Overloaded(Exception):
+    """The request was shed: its route is saturated or its deadline has passed"""
+
+class RouteLimiter:
+    """At most `limit` requests of a route at once, and at most `max_waiting`
+    more waiting for a slot; anything beyond that is refused immediately"""
+
+    def __init__(self, limit, max_waiting=ADMISSION_MAX_WAITING):
+        self.limit = max(limit, 1)
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout):
+        with self._cond:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if self.waiting >= self.max_waiting or timeout <= 0:
+                return False
+            deadline = time.monotonic() + timeout
+            self.waiting += 1
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+def parse_route_limits(spec):
+    """{route: limit} from a "route=N,route=N" string"""
+    limits = {}
+    for item in spec.split(','):
+        route, _, limit = item.strip().rpartition('=')
+        if route:
+            limits[route] = int(limit)
+    return limits
+
+_route_limits = parse_route_limits(ROUTE_LIMITS)
+_route_limiters = {}
+_route_limiters_lock = threading.Lock()
+
+# Per-thread state of the request being handled: when its connection was
+# accepted, its deadline, and whether it queued too long to be worth running
+_request_state = threading.local()
+
+def begin_request_deadline(accepted, route):
+    """Start the current thread's request clock from when it was accepted"""
+    exempt = REQUEST_DEADLINE_MS <= 0 or route == '/api/v1/export'
+    _request_state.deadline = None if exempt else accepted + REQUEST_DEADLINE_MS / 1000
+    _request_state.queued_too_long = (time.monotonic() - accepted) * 1000 > ADMISSION_MAX_QUEUE_MS
+
+def end_request_deadline():
+    _request_state.deadline = None
+    _request_state.queued_too_long = False
+
+def request_deadline():
+    """Monotonic deadline of the current thread's request, if it has one"""
+    return getattr(_request_state, 'deadline', None)
+
+@contextmanager
+def without_deadline():
+    """Suspend the current request's deadline, for work shared by every request"""
+    deadline = request_deadline()
+    _request_state.deadline = None
+    try:
+        yield
+    finally:
+        _request_state.deadline = deadline
+
+def route_limiter(route):
+    limiter = _route_limiters.get(route)
+    if limiter is None:
+        with _route_limiters_lock:
+            limiter = _route_limiters.setdefault(
+                route, RouteLimiter(_route_limits.get(route, ROUTE_LIMIT_DEFAULT)))
+    return limiter
+
+@contextmanager
+def admit(route):
+    """Run the block within `route`'s concurrency limit, or raise Overloaded
+
+    Meant to wrap the expensive part of a request, after any cache lookups,
+    so cached answers are still served when the route is saturated.
+    """
+    if getattr(_request_state, 'queued_too_long', False):
+        REQUESTS_SHED.inc(route, 'queued')
+        raise Overloaded('Server busy, request queued too long')
+    wait = ADMISSION_WAIT_MS / 1000
+    deadline = request_deadline()
+    if deadline is not None:
+        wait = min(wait, deadline - time.monotonic())
+    limiter = route_limiter(route)
+    if not limiter.acquire(wait):
+        REQUESTS_SHED.inc(route, 'saturated')
+        raise Overloaded(f'Server busy, {route} is at capacity')
+    try:
+        yield
+    finally:
+        limiter.release()
+
+metrics.gauge('windwalker_route_in_flight', 'Requests running per admission-controlled route', ('route',),
+              lambda: [((route,), limiter.active) for route, limiter in list(_route_limiters.items())])
+
+# ============================================================================
+# Response cache
+# ============================================================================
+
+def _json_default(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+def encode_json(data):
+    """Serialize a response payload to compact UTF-8 JSON"""
+    return json.dumps(data, default=_json_default, separators=(',', ':')).encode()
+
+def compress(body, encoding, level=None):
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=level or GZIP_LEVEL, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(body, quality=level or BROTLI_QUALITY)
+    return body
+
+def choose_encoding(accept_encoding, available):
+    """Pick the best of `available` content codings the client accepts"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        token, _, params = part.partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+
+    for encoding in available:
+        if encoding != 'identity' and accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return 'identity'
+
+class EncodedResponse:
+    """A response body encoded once, with compressed variants built on demand"""
+
+    __slots__ = ('status', 'content_type', 'body', 'variants', 'digest')
+
+    def __init__(self, body, status=200, content_type='application/json', precompress=False):
+        self.status = status
+        self.content_type = content_type
+        self.body = body
+        self.variants = {'identity': body}
+        self.digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if precompress:
+            for encoding in self.encodings:
+                self.encoded(encoding)
+
+    @property
+    def encodings(self):
+        if len(self.body) < COMPRESS_MIN_BYTES:
+            return ('identity',)
+        return ('br', 'gzip', 'identity') if brotli else ('gzip', 'identity')
+
+    def encoded(self, encoding):
+        variant = self.variants.get(encoding)
+        if variant is None:
+            variant = compress(self.body, encoding)
+            self.variants[encoding] = variant
+        return variant
+
+    def etag(self, encoding):
+        """Strong ETag for one content-coding of this body"""
+        if encoding == 'identity':
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+    def matches(self, if_none_match):
+        """Whether an If-None-Match header names any coding of this body"""
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*':
+                return True
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag.strip('"').split('-')[0] == self.digest:
+                return True
+        return False
+
+    @property
+    def size(self):
+        return sum(len(v) for v in self.variants.values())
+
+class ResponseCache:
+    """Bounded LRU of EncodedResponse objects tagged with a data version"""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] != version:
+                # Outdated entries stay until replaced or evicted, as the
+                # fallback for requests shed under load (see get_stale)
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def get_stale(self, key):
+        """The cached response for `key` whatever data version it came from"""
+        with self._lock:
+            item = self._entries.get(key)
+            return item[1] if item is not None else None
+
+    def put(self, key, version, response):
+        size = response.size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, response, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+_response_cache = ResponseCache()
+
+_data_version = {'value': None, 'checked': 0}
+_data_version_lock = threading.Lock()
+
+def _read_data_version():
+    with db_cursor() as cur:
+        execute_prepared(cur, 'data_version')
+        return cur.fetchone()['version']
+
+def current_data_version():
+    """Version string for the database-backed data, re-checked every DATA_VERSION_TTL
+
+    Returns None if the database can't be reached, which bypasses the cache.
+    A batch reads it once, for all its sub-requests, and never on the
+    batch's snapshot connection.
+    """
+    batch = getattr(_request_state, 'batch', None)
+    if batch is not None:
+        if not batch.data_version_read:
+            with outside_batch():
+                batch.data_version = current_data_version()
+            batch.data_version_read = True
+        return batch.data_version
+
+    now = time.monotonic()
+    if now - _data_version['checked'] < DATA_VERSION_TTL:
+        return _data_version['value']
+    # One thread re-checks; the rest keep using the previous value meanwhile
+    if not _data_version_lock.acquire(blocking=False):
+        return _data_version['value']
+    try:
+        # Shared by every request, so not cut short by this one's deadline
+        with without_deadline():
+            _data_version['value'] = _read_data_version()
+    except Exception:
+        _data_version['value'] = None
+    finally:
+        _data_version['checked'] = time.monotonic()
+        _data_version_lock.release()
+    return _data_version['value']
+
+def database_version():
+    """current_data_version(), qualified by the generation of the catalog
+    when there is one
+
+    A catalog reload lands a little after the database change that caused
+    it, so responses cached from the old catalog under the new data version
+    must not outlive the reload.
+    """
+    version = current_data_version()
+    catalog = _catalog['catalog']
+    if version is None or catalog is None:
+        return version
+    return f"{version}#{catalog.generation}"
+
+# Routes whose responses derive from the boundaries cache, not the database
+BOUNDARY_ROUTES = ('/api/v1/boundaries', '/api/v1/geo/point', '/api/v1/geo/bbox')
+# Derives from both the database and the boundaries cache
+TIMELINE_ROUTE = '/api/v1/treaties/timeline'
+# Routes cheap enough (or with keys diverse enough) not to be worth caching
+UNCACHED_ROUTES = ('/api/v1/geo/point', '/api/v1/suggest', '/api/v1/export')
+
+def cache_control_for(path):
+    """Cache-Control policy for a successful API response"""
+    if path in BOUNDARY_ROUTES:
+        return f'public, max-age={BOUNDARIES_MAX_AGE}, stale-while-revalidate={BOUNDARIES_TTL}'
+    if path == '/api/v1/sources':
+        return f'public, max-age={SOURCES_MAX_AGE}'
+    return f'public, max-age={API_MAX_AGE}'
+
+def response_version(path):
+    """Data version a cached response for `path` must match to be served"""
+    if path == TIMELINE_ROUTE:
+        version = database_version()
+        return None if version is None else f"db:{version}|boundaries:{boundaries_version()}"
+    if path in BOUNDARY_ROUTES:
+        version = boundaries_version()
+        return None if version is None else f"boundaries:{version}"
+    version = database_version()
+    return None if version is None else f"db:{version}"
+
+# ============================================================================
+# Static assets
+# ============================================================================
+
+# href="..." / src="..." references to a local file in an HTML page
+ASSET_REF_RE = re.compile(r'''(\b(?:href|src)=")([^"?#:]+)(")''')
+
+class StaticAssets:
+    """The files under STATIC_DIR, held in memory as EncodedResponses
+
+    HTML pages have their references to other assets rewritten to
+    `name?v=<content hash>`, so those URLs can be cached as immutable while
+    the pages themselves are revalidated on every load. The directory is
+    re-scanned at most every STATIC_CHECK_INTERVAL seconds and reloaded when
+    any file's size or mtime has changed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}  # '/path' -> (EncodedResponse, version)
+        self.stamp = None
+        self.checked = 0
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        """(path, mtime, size) of every file small enough to hold in memory"""
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for name in filenames:
+                if name.startswith('.'):
+                    continue
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                if st.st_size <= STATIC_CACHE_MAX_FILE_BYTES:
+                    path = '/' + os.path.relpath(full, self.root).replace(os.sep, '/')
+                    files.append((path, st.st_mtime_ns, st.st_size))
+        return tuple(sorted(files))
+
+    def _asset(self, path, body):
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        asset = EncodedResponse(body, content_type=content_type)
+        for encoding in asset.encodings:
+            if encoding != 'identity':
+                level = STATIC_BROTLI_QUALITY if encoding == 'br' else STATIC_GZIP_LEVEL
+                asset.variants[encoding] = compress(body, encoding, level)
+        return asset, asset.digest[:12]
+
+    def load(self):
+        started = time.time()
+        stamp = self._scan()
+        bodies = {}
+        for path, _, _ in stamp:
+            try:
+                with open(os.path.join(self.root, path.lstrip('/')), 'rb') as f:
+                    bodies[path] = f.read()
+            except OSError:
+                continue
+
+        assets = {}
+        for path, body in bodies.items():
+            if not path.endswith('.html'):
+                assets[path] = self._asset(path, body)
+
+        for path, body in bodies.items():
+            if not path.endswith('.html'):
+                continue
+            base = path.rsplit('/', 1)[0]
+
+            def versioned(match):
+                ref = match.group(2)
+                target = os.path.normpath(ref if ref.startswith('/') else f'{base}/{ref}')
+                asset = assets.get(target.replace(os.sep, '/'))
+                if asset is None:
+                    return match.group(0)
+                return f'{match.group(1)}{ref}?v={asset[1]}{match.group(3)}'
+
+            html = ASSET_REF_RE.sub(versioned, body.decode('utf-8'))
+            assets[path] = self._asset(path, html.encode('utf-8'))
+
+        self.assets = assets
+        self.stamp = stamp
+        self.checked = time.monotonic()
+        size = sum(asset.size for asset, _ in assets.values())
+        print(f"Loaded {len(assets)} static assets ({size} bytes with variants) "
+              f"from {self.root} in {time.time() - started:.2f}s")
+
+    def refresh(self):
+        """Reload if files changed since the last scan; one thread at a time"""
+        if self.stamp is not None:
+            if STATIC_CHECK_INTERVAL <= 0 or time.monotonic() - self.checked < STATIC_CHECK_INTERVAL:
+                return
+        if not self._lock.acquire(blocking=self.stamp is None):
+            return
+        try:
+            if self.stamp is None or self._scan() != self.stamp:
+                self.load()
+            self.checked = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def get(self, path):
+        """(EncodedResponse, content hash) for a URL path, or None"""
+        self.refresh()
+        return self.assets.get(path)
+
+_static_assets = StaticAssets(STATIC_DIR)
+
+# ============================================================================
+# Listings
+# ============================================================================
+
+# Fields `fields=` may select from list-view treaties and tribes
+TREATY_FIELDS = ('id', 'name', 'signed_date', 'tribes', 'status', 'certainty', 'kappler_ref')
+TRIBE_FIELDS = ('id', 'name', 'alternate_names', 'region', 'state',
+                'federally_recognized', 'treaty_count', 'certainty')
+
+NIL_UUID = '00000000-0000-0000-0000-000000000000'
+
+def encode_cursor(values):
+    """Opaque page cursor carrying the sort key of the last row sent"""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Values of a cursor from encode_cursor; ValueError if it is malformed"""
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    values = json.loads(raw)
+    if (not isinstance(values, dict) or not isinstance(values.get('t'), int)
+            or not isinstance(values.get('i'), str)):
+        raise ValueError('malformed cursor')
+    values['i'] = str(uuid.UUID(values['i']))
+    return values
+
+def parse_limit(query, default):
+    """`limit` query parameter, clamped to 1..LIST_MAX_LIMIT"""
+    return max(1, min(int(query.get('limit', [default])[0]), LIST_MAX_LIMIT))
+
+def parse_fields(query, allowed):
+    """Fields selected with `fields=a,b` (id always included), or None for all"""
+    value = query.get('fields', [''])[0]
+    if not value:
+        return None
+    fields = [f for f in value.split(',') if f]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(['id'] + fields))
+
+def project(item, fields):
+    return item if fields is None else {f: item[f] for f in fields}
+
+# ============================================================================
+# Export
+# ============================================================================
+
+# Full tables for /api/v1/export, read in storage order (one sequential
+# scan) through a server-side cursor. raw_html is left out; it is only
+# kept for reprocessing.
+EXPORT_QUERIES = {
+    'treaties': """
+        SELECT
+            t.id::text,
+            t.title,
+            t.date_signed_text,
+            t.date_signed,
+            t.date_ratified_text,
+            t.date_ratified,
+            t.date_proclaimed_text,
+            t.date_proclaimed,
+            t.tribal_parties_text AS tribes,
+            (SELECT jsonb_agg(tt.tribe_id::text) FROM treaty_tribes tt
+             WHERE tt.treaty_id = t.id) AS tribe_ids,
+            t.us_commissioners_text AS us_commissioners,
+            t.signatures_text AS signatories,
+            t.preamble,
+            t.articles_text AS articles,
+            t.statutes_at_large_citation,
+            t.kappler_volume,
+            t.kappler_page,
+            t.is_validated,
+            ds.source_id AS source,
+            t.source_url,
+            t.scraped_at,
+            t.updated_at
+        FROM raw_treaties t
+        JOIN data_sources ds ON ds.id = t.source_id
+    """,
+    'tribes': """
+        SELECT
+            r.id::text,
+            r.name,
+            r.alternate_names,
+            r.bia_id,
+            r.region,
+            r.state,
+            r.headquarters_address,
+            ST_X(r.headquarters_location) AS lng,
+            ST_Y(r.headquarters_location) AS lat,
+            r.website,
+            r.federally_recognized,
+            r.recognition_date,
+            r.treaty_count,
+            r.name_evidentiality::text AS certainty,
+            r.is_validated,
+            ds.source_id AS source,
+            r.source_url,
+            r.scraped_at,
+            r.updated_at
+        FROM raw_tribes r
+        JOIN data_sources ds ON ds.id = r.source_id
+    """,
+    'sources': """
+        SELECT source_id AS id, name, source_type::text AS type,
+               base_url, last_scraped, reliability, updated_at
+        FROM data_sources
+    """,
+}
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'geojson': 'application/geo+json',
+}
+
+def fetch_batches(cur, first):
+    """`first`, then further batches of rows from a server-side cursor"""
+    rows = first
+    while rows:
+        yield rows
+        rows = cur.fetchmany(EXPORT_BATCH_SIZE)
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, separators=(',', ':'))
+    return value
+
+def _geojson_feature(row):
+    lng, lat = row.get('lng'), row.get('lat')
+    geometry = {'type': 'Point', 'coordinates': [lng, lat]} if lng is not None else None
+    return encode_json({'type': 'Feature', 'id': row['id'], 'geometry': geometry, 'properties': row})
+
+def export_chunks(fmt, columns, batches):
+    """Encoded export body, one chunk per batch of rows
+
+    GeoJSON features carry a point where the row has lng/lat (tribe
+    headquarters) and a null geometry otherwise.
+    """
+    if fmt == 'ndjson':
+        for rows in batches:
+            yield b''.join(encode_json(row) + b'\n' for row in rows)
+    elif fmt == 'csv':
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(columns)
+        for rows in batches:
+            writer.writerows([_csv_value(row[c]) for c in columns] for row in rows)
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue().encode('utf-8')
+    else:
+        yield b'{"type":"FeatureCollection","features":['
+        separator = b''
+        for rows in batches:
+            yield separator + b','.join(_geojson_feature(row) for row in rows)
+            separator = b','
+        yield b']}'
+
+# ============================================================================
+# Timeline
+# ============================================================================
+
+def treaty_tribes(row):
+    """Treaty parties, with the raw_tribes id where link_tribes.py resolved one
+
+    Unresolved parties keep their name as the id, as before linking existed.
+    """
+    linked = {}
+    for link in row.get('tribe_links') or []:
+        linked.setdefault(link['party'], []).append(link['id'])
+    tribes = []
+    for name in row['tribes'] or []:
+        for tribe_id in linked.get(name, [name]):
+            tribes.append({'id': tribe_id, 'name': name})
+    return tribes
+
+def treaty_summary(row):
+    """List-view representation of a treaty row"""
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'signed_date': row['signed_date'],
+        'tribes': treaty_tribes(row),
+        'status': row['status'],
+        'certainty': row['certainty'],
+        'kappler_ref': f"Kappler Vol. {row['kappler_volume']}, p. {row['kappler_page']}" if row['kappler_volume'] else None
+    }
+
+def _slice_delta(items, start, end):
+    """(added, removed) when the visible prefix of `items` moves from `start` to `end`"""
+    if end >= start:
+        return items[start:end], []
+    return [], items[end:start]
+
+class TimelineIndex:
+    """Treaties and boundary features sorted by year
+
+    What the year slider shows at a given year is a prefix of each sorted
+    list (plus, for boundaries, the undated features at TIMELINE_LAST_YEAR),
+    so the difference between two years is found with two bisects and is
+    returned without looking at anything that didn't change.
+    """
+
+    def __init__(self, treaties, years, boundaries=None):
+        # List-view treaties in signing order, and their signing years
+        self.treaties = treaties
+        self.treaty_ids = [t['id'] for t in treaties]
+        self.treaty_years = years
+
+        self.has_boundaries = boundaries is not None
+        dated = []
+        self.undated_ids = []
+        if boundaries is not None:
+            for i, year in enumerate(boundaries.years):
+                if year is None:
+                    self.undated_ids.append(boundaries.ids[i])
+                else:
+                    dated.append((year, i))
+            dated.sort()
+        self.boundary_years = [year for year, _ in dated]
+        self.boundary_ids = [boundaries.ids[i] for _, i in dated]
+
+    def _treaty_cut(self, year):
+        # Mirrors the year_end filter of /api/v1/treaties: undated never shown
+        return 0 if year is None else bisect_right(self.treaty_years, year)
+
+    def _boundary_cut(self, year):
+        # Mirrors filterBoundariesByYear in app.js: (prefix length, undated shown)
+        if year is None:
+            return 0, False
+        if year >= TIMELINE_LAST_YEAR:
+            return len(self.boundary_ids), True
+        return bisect_right(self.boundary_years, year), False
+
+    def delta(self, from_year, to_year):
+        """What changes when the slider moves from `from_year` (None: nothing shown) to `to_year`"""
+        start, end = self._treaty_cut(from_year), self._treaty_cut(to_year)
+        added, _ = _slice_delta(self.treaties, start, end)
+        _, removed = _slice_delta(self.treaty_ids, start, end)
+        result = {'treaties': {'added': added, 'removed': removed, 'total': end}}
+
+        if not self.has_boundaries:
+            result['boundaries'] = None
+            return result
+        (start, start_undated), (end, end_undated) = self._boundary_cut(from_year), self._boundary_cut(to_year)
+        added, removed = _slice_delta(self.boundary_ids, start, end)
+        if end_undated and not start_undated:
+            added = added + self.undated_ids
+        elif start_undated and not end_undated:
+            removed = removed + self.undated_ids
+        result['boundaries'] = {
+            'added': added,
+            'removed': removed,
+            'total': end + (len(self.undated_ids) if end_undated else 0),
+        }
+        return result
+
+_timeline = {'key': None, 'index': None}
+_timeline_lock = threading.Lock()
+
+def get_timeline():
+    """Timeline index for the current database and boundaries versions
+
+    Rebuilt (from the catalog, or one query, plus a sort) only when either
+    version changes. The boundaries are taken from the cache as they are; a
+    cold boundaries cache doesn't hold up the treaty timeline.
+    """
+    db_version = database_version()
+    # Version before index: a concurrent install then only causes a rebuild
+    key = (db_version, boundaries_version())
+    boundaries = _boundaries_cache['index']
+    if db_version is not None and _timeline['key'] == key:
+        return _timeline['index']
+
+    with _timeline_lock:
+        if db_version is not None and _timeline['key'] == key:
+            return _timeline['index']
+        catalog = get_catalog()
+        if catalog is not None:
+            index = TimelineIndex([t.summary() for t in catalog.dated],
+                                  catalog.dated_years, boundaries)
+        else:
+            with db_cursor() as cur:
+                execute_prepared(cur, 'treaty_timeline')
+                rows = cur.fetchall()
+            index = TimelineIndex([treaty_summary(row) for row in rows],
+                                  [row['year'] for row in rows], boundaries)
+        if db_version is not None:
+            _timeline['key'] = key
+            _timeline['index'] = index
+    return index
+
+# ============================================================================
+# Treaty catalog
+# ============================================================================
+
+CATALOG_QUERIES = {
+    'treaties': """
+        SELECT""" + TREATY_DETAIL_COLUMNS + """
+        FROM raw_treaties t
+        JOIN data_sources ds ON t.source_id = ds.id
+    """,
+    # In listing order: Catalog keeps the database's collation order of names
+    'tribes': """
+        SELECT * FROM raw_tribes ORDER BY name, id
+    """,
+}
+
+# The tables (as named in NOTIFY payloads) each half of the catalog is read from
+CATALOG_TREATY_TABLES = frozenset({'raw_treaties', 'treaty_tribes', 'data_sources'})
+CATALOG_TRIBE_TABLES = frozenset({'raw_tribes'})
+
+_catalog = {'catalog': None, 'generation': 0, 'failed_at': None, 'listener': None}
+# Held for a whole load, so loads never install out of order
+_catalog_lock = threading.Lock()
+
+def _load_catalog_locked(changed=None):
+    previous = _catalog['catalog']
+    everything = previous is None or changed is None
+    reload_treaties = everything or not changed <= CATALOG_TRIBE_TABLES
+    reload_tribes = everything or not changed <= CATALOG_TREATY_TABLES
+
+    started = time.perf_counter()
+    sources = {}
+    # Shared by every request, so not cut short by this one's deadline
+    with without_deadline(), db_snapshot() as conn, conn.cursor() as cur:
+        if reload_treaties:
+            cur.execute(CATALOG_QUERIES['treaties'])
+            treaties = []
+            for row in cur:
+                source = (row['source_name'], float(row['source_reliability']))
+                treaties.append(TreatyRecord(row, treaty_tribes(row), sources.setdefault(source, source)))
+        else:
+            treaties = list(previous.treaties.values())
+        if reload_tribes:
+            cur.execute(CATALOG_QUERIES['tribes'])
+            columns = [column.name for column in cur.description]
+            tribes = [TribeRecord(row) for row in cur]
+        else:
+            tribes, columns = previous.tribe_order, previous.tribe_columns
+    _catalog['generation'] += 1
+    catalog = Catalog(treaties, tribes, columns, _catalog['generation'])
+    _catalog['catalog'] = catalog
+    _catalog['failed_at'] = None
+    reloaded = ' and '.join(name for name, done in (('treaties', reload_treaties), ('tribes', reload_tribes)) if done)
+    print(f"Loaded catalog of {len(treaties)} treaties and {len(tribes)} tribes "
+          f"(read {reloaded}) in {time.perf_counter() - started:.2f}s")
+    return catalog
+
+def reload_catalog(changed=None):
+    """Install a fresh Catalog, read from one snapshot
+
+    `changed` is the set of tables that changed (None: all of them). The
+    treaties or the tribes are only read again if one of their tables
+    changed; otherwise the current records are carried over.
+    """
+    with _catalog_lock:
+        return _load_catalog_locked(changed)
+
+def get_catalog():
+    """The current catalog, loaded on first use
+
+    None when CATALOG is off or the database couldn't be read; callers then
+    query the database themselves. A failed load is retried at most every
+    CATALOG_RETRY_INTERVAL, so an unreachable database doesn't cost every
+    request a load attempt.
+    """
+    catalog = _catalog['catalog']
+    if catalog is not None or not CATALOG:
+        return catalog
+    with _catalog_lock:
+        failed_at = _catalog['failed_at']
+        if _catalog['catalog'] is None and (
+                failed_at is None or time.monotonic() - failed_at >= CATALOG_RETRY_INTERVAL):
+            try:
+                _load_catalog_locked()
+            except Exception as e:
+                _catalog['failed_at'] = time.monotonic()
+                print(f"Catalog load failed: {e}")
+        return _catalog['catalog']
+
+def _watch_catalog(conn, notified):
+    """Reload the catalog whenever `conn` (LISTENing) hears of a change;
+    returns only by raising"""
+    version = None
+    if not notified:
+        with conn.cursor() as cur:
+            cur.execute(PREPARED_QUERIES['data_version'][1])
+            version = cur.fetchone()[0]
+    # Changes committed before LISTEN took effect would otherwise be missed
+    reload_catalog()
+
+    # When the first and the latest unhandled change arrived, and the tables
+    # it touched (None: unknown, so everything)
+    first = last = None
+    changed = set()
+    while True:
+        if first is None:
+            timeout = CATALOG_PING_INTERVAL if notified else DATA_VERSION_TTL
+        else:
+            timeout = max(0.0, min(last + CATALOG_DEBOUNCE, first + CATALOG_MAX_DELAY) - time.monotonic())
+        readable, _, _ = select.select([conn], [], [], timeout)
+        now = time.monotonic()
+        if readable:
+            conn.poll()
+            if conn.notifies:
+                if changed is not None:
+                    changed.update(notify.payload for notify in conn.notifies)
+                conn.notifies.clear()
+                first = now if first is None else first
+                last = now
+        elif first is None:
+            # Also notices a connection that died quietly
+            with conn.cursor() as cur:
+                if notified:
+                    cur.execute('SELECT 1')
+                else:
+                    cur.execute(PREPARED_QUERIES['data_version'][1])
+                    current = cur.fetchone()[0]
+                    if current != version:
+                        version = current
+                        first = last = now
+                        changed = None
+        if first is not None and now >= min(last + CATALOG_DEBOUNCE, first + CATALOG_MAX_DELAY):
+            reload_catalog(changed)
+            first = last = None
+            changed = set()
+
+def listen_for_catalog_changes():
+    """Catalog listener thread: keeps the catalog in step with the database
+
+    Listens on CATALOG_CHANNEL, which the triggers from migration 006 notify
+    at the end of any statement that changes treaties, tribes, their links
+    or data sources, and reloads the catalog once the notifications settle.
+    Without the triggers it polls the data version instead. After losing
+    its connection it reconnects and reloads, in case it missed anything.
+    """
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(DATABASE_URL)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CATALOG_CHANNEL}")
+                cur.execute("SELECT to_regproc('notify_catalog_change') IS NOT NULL")
+                notified = cur.fetchone()[0]
+            if not notified:
+                print("Catalog change notifications not installed (migration 006); "
+                      f"polling for changes every {DATA_VERSION_TTL:.0f}s")
+            _watch_catalog(conn, notified)
+        except Exception as e:
+            print(f"Catalog listener failed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+        time.sleep(CATALOG_RETRY_INTERVAL)
+
+def start_catalog():
+    """Start the catalog listener, which also does the initial load"""
+    if not CATALOG or _catalog['listener'] is not None:
+        return
+    _catalog['listener'] = threading.Thread(
+        target=listen_for_catalog_changes, name='catalog-listener', daemon=True)
+    _catalog['listener'].start()
+
+def _catalog_records():
+    catalog = _catalog['catalog']
+    if catalog is None:
+        return []
+    return [(('treaties',), len(catalog.treaties)), (('tribes',), len(catalog.tribes))]
+
+metrics.gauge('windwalker_catalog_records', 'Rows held by the in-memory treaty catalog', ('table',),
+              _catalog_records)
+
+# ============================================================================
+# Autocomplete
+# ============================================================================
+
+_suggest = {'index': None, 'version': None, 'building': False}
+_suggest_lock = threading.Lock()
+
+def build_suggest_index():
+    """Load every treaty and tribe name and install a fresh SuggestIndex"""
+    version = current_data_version()
+    with db_cursor() as cur:
+        execute_prepared(cur, 'suggest_entries')
+        rows = cur.fetchall()
+    index = SuggestIndex((row['entity_type'], row['id'], row['text']) for row in rows)
+    _suggest['index'] = index
+    _suggest['version'] = version
+    return index
+
+def refresh_suggest_async():
+    """Rebuild the autocomplete index in the background, one build at a time"""
+    with _suggest_lock:
+        if _suggest['building']:
+            return
+        _suggest['building'] = True
+
+    def run():
+        try:
+            index = build_suggest_index()
+            print(f"Built autocomplete index over {len(index)} names")
+        except Exception as e:
+            print(f"Autocomplete index build failed: {e}")
+        finally:
+            _suggest['building'] = False
 
-def get_db():
-    """Get database connection"""
-    return psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    threading.Thread(target=run, name='suggest-build', daemon=True).start()
+
+def get_suggest_index():
+    """Current autocomplete index; stale ones keep serving while a rebuild runs
+
+    Only the first request after startup (if the startup build failed)
+    waits for the database.
+    """
+    index = _suggest['index']
+    if index is None:
+        with _suggest_lock:
+            if _suggest['index'] is None:
+                return build_suggest_index()
+        return _suggest['index']
+    version = current_data_version()
+    if version is not None and version != _suggest['version']:
+        refresh_suggest_async()
+    return index
+
+# ============================================================================
+# Vector tiles
+# ============================================================================
+
+TILE_LAYERS = ('treaties', 'tribes', 'boundaries')
+TILE_PATH_RE = re.compile(r'^/tiles/([a-z]+)/(\d+)/(\d+)/(\d+)\.mvt$')
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+_tile_memory = ResponseCache(TILE_CACHE_MAX_ENTRIES, TILE_CACHE_MAX_BYTES)
+_tile_dirs_pruned = set()
+
+def _treaty_geometries_exist(cur):
+    execute_prepared(cur, 'treaty_geometries_exist')
+    return cur.fetchone()['present']
+
+def render_tile(layer, z, x, y, shapes=None):
+    """Render one tile, returning (uncompressed MVT bytes, feature count)"""
+    bbox = mvt.buffered_tile_bbox(z, x, y)
+    out = mvt.Layer(layer)
+
+    if layer == 'boundaries':
+        index = shapes.index
+        for i in index.query_bbox(*bbox):
+            polygons = mvt.tile_polygons(shapes.projected(i, z), z, x, y)
+            if not polygons:
+                continue
+            props = index.features[i].get('properties') or {}
+            fid = index.ids[i]
+            out.add_feature(mvt.GEOM_POLYGON, mvt.encode_polygon_geometry(polygons), {
+                'id': str(fid),
+                'name': props.get('Name'),
+                'year': index.years[i],
+                'color': props.get('color'),
+            }, fid if isinstance(fid, int) else None)
+
+    elif layer == 'tribes':
+        with db_cursor() as cur:
+            execute_prepared(cur, 'tribe_points', bbox)
+            rows = cur.fetchall()
+        for row in rows:
+            point = mvt.tile_point(row['lng'], row['lat'], z, x, y)
+            out.add_feature(mvt.GEOM_POINT, mvt.encode_point_geometry([point]), {
+                'id': row['id'],
+                'name': row['name'],
+                'state': row['state'],
+                'federally_recognized': row['federally_recognized'],
+            })
+
+    elif layer == 'treaties':
+        with db_cursor() as cur:
+            rows = []
+            if _treaty_geometries_exist(cur):
+                execute_prepared(cur, 'treaty_shapes', (*bbox, mvt.simplify_for_zoom(z)))
+                rows = cur.fetchall()
+        for row in rows:
+            geometry = json.loads(row['geometry']) if row['geometry'] else {}
+            if geometry.get('type') == 'Polygon':
+                polygons = [geometry['coordinates']]
+            elif geometry.get('type') == 'MultiPolygon':
+                polygons = geometry['coordinates']
+            else:
+                continue
+            polygons = mvt.tile_polygons(mvt.project_polygons(polygons), z, x, y)
+            if polygons:
+                out.add_feature(mvt.GEOM_POLYGON, mvt.encode_polygon_geometry(polygons), {
+                    'id': row['id'],
+                    'name': row['name'],
+                    'signed_year': row['signed_year'],
+                    'status': row['status'],
+                    'certainty': row['certainty'],
+                })
+
+    return mvt.encode_tile([out]), len(out)
+
+def _tile_path(layer, tag, z, x, y):
+    return os.path.join(TILE_CACHE_DIR, layer, tag, str(z), str(x), f"{y}.mvt.gz")
+
+def _write_tile_file(layer, tag, z, x, y, compressed):
+    if (layer, tag) not in _tile_dirs_pruned:
+        # Tiles rendered from older data are never served again
+        layer_dir = os.path.join(TILE_CACHE_DIR, layer)
+        if os.path.isdir(layer_dir):
+            for name in os.listdir(layer_dir):
+                if name != tag:
+                    shutil.rmtree(os.path.join(layer_dir, name), ignore_errors=True)
+        _tile_dirs_pruned.add((layer, tag))
+
+    path = _tile_path(layer, tag, z, x, y)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write tile {path}: {e}")
+
+def get_tile(layer, z, x, y):
+    """Return a tile as an EncodedResponse, rendering only on a cache miss
+
+    Lookup order is the in-memory LRU, then the on-disk cache, then a fresh
+    render. Non-empty rendered tiles are written back to disk gzipped.
+    """
+    shapes = None
+    if layer == 'boundaries':
+        get_boundaries_data()
+        shapes = _boundaries_cache['shapes']
+        tag = shapes.tag
+    else:
+        version = current_data_version()
+        if version is None:
+            raise RuntimeError('Database unavailable')
+        tag = content_digest(version.encode())
+
+    key = (layer, z, x, y)
+    tile = _tile_memory.get(key, tag)
+    if tile is not None:
+        CACHE_LOOKUPS.inc('tiles', 'memory_hit')
+        return tile
+
+    try:
+        with open(_tile_path(layer, tag, z, x, y), 'rb') as f:
+            compressed = f.read()
+        tile = EncodedResponse(gzip.decompress(compressed), content_type=MVT_CONTENT_TYPE)
+        tile.variants['gzip'] = compressed
+        CACHE_LOOKUPS.inc('tiles', 'disk_hit')
+    except (OSError, EOFError):
+        CACHE_LOOKUPS.inc('tiles', 'miss')
+        with admit(f'/tiles/{layer}'):
+            body, count = render_tile(layer, z, x, y, shapes)
+        tile = EncodedResponse(body, content_type=MVT_CONTENT_TYPE, precompress=True)
+        if count:
+            _write_tile_file(layer, tag, z, x, y, tile.encoded('gzip'))
+
+    _tile_memory.put(key, tag, tile)
+    return tile
+
+def layer_extent(layer):
+    """Geographic extent of a tile layer's data, or None if it has none"""
+    if layer == 'boundaries':
+        boxes = [b for b in get_boundary_index().bboxes if b]
+        if not boxes:
+            return None
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+    with db_cursor() as cur:
+        if layer == 'treaties':
+            if not _treaty_geometries_exist(cur):
+                return None
+            execute_prepared(cur, 'treaty_extent')
+        else:
+            execute_prepared(cur, 'tribe_extent')
+        row = cur.fetchone()
+    if row is None or row['min_lng'] is None:
+        return None
+    return (row['min_lng'], row['min_lat'], row['max_lng'], row['max_lat'])
+
+def seed_tiles(max_zoom, layers=TILE_LAYERS):
+    """Pre-render every tile over each layer's extent for zooms 0..max_zoom"""
+    max_zoom = min(max_zoom, mvt.MAX_ZOOM)
+    for layer in layers:
+        try:
+            extent = layer_extent(layer)
+        except Exception as e:
+            print(f"  {layer}: skipped ({e})")
+            continue
+        if extent is None:
+            print(f"  {layer}: no data, skipped")
+            continue
+        for z in range(max_zoom + 1):
+            started = time.time()
+            rendered = 0
+            x0, y0, x1, y1 = mvt.tiles_covering(extent, z)
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    if layer == 'boundaries' and not get_boundary_index().query_bbox(
+                            *mvt.buffered_tile_bbox(z, x, y)):
+                        continue
+                    get_tile(layer, z, x, y)
+                    rendered += 1
+            print(f"  {layer} z{z}: {rendered} tiles in {time.time() - started:.1f}s")
+
+# Routes reported under their own path in metrics
+METRIC_ROUTES = frozenset({
+    '/api/v1/treaties', TIMELINE_ROUTE, '/api/v1/tribes', '/api/v1/search', '/api/v1/suggest',
+    '/api/v1/sources', '/api/v1/export', '/api/v1/boundaries', '/api/v1/geo/point',
+    '/api/v1/geo/bbox', '/api/v1/batch', '/health', '/metrics',
+})
+
+def route_label(path):
+    """Metric label for a request path, with ids and tile coordinates
+    collapsed so the number of series stays bounded"""
+    if path in METRIC_ROUTES:
+        return path
+    if path.startswith('/tiles/'):
+        match = TILE_PATH_RE.match(path)
+        return f'/tiles/{match.group(1)}' if match and match.group(1) in TILE_LAYERS else '/tiles/other'
+    if path.startswith('/api/v1/treaties/'):
+        return '/api/v1/treaties/{id}'
+    if path.startswith('/api/v1/tribes/'):
+        return '/api/v1/tribes/{id}/treaties' if path.endswith('/treaties') else '/api/v1/tribes/{id}'
+    if path.startswith('/api/'):
+        return '/api/other'
+    return 'static'
+
+class CountingWriter:
+    """Wraps a handler's wfile, counting the bytes written through it"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.count = 0
+
+    def write(self, data):
+        self.count += len(data)
+        return self.raw.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
 
 class WindwalkerHandler(SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
     def __init__(self, *args, **kwargs):
         # Serve static files from web/dist
         super().__init__(*args, directory=STATIC_DIR, **kwargs)
 
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
+        self.requests_handled = 0
+        self._subrequest = False
+
+    def handle_one_request(self):
+        if not self.wait_for_request():
+            # Dropped quietly rather than logged as a timeout
+            self.close_connection = True
+            return
+        # Bounds how long the request line and headers may take to arrive
+        self.connection.settimeout(KEEPALIVE_TIMEOUT)
+        super().handle_one_request()
+
+    def wait_for_request(self):
+        """Wait up to KEEPALIVE_TIMEOUT for the next request to start arriving
+
+        The wait is in KEEPALIVE_POLL_INTERVAL slices, and a kept-alive
+        connection gives its thread up early when other connections are
+        queued for one or the server is draining. Returns False when the
+        connection should be closed instead.
+        """
+        try:
+            # Already buffered (a pipelined request) or already sent
+            self.connection.setblocking(False)
+            try:
+                if self.rfile.peek(1):
+                    return True
+            finally:
+                self.connection.setblocking(True)
+            idle_until = time.monotonic() + KEEPALIVE_TIMEOUT
+            while True:
+                readable, _, _ = select.select([self.connection], [], [], KEEPALIVE_POLL_INTERVAL)
+                if readable:
+                    # Readable with nothing to read is the client closing
+                    return bool(self.rfile.peek(1))
+                if time.monotonic() >= idle_until:
+                    return False
+                if self.requests_handled and (self.server.draining or self.server.queued > 0):
+                    return False
+        except (OSError, ValueError):
+            return False
+
+    def parse_request(self):
+        ok = super().parse_request()
+        # Headers are in; responses may take as long as they need to write
+        self.connection.settimeout(None)
+        if ok and self.request_version != 'HTTP/1.1':
+            # HTTP/1.0 keep-alive would need the header echoed; not worth it
+            self.close_connection = True
+        return ok
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+        if self.close_connection and self.request_version == 'HTTP/1.1':
+            self.send_header('Connection', 'close')
+
     def do_GET(self):
+        self.handle_timed(self.route_get)
+
+    def do_POST(self):
+        self.handle_timed(self.route_post)
+
+    def handle_timed(self, route):
+        """Run `route` under the request's deadline, recording its metrics"""
+        self.requests_handled += 1
+        if (self.requests_handled >= KEEPALIVE_MAX_REQUESTS
+                or self.server.queued > 0 or self.server.draining):
+            # Free this thread for a waiting connection (or for shutdown)
+            # after this response
+            self.close_connection = True
+        started = time.perf_counter()
+        written = self.wfile.count
+        self._status = None
+        metrics.begin_request(keep_statements=SLOW_REQUEST_MS > 0)
+        path = urlparse(self.path).path
+        # The deadline runs from accept, so time spent queued counts against it
+        accepted = getattr(_request_state, 'accepted_at', None) or time.monotonic()
+        _request_state.accepted_at = None
+        begin_request_deadline(accepted, route_label(path))
+        try:
+            route()
+        finally:
+            end_request_deadline()
+            self.record_request(path, time.perf_counter() - started, self.wfile.count - written)
+
+    def record_request(self, path, seconds, size):
+        """Update the request metrics, and log the request if it was slow"""
+        route = route_label(path)
+        status = str(self._status or 0)
+        db_seconds, statements = metrics.end_request()
+        HTTP_REQUEST_DURATION.observe(seconds, route, self.command, status)
+        HTTP_REQUEST_DB_TIME.observe(db_seconds, route)
+        HTTP_RESPONSE_BYTES.observe(size, route)
+
+        if SLOW_REQUEST_MS > 0 and seconds * 1000 >= SLOW_REQUEST_MS:
+            lines = [f"[{self.log_date_time_string()}] SLOW {seconds * 1000:.1f}ms "
+                     f"(db {db_seconds * 1000:.1f}ms, {len(statements or [])} statements) "
+                     f"{self.command} {self.path} -> {status}"]
+            for statement, elapsed in statements or []:
+                if isinstance(statement, bytes):
+                    statement = statement.decode('utf-8', 'replace')
+                statement = ' '.join(statement.split())
+                if len(statement) > SLOW_LOG_SQL_CHARS:
+                    statement = statement[:SLOW_LOG_SQL_CHARS] + '...'
+                lines.append(f"    {elapsed * 1000:8.1f}ms  {statement}")
+            print('\n'.join(lines))
+
+    def route_get(self):
+        self._cache_store = None
+        self._cache_control = 'no-store'
         parsed = urlparse(self.path)
         path = parsed.path
         query = parse_qs(parsed.query)
@@ -45,206 +2397,401 @@ class WindwalkerHandler(SimpleHTTPRequestHandler):
         # API routes
         if path.startswith('/api/v1/'):
             self.handle_api(path, query)
+        elif path.startswith('/tiles/'):
+            self.handle_tile(path)
         elif path == '/health':
-            self.send_json({'status': 'healthy', 'database': 'connected'})
+            self.health()
+        elif path == '/metrics':
+            self.send_encoded(EncodedResponse(metrics.render().encode('utf-8'),
+                                              content_type=metrics.CONTENT_TYPE))
         else:
-            # Check if it's a static file (has extension)
-            if '.' in path.split('/')[-1]:
-                # Serve static files
+            # SPA fallback: serve index.html for client-side routes
+            if '.' not in path.split('/')[-1]:
+                path = self.path = '/index.html'
+            cached = _static_assets.get(unquote(path))
+            CACHE_LOOKUPS.inc('static', 'miss' if cached is None else 'hit')
+            if cached is None:
+                # Too large to hold in memory (or created since the last scan)
                 super().do_GET()
             else:
-                # SPA fallback: serve index.html for client-side routes
-                self.path = '/index.html'
-                super().do_GET()
+                self.send_static(*cached, query)
+
+    def route_post(self):
+        self._cache_store = None
+        self._cache_control = 'no-store'
+        if urlparse(self.path).path == '/api/v1/batch':
+            self.batch()
+        else:
+            # The body is left unread, so the connection can't be reused
+            self.close_connection = True
+            self.send_json({'error': 'Not found'}, 404)
+
+    def read_body(self, limit):
+        """The request body, or None (closing the connection, since the body
+        is left unread) when it is missing or longer than `limit` bytes"""
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= limit:
+            self.close_connection = True
+            return None
+        return self.rfile.read(length)
+
+    def batch(self):
+        """POST /api/v1/batch: several GET /api/v1/* requests in one round trip
+
+        The body is {"requests": [{"path": "/api/v1/..."}, ...]} and the answer
+        {"responses": [{"path", "status", "body"}, ...]} in the same order.
+        Sub-requests go through the response cache and admission control
+        like any other request. Those that need the database share one
+        connection and one consistent snapshot.
+        """
+        raw = self.read_body(BATCH_MAX_BODY_BYTES)
+        if raw is None:
+            self.send_json({'error': f'Request body required, at most {BATCH_MAX_BODY_BYTES} bytes'}, 413)
+            return
+        try:
+            requests = json.loads(raw)['requests']
+            paths = [item['path'] for item in requests]
+        except (ValueError, KeyError, TypeError):
+            self.send_json({'error': 'Expected {"requests": [{"path": "/api/v1/..."}, ...]}'}, 400)
+            return
+        if not 0 < len(paths) <= BATCH_MAX_REQUESTS:
+            self.send_json({'error': f'Between 1 and {BATCH_MAX_REQUESTS} requests per batch'}, 400)
+            return
+        for path in paths:
+            route = urlparse(path).path if isinstance(path, str) else ''
+            if not route.startswith('/api/v1/') or route in ('/api/v1/batch', '/api/v1/export'):
+                self.send_json({'error': f'Cannot batch {path!r}'}, 400)
+                return
+
+        parts = []
+        snapshot = _request_state.batch = BatchSnapshot()
+        try:
+            for path in paths:
+                response = self.run_subrequest(path)
+                snapshot.end_item()
+                parts.append(b'{"path":%s,"status":%d,"body":%s}' % (
+                    encode_json(path), response.status, response.body))
+        except Overloaded as e:
+            self.send_overloaded(str(e))
+            return
+        except (psycopg2.errors.QueryCanceled, PoolError):
+            REQUESTS_SHED.inc('/api/v1/batch', 'deadline')
+            self.send_overloaded('Server busy, request deadline exceeded')
+            return
+        except Exception as e:
+            self.send_json({'error': str(e)}, 500)
+            return
+        finally:
+            _request_state.batch = None
+            snapshot.close()
+
+        self._cache_store = None
+        self._cache_control = 'no-store'
+        self.send_encoded(EncodedResponse(b'{"responses":[' + b','.join(parts) + b']}'))
+
+    def run_subrequest(self, path):
+        """Handle one batched GET, returning its response instead of sending it"""
+        parsed = urlparse(path)
+        outer_path, self.path = self.path, path
+        self._subrequest = True
+        self._captured = None
+        self._cache_store = None
+        try:
+            self.handle_api(parsed.path, parse_qs(parsed.query))
+        finally:
+            self._subrequest = False
+            self.path = outer_path
+        return self._captured
+
+    def health(self):
+        """GET /health: pings the database through the pool"""
+        started = time.perf_counter()
+        try:
+            with db_cursor() as cur:
+                cur.execute('SELECT 1')
+        except Exception as e:
+            self.send_json({'status': 'unhealthy', 'database': 'unavailable', 'error': str(e)}, 503)
+            return
+        self.send_json({
+            'status': 'healthy',
+            'database': 'connected',
+            'database_ms': round((time.perf_counter() - started) * 1000, 1),
+        })
 
     def handle_api(self, path, query):
+        self._cache_control = cache_control_for(path)
+        key = (path, urlencode(sorted((k, v) for k, vs in query.items() for v in vs)))
+        version = None if path in UNCACHED_ROUTES else response_version(path)
+        if version is not None:
+            cached = _response_cache.get(key, version)
+            CACHE_LOOKUPS.inc('responses', 'miss' if cached is None else 'hit')
+            if cached is not None:
+                self.send_encoded(cached)
+                return
+            self._cache_store = (key, version)
+
         try:
-            if path == '/api/v1/treaties':
-                self.get_treaties(query)
-            elif path.startswith('/api/v1/treaties/') and not path.endswith('/geometry'):
-                treaty_id = path.split('/')[-1]
-                self.get_treaty(treaty_id)
-            elif path == '/api/v1/tribes':
-                self.get_tribes(query)
-            elif path.startswith('/api/v1/tribes/'):
-                tribe_id = path.split('/')[-1]
-                self.get_tribe(tribe_id)
-            elif path == '/api/v1/search':
-                self.search(query)
-            elif path == '/api/v1/sources':
-                self.get_sources()
-            elif path == '/api/v1/boundaries':
-                self.get_boundaries()
-            else:
-                self.send_json({'error': 'Not found'}, 404)
+            with admit(route_label(path)):
+                self.route_api(path, query)
+        except Overloaded as e:
+            self.send_overloaded(str(e), key)
+        except (psycopg2.errors.QueryCanceled, PoolError):
+            REQUESTS_SHED.inc(route_label(path), 'deadline')
+            self.send_overloaded('Server busy, request deadline exceeded', key)
         except Exception as e:
             self.send_json({'error': str(e)}, 500)
 
+    def route_api(self, path, query):
+        if path == '/api/v1/treaties':
+            self.get_treaties(query)
+        elif path == TIMELINE_ROUTE:
+            self.get_timeline(query)
+        elif path.startswith('/api/v1/treaties/') and not path.endswith('/geometry'):
+            treaty_id = path.split('/')[-1]
+            self.get_treaty(treaty_id)
+        elif path == '/api/v1/tribes':
+            self.get_tribes(query)
+        elif path.startswith('/api/v1/tribes/') and path.endswith('/treaties'):
+            tribe_id = path.split('/')[-2]
+            self.get_tribe_treaties(tribe_id)
+        elif path.startswith('/api/v1/tribes/'):
+            tribe_id = path.split('/')[-1]
+            self.get_tribe(tribe_id)
+        elif path == '/api/v1/search':
+            self.search(query)
+        elif path == '/api/v1/suggest':
+            self.suggest(query)
+        elif path == '/api/v1/sources':
+            self.get_sources()
+        elif path == '/api/v1/export':
+            self.export(query)
+        elif path == '/api/v1/boundaries':
+            self.get_boundaries(query)
+        elif path == '/api/v1/geo/point':
+            self.geo_point(query)
+        elif path == '/api/v1/geo/bbox':
+            self.geo_bbox(query)
+        else:
+            self.send_json({'error': 'Not found'}, 404)
+
+    def handle_tile(self, path):
+        """GET /tiles/{layer}/{z}/{x}/{y}.mvt"""
+        match = TILE_PATH_RE.match(path)
+        if not match:
+            self.send_json({'error': 'Not found'}, 404)
+            return
+        layer = match.group(1)
+        z, x, y = (int(v) for v in match.groups()[1:])
+
+        if layer not in TILE_LAYERS:
+            self.send_json({'error': 'Unknown layer'}, 404)
+            return
+        if z > mvt.MAX_ZOOM:
+            self.send_json({'error': 'Zoom level too high'}, 400)
+            return
+        if x >= (1 << z) or y >= (1 << z):
+            self.send_json({'error': 'Tile coordinates out of range'}, 400)
+            return
+
+        try:
+            tile = get_tile(layer, z, x, y)
+        except Overloaded as e:
+            self.send_overloaded(str(e))
+            return
+        except (psycopg2.errors.QueryCanceled, PoolError):
+            REQUESTS_SHED.inc(route_label(path), 'deadline')
+            self.send_overloaded('Server busy, request deadline exceeded')
+            return
+        except Exception as e:
+            self.send_json({'error': f'Tile generation error: {str(e)}'}, 500)
+            return
+
+        self._cache_control = f'public, max-age={TILE_MAX_AGE}'
+        self.send_encoded(tile)
+
     def get_treaties(self, query):
-        conn = get_db()
-        cur = conn.cursor()
-
-        # Year filter parameters
-        year = query.get('year', [None])[0]
-        year_end = query.get('year_end', [None])[0]
-
-        params = []
-        where_clauses = []
-
-        if year:
-            where_clauses.append("EXTRACT(YEAR FROM date_signed) >= %s")
-            params.append(int(year))
-        if year_end:
-            where_clauses.append("EXTRACT(YEAR FROM date_signed) <= %s")
-            params.append(int(year_end))
-
-        where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
-
-        sql = f"""
-            SELECT
-                id::text,
-                title as name,
-                date_signed::text as signed_date,
-                tribal_parties_text as tribes,
-                CASE WHEN is_validated THEN 'Active' ELSE 'Unknown' END as status,
-                CASE WHEN is_validated THEN 'Verified' ELSE 'Reported' END as certainty,
-                kappler_volume,
-                kappler_page
-            FROM raw_treaties
-            {where_sql}
-            ORDER BY date_signed ASC NULLS LAST
-            LIMIT 500
+        """GET /api/v1/treaties?year=&year_end=&limit=&cursor=&fields=
+
+        Treaties in signing order, undated ones last, one page at a time;
+        pass the response's `next_cursor` back as `cursor` for the next
+        page. `total` is counted for the first page and carried in the
+        cursor. Pages come from the catalog, or cost one index range scan
+        each without it.
         """
+        try:
+            year = query.get('year', [None])[0]
+            year = int(year) if year else None
+            year_end = query.get('year_end', [None])[0]
+            year_end = int(year_end) if year_end else None
+            # Whole-year bounds as a date range, so the index can be used
+            since = datetime.date(year, 1, 1).isoformat() if year is not None else '-infinity'
+            until = datetime.date(year_end + 1, 1, 1).isoformat() if year_end is not None else 'infinity'
+            undated = year is None and year_end is None
+            limit = parse_limit(query, TREATY_PAGE_SIZE)
+            fields = parse_fields(query, TREATY_FIELDS)
+            cursor = query.get('cursor', [None])[0]
+            after = decode_cursor(cursor) if cursor else None
+            if after is not None and after['d'] is not None:
+                after['d'] = datetime.date.fromisoformat(after['d']).isoformat()
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json({'error': f'Invalid parameters: {e}'}, 400)
+            return
 
-        cur.execute(sql, params)
-        rows = cur.fetchall()
+        # One extra treaty says whether there is another page
+        catalog = get_catalog()
+        if catalog is not None:
+            page, total = catalog.treaty_page(
+                year, year_end, None if after is None else (after['d'], after['i']), limit + 1)
+            if after is not None:
+                total = after['t']
+            treaties = [treaty.summary() for treaty in page]
+        else:
+            if after is None:
+                after_date, after_id, after_undated = '-infinity', NIL_UUID, NIL_UUID
+            elif after['d'] is not None:
+                after_date, after_id, after_undated = after['d'], after['i'], NIL_UUID
+            else:
+                after_date, after_id, after_undated = 'infinity', NIL_UUID, after['i']
 
-        treaties = []
-        for row in rows:
-            treaties.append({
-                'id': row['id'],
-                'name': row['name'],
-                'signed_date': row['signed_date'],
-                'tribes': [{'id': t, 'name': t} for t in (row['tribes'] or [])],
-                'status': row['status'],
-                'certainty': row['certainty'],
-                'kappler_ref': f"Kappler Vol. {row['kappler_volume']}, p. {row['kappler_page']}" if row['kappler_volume'] else None
-            })
+            with db_cursor() as cur:
+                if after is None:
+                    execute_prepared(cur, 'treaty_count', (since, until, undated))
+                    total = cur.fetchone()['total']
+                else:
+                    total = after['t']
+                execute_prepared(cur, 'treaty_page', (
+                    since, until, after_date, after_id,
+                    after_undated if undated else None, limit + 1,
+                ))
+                treaties = [treaty_summary(row) for row in cur.fetchall()]
 
-        conn.close()
-        self.send_json({'treaties': treaties, 'total': len(treaties)})
+        next_cursor = None
+        if len(treaties) > limit:
+            treaties = treaties[:limit]
+            last = treaties[-1]
+            next_cursor = encode_cursor({'d': last['signed_date'], 'i': last['id'], 't': total})
 
-    def get_treaty(self, treaty_id):
-        conn = get_db()
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT
-                t.id::text,
-                t.title as name,
-                t.date_signed_text,
-                t.date_signed::text as signed_date,
-                t.date_ratified::text as ratified_date,
-                t.tribal_parties_text as tribes,
-                t.us_commissioners_text as us_commissioners,
-                t.signatures_text as signatories,
-                t.preamble,
-                t.articles_text as articles,
-                t.statutes_at_large_citation,
-                t.kappler_volume,
-                t.kappler_page,
-                t.is_validated,
-                t.source_url,
-                ds.name as source_name,
-                ds.reliability as source_reliability
-            FROM raw_treaties t
-            JOIN data_sources ds ON t.source_id = ds.id
-            WHERE t.id::text = %s
-        """, (treaty_id,))
+        treaties = [project(treaty, fields) for treaty in treaties]
+        self.send_json({'treaties': treaties, 'total': total, 'next_cursor': next_cursor})
 
-        row = cur.fetchone()
-        conn.close()
+    def get_timeline(self, query):
+        """GET /api/v1/treaties/timeline?from=&to=
 
-        if not row:
+        Treaties and boundary ids that appear or disappear when the year
+        slider moves from `from` to `to`. Without `from` everything visible
+        at `to` is returned as added.
+        """
+        try:
+            from_year = query.get('from', [None])[0]
+            from_year = int(from_year) if from_year else None
+            to_year = int(query['to'][0])
+        except (KeyError, ValueError):
+            self.send_json({'error': 'Invalid parameters. Required: to (year), optional: from (year)'}, 400)
+            return
+
+        timeline = get_timeline()
+        self.send_json({'from': from_year, 'to': to_year, **timeline.delta(from_year, to_year)})
+
+    def get_treaty(self, treaty_id):
+        try:
+            treaty_id = str(uuid.UUID(treaty_id))
+        except ValueError:
             self.send_json({'error': 'Treaty not found'}, 404)
             return
 
-        treaty = {
-            'id': row['id'],
-            'name': row['name'],
-            'alternate_names': [],
-            'signed_date': row['signed_date'],
-            'signed_date_text': row['date_signed_text'],
-            'ratified_date': row['ratified_date'],
-            'proclaimed_date': None,
-            'tribes': [{'id': t, 'name': t} for t in (row['tribes'] or [])],
-            'us_commissioners': row['us_commissioners'] or [],
-            'tribal_signatories': row['signatories'] or [],
-            'status': 'Active' if row['is_validated'] else 'Unknown',
-            'violations': [],
-            'affecting_laws': [],
-            'preamble': row['preamble'],
-            'articles': row['articles'] or [],
-            'ceded_territory_acres': None,
-            'reserved_territory_acres': None,
-            'boundary_certainty': 'Verified' if row['is_validated'] else 'Reported',
-            'sources': [{
-                'name': row['source_name'],
-                'source_type': 'Government',
-                'url': row['source_url'],
-                'reliability': float(row['source_reliability']),
-                'accessed_date': None
-            }],
-            'kappler_citation': f"Kappler Vol. {row['kappler_volume']}, p. {row['kappler_page']}" if row['kappler_volume'] else None,
-            'statutes_at_large': row['statutes_at_large_citation']
-        }
+        catalog = get_catalog()
+        if catalog is not None:
+            treaty = catalog.treaties.get(treaty_id)
+        else:
+            with db_cursor() as cur:
+                execute_prepared(cur, 'treaty_detail', (treaty_id,))
+                row = cur.fetchone()
+            treaty = None if row is None else TreatyRecord(
+                row, treaty_tribes(row), (row['source_name'], float(row['source_reliability'])))
+
+        if treaty is None:
+            self.send_json({'error': 'Treaty not found'}, 404)
+            return
 
-        self.send_json(treaty)
+        self.send_json(treaty.detail())
 
     def get_tribes(self, query):
-        conn = get_db()
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT
-                id::text,
-                name,
-                alternate_names,
-                region,
-                state,
-                federally_recognized,
-                name_evidentiality::text as certainty
-            FROM raw_tribes
-            ORDER BY name ASC
-            LIMIT 100
-        """)
+        """GET /api/v1/tribes?limit=&cursor=&fields=
 
-        rows = cur.fetchall()
-        conn.close()
+        Tribes by name, paginated the same way as get_treaties.
+        """
+        try:
+            limit = parse_limit(query, TRIBE_PAGE_SIZE)
+            fields = parse_fields(query, TRIBE_FIELDS)
+            cursor = query.get('cursor', [None])[0]
+            after = decode_cursor(cursor) if cursor else None
+            if after is not None and not isinstance(after.get('n'), str):
+                raise ValueError('malformed cursor')
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json({'error': f'Invalid parameters: {e}'}, 400)
+            return
 
-        tribes = [{
-            'id': row['id'],
-            'name': row['name'],
-            'alternate_names': row['alternate_names'] or [],
-            'region': row['region'],
-            'state': row['state'],
-            'federally_recognized': row['federally_recognized'],
-            'treaty_count': 0,
-            'certainty': row['certainty']
-        } for row in rows]
+        catalog = get_catalog()
+        page = None
+        if catalog is not None:
+            # None when the cursor's tribe has gone; the database places it
+            page = catalog.tribe_page(None if after is None else (after['n'], after['i']), limit + 1)
+        if page is not None:
+            page, total = page
+            if after is not None:
+                total = after['t']
+            tribes = [tribe.summary() for tribe in page]
+        else:
+            with db_cursor() as cur:
+                if after is None:
+                    execute_prepared(cur, 'tribe_count')
+                    total = cur.fetchone()['total']
+                else:
+                    total = after['t']
+                execute_prepared(cur, 'tribe_page', (
+                    after['n'] if after else '',
+                    after['i'] if after else NIL_UUID,
+                    limit + 1,
+                ))
+                rows = cur.fetchall()
 
-        self.send_json({'tribes': tribes, 'total': len(tribes)})
+            tribes = [{
+                'id': row['id'],
+                'name': row['name'],
+                'alternate_names': row['alternate_names'] or [],
+                'region': row['region'],
+                'state': row['state'],
+                'federally_recognized': row['federally_recognized'],
+                'treaty_count': row['treaty_count'],
+                'certainty': row['certainty']
+            } for row in rows]
 
-    def get_tribe(self, tribe_id):
-        conn = get_db()
-        cur = conn.cursor()
+        next_cursor = None
+        if len(tribes) > limit:
+            tribes = tribes[:limit]
+            next_cursor = encode_cursor({'n': tribes[-1]['name'], 'i': tribes[-1]['id'], 't': total})
 
-        cur.execute("""
-            SELECT * FROM raw_tribes WHERE id::text = %s
-        """, (tribe_id,))
+        tribes = [project(tribe, fields) for tribe in tribes]
+        self.send_json({'tribes': tribes, 'total': total, 'next_cursor': next_cursor})
 
-        row = cur.fetchone()
-        conn.close()
+    def get_tribe(self, tribe_id):
+        try:
+            tribe_id = str(uuid.UUID(tribe_id))
+        except ValueError:
+            self.send_json({'error': 'Tribe not found'}, 404)
+            return
+
+        catalog = get_catalog()
+        if catalog is not None:
+            tribe = catalog.tribes.get(tribe_id)
+            row = None if tribe is None else catalog.tribe_detail(tribe)
+        else:
+            with db_cursor() as cur:
+                execute_prepared(cur, 'tribe_detail', (tribe_id,))
+                row = cur.fetchone()
 
         if not row:
             self.send_json({'error': 'Tribe not found'}, 404)
@@ -252,115 +2799,533 @@ class WindwalkerHandler(SimpleHTTPRequestHandler):
 
         self.send_json(dict(row))
 
+    def get_tribe_treaties(self, tribe_id):
+        try:
+            tribe_uuid = str(uuid.UUID(tribe_id))
+        except ValueError:
+            self.send_json({'error': 'Tribe not found'}, 404)
+            return
+
+        catalog = get_catalog()
+        if catalog is not None:
+            tribe = catalog.tribes.get(tribe_uuid)
+            if tribe is None:
+                self.send_json({'error': 'Tribe not found'}, 404)
+                return
+            tribe_name = tribe.name
+            treaties = [treaty.summary() for treaty in catalog.tribe_treaties.get(tribe_uuid, [])]
+        else:
+            with db_cursor() as cur:
+                execute_prepared(cur, 'tribe_detail', (tribe_uuid,))
+                tribe = cur.fetchone()
+                if not tribe:
+                    self.send_json({'error': 'Tribe not found'}, 404)
+                    return
+                execute_prepared(cur, 'tribe_treaties', (tribe_uuid,))
+                rows = cur.fetchall()
+            tribe_name = tribe['name']
+            treaties = [treaty_summary(row) for row in rows]
+
+        self.send_json({
+            'tribe_id': tribe_uuid,
+            'tribe_name': tribe_name,
+            'treaties': treaties,
+            'count': len(treaties)
+        })
+
     def search(self, query):
         q = query.get('q', [''])[0]
         if not q:
             self.send_json({'results': [], 'total': 0})
             return
+        try:
+            limit = max(1, min(int(query.get('limit', ['20'])[0]), SEARCH_MAX_LIMIT))
+        except ValueError:
+            self.send_json({'error': 'Invalid limit'}, 400)
+            return
 
-        conn = get_db()
-        cur = conn.cursor()
+        # Substring matches still work for partial words ("Chero"), escaped so
+        # that % and _ in the query are taken literally
+        pattern = '%' + re.sub(r'([\\%_])', r'\\\1', q) + '%'
+        with db_cursor() as cur:
+            execute_prepared(cur, 'search', (q, pattern, limit))
+            rows = cur.fetchall()
 
         results = []
-
-        # Search treaties
-        cur.execute("""
-            SELECT id::text, title, 'treaty' as entity_type
-            FROM raw_treaties
-            WHERE title ILIKE %s
-            LIMIT 10
-        """, (f'%{q}%',))
-
-        for row in cur.fetchall():
+        for row in rows:
             results.append({
-                'entity_type': 'treaty',
+                'entity_type': row['entity_type'],
                 'id': row['id'],
                 'title': row['title'],
-                'snippet': None,
-                'url': f"/treaties/{row['id']}",
-                'score': 1.0
+                'snippet': row['snippet'],
+                'url': f"/{row['entity_type']}s/{row['id']}",
+                'score': round(row['score'], 4)
             })
 
-        # Search tribes
-        cur.execute("""
-            SELECT id::text, name, 'tribe' as entity_type
-            FROM raw_tribes
-            WHERE name ILIKE %s
-            LIMIT 10
-        """, (f'%{q}%',))
+        self.send_json({'query': q, 'results': results, 'total': len(results)})
 
-        for row in cur.fetchall():
-            results.append({
-                'entity_type': 'tribe',
-                'id': row['id'],
-                'title': row['name'],
-                'snippet': None,
-                'url': f"/tribes/{row['id']}",
-                'score': 1.0
+    def suggest(self, query):
+        """GET /api/v1/suggest?q=&types=&limit= (prefix matches from memory)"""
+        q = query.get('q', [''])[0]
+        if len(q) < 2:
+            self.send_json({'query': q, 'suggestions': []})
+            return
+        try:
+            limit = max(1, min(int(query.get('limit', ['10'])[0]), SUGGEST_MAX_LIMIT))
+        except ValueError:
+            self.send_json({'error': 'Invalid limit'}, 400)
+            return
+        types = query.get('types', [None])[0]
+        types = set(types.split(',')) if types else None
+
+        suggestions = []
+        for entity_type, entity_id, text in get_suggest_index().suggest(q, limit, types):
+            suggestions.append({
+                'entity_type': entity_type,
+                'id': entity_id,
+                'text': text,
+                'highlight': None
             })
 
-        conn.close()
-        self.send_json({'query': q, 'results': results, 'total': len(results)})
+        self.send_json({'query': q, 'suggestions': suggestions})
 
     def get_sources(self):
-        conn = get_db()
-        cur = conn.cursor()
+        with db_cursor() as cur:
+            execute_prepared(cur, 'source_list')
+            rows = cur.fetchall()
 
-        cur.execute("""
-            SELECT source_id as id, name, source_type::text as type,
-                   base_url, last_scraped::text, reliability
-            FROM data_sources
-            ORDER BY reliability DESC
-        """)
+        self.send_json({'sources': [dict(row) for row in rows]})
 
-        rows = cur.fetchall()
-        conn.close()
+    def export(self, query):
+        """GET /api/v1/export?table=treaties|tribes|sources&format=ndjson|csv|geojson
 
-        self.send_json({'sources': [dict(row) for row in rows]})
+        Streams a whole table from one consistent snapshot, EXPORT_BATCH_SIZE
+        rows at a time, so memory stays flat however large the table is.
+        """
+        table = query.get('table', ['treaties'])[0]
+        fmt = query.get('format', ['ndjson'])[0]
+        if table not in EXPORT_QUERIES or fmt not in EXPORT_CONTENT_TYPES:
+            self.send_json({'error': 'Invalid parameters. table: treaties|tribes|sources, '
+                                     'format: ndjson|csv|geojson'}, 400)
+            return
 
-    def get_boundaries(self):
-        """Fetch treaty boundaries from Native-Land.ca (with caching)"""
-        global _boundaries_cache
+        with db_snapshot() as conn, conn.cursor(f'export_{table}') as cur:
+            cur.itersize = EXPORT_BATCH_SIZE
+            cur.execute(EXPORT_QUERIES[table])
+            # Fetched before any headers go out, so a failing query still
+            # gets a proper error response
+            first = cur.fetchmany(EXPORT_BATCH_SIZE)
+            columns = [column.name for column in cur.description]
+            self.send_stream(
+                EXPORT_CONTENT_TYPES[fmt],
+                export_chunks(fmt, columns, fetch_batches(cur, first)),
+                filename=f'windwalker-{table}.{fmt}',
+            )
 
-        now = time.time()
+    def get_boundaries(self, query):
+        """Serve treaty boundaries from Native-Land.ca (stale-while-revalidate)
 
-        # Check cache
-        if _boundaries_cache['data'] and (now - _boundaries_cache['timestamp']) < _boundaries_cache['ttl']:
-            self.send_json(_boundaries_cache['data'])
+        With zoom=N the geometry is simplified for that zoom level.
+        """
+        try:
+            zoom = query.get('zoom', [None])[0]
+            zoom = int(zoom) if zoom is not None else None
+        except ValueError:
+            self.send_json({'error': 'Invalid zoom'}, 400)
             return
 
         try:
-            # Fetch from Native-Land.ca CDN (the API redirects here)
-            url = 'https://d2u5ssx9zi93qh.cloudfront.net/treaties.geojson'
-            req = Request(url, headers={'User-Agent': 'Windwalker/1.0'})
-            with urlopen(req, timeout=30) as response:
-                data = json.loads(response.read().decode('utf-8'))
-
-            # Cache the result
-            _boundaries_cache['data'] = data
-            _boundaries_cache['timestamp'] = now
-
-            self.send_json(data)
-        except URLError as e:
-            # Return cached data if available, even if stale
-            if _boundaries_cache['data']:
-                self.send_json(_boundaries_cache['data'])
-            else:
-                self.send_json({'error': f'Failed to fetch boundaries: {str(e)}'}, 502)
+            data = boundaries_for_zoom(zoom)
+        except (URLError, TimeoutError) as e:
+            self.send_json({'error': f'Failed to fetch boundaries: {str(e)}'}, 502)
+            return
         except Exception as e:
             self.send_json({'error': f'Boundary fetch error: {str(e)}'}, 500)
+            return
+
+        self.send_json(data)
+
+    def geo_point(self, query):
+        """Treaty boundaries containing a point, answered from the spatial index"""
+        try:
+            lng = float(query['lng'][0])
+            lat = float(query['lat'][0])
+        except KeyError as e:
+            self.send_json({'error': f'Missing required parameter: {e.args[0]}'}, 400)
+            return
+        except ValueError:
+            self.send_json({'error': 'Invalid coordinates'}, 400)
+            return
+        if not (-180.0 <= lng <= 180.0 and -90.0 <= lat <= 90.0):
+            self.send_json({'error': 'Invalid coordinates'}, 400)
+            return
+
+        date = query.get('date', [None])[0]
+        layers = query.get('layers', ['treaties,territories'])[0].split(',')
+        try:
+            max_year = int(date[:4]) if date else None
+        except ValueError:
+            self.send_json({'error': 'Invalid date, expected YYYY-MM-DD'}, 400)
+            return
+
+        treaties = []
+        if 'treaties' in layers:
+            index = get_boundary_index()
+            for i in index.query_point(lng, lat):
+                year = index.years[i]
+                if max_year is not None and (year is None or year > max_year):
+                    continue
+                props = index.features[i].get('properties') or {}
+                treaties.append({
+                    'id': index.ids[i],
+                    'name': props.get('Name'),
+                    'signed_date': str(year) if year else None,
+                    'territory_type': None,
+                    'certainty': 'Reported',
+                })
+
+        self.send_json({
+            'point': [lng, lat],
+            'date': date,
+            'treaties': treaties,
+            'territories': [],
+            'tribes': [],
+        })
+
+    def geo_bbox(self, query):
+        """Treaty boundaries intersecting a bounding box
+
+        With format=geojson the matching features themselves are returned as
+        a FeatureCollection, so the map can load just what is in view.
+        """
+        bbox = query.get('bbox', [None])[0]
+        if not bbox:
+            self.send_json({'error': 'Missing required parameter: bbox'}, 400)
+            return
+        try:
+            min_lng, min_lat, max_lng, max_lat = (float(v) for v in bbox.split(','))
+        except ValueError:
+            self.send_json({'error': 'Invalid bbox format. Expected: min_lng,min_lat,max_lng,max_lat'}, 400)
+            return
+        if min_lng >= max_lng or min_lat >= max_lat:
+            self.send_json({'error': 'Invalid bbox: min values must be less than max values'}, 400)
+            return
+
+        date = query.get('date', [None])[0]
+        as_geojson = query.get('format', [''])[0] == 'geojson'
+        try:
+            max_year = int(date[:4]) if date else None
+            default_limit = GEO_BBOX_MAX_LIMIT if as_geojson else 100
+            limit = min(int(query.get('limit', [default_limit])[0]), GEO_BBOX_MAX_LIMIT)
+        except ValueError:
+            self.send_json({'error': 'Invalid date or limit'}, 400)
+            return
+
+        get_boundaries_data()
+        shapes = _boundaries_cache['shapes']
+        index = shapes.index
+        hits = []
+        for i in index.query_bbox(min_lng, min_lat, max_lng, max_lat):
+            year = index.years[i]
+            if max_year is not None and (year is None or year > max_year):
+                continue
+            hits.append(i)
+        truncated = len(hits) > limit
+        hits = hits[:limit]
+
+        if as_geojson:
+            zoom = query.get('zoom', [''])[0]
+            band = simplify.band_for_zoom(int(zoom)) if zoom.isdigit() else None
+            features = index.features
+            if shapes.levels and band is not None:
+                features = shapes.levels[band]
+            self.send_json({
+                'type': 'FeatureCollection',
+                'bbox': [min_lng, min_lat, max_lng, max_lat],
+                'features': [features[i] for i in hits],
+                'truncated': truncated,
+            })
+            return
+
+        treaties = []
+        for i in hits:
+            x0, y0, x1, y1 = index.bboxes[i]
+            year = index.years[i]
+            treaties.append({
+                'id': index.ids[i],
+                'name': (index.features[i].get('properties') or {}).get('Name'),
+                'signed_date': str(year) if year else None,
+                'bounds': {
+                    'type': 'Polygon',
+                    'coordinates': [[[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]],
+                },
+                'certainty': 'Reported',
+            })
+
+        self.send_json({
+            'bbox': [min_lng, min_lat, max_lng, max_lat],
+            'date': date,
+            'treaties': treaties,
+            'territories': [],
+            'tribes': [],
+            'truncated': truncated,
+        })
 
     def send_json(self, data, status=200):
-        self.send_response(status)
-        self.send_header('Content-Type', 'application/json')
+        store = self._cache_store if status == 200 else None
+        response = EncodedResponse(encode_json(data), status, precompress=store is not None)
+        if store is not None:
+            _response_cache.put(store[0], store[1], response)
+        self.send_encoded(response)
+
+    def send_static(self, asset, version, query):
+        """Serve an in-memory asset: immutable when requested by its content
+        hash (`?v=`), otherwise revalidated by ETag every time"""
+        if query.get('v', [None])[0] == version:
+            self._cache_control = f'public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            self._cache_control = 'no-cache'
+        self.send_encoded(asset)
+
+    def send_overloaded(self, message, key=None):
+        """Answer a shed request with a stale cached response if there is one
+        (marked no-cache so browsers revalidate it), otherwise a 503"""
+        self._cache_store = None
+        stale = _response_cache.get_stale(key) if key is not None else None
+        if stale is not None:
+            REQUESTS_SHED.inc(route_label(urlparse(self.path).path), 'stale')
+            self._cache_control = 'no-cache'
+            self.send_encoded(stale)
+            return
+        self.send_json({'error': message}, 503)
+
+    def send_encoded(self, response):
+        if self._subrequest:
+            self._captured = response
+            return
+        encoding = choose_encoding(self.headers.get('Accept-Encoding'), response.encodings)
+        cacheable = response.status == 200 and self._cache_control != 'no-store'
+
+        if cacheable and response.matches(self.headers.get('If-None-Match', '')):
+            self.send_response(304)
+            self.send_validators(response, encoding)
+            self.end_headers()
+            return
+
+        payload = response.encoded(encoding)
+        self.send_response(response.status)
+        self.send_header('Content-Type', response.content_type)
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        if cacheable:
+            self.send_validators(response, encoding)
+        else:
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Cache-Control', 'no-store')
+        if response.status == 503:
+            self.send_header('Retry-After', str(RETRY_AFTER))
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_stream(self, content_type, chunks, filename=None):
+        """Send a body of unknown length as it is produced
+
+        HTTP/1.1 clients get chunked transfer encoding, gzipped if they
+        accept it; HTTP/1.0 clients get the bare body, ended by closing the
+        connection. Once headers are out an error can only be signalled by
+        cutting the response short, so failures are logged and the
+        connection closed without the final chunk.
+        """
+        chunked = self.request_version == 'HTTP/1.1'
+        encoding = choose_encoding(self.headers.get('Accept-Encoding'), ('gzip', 'identity')) if chunked else 'identity'
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if encoding == 'gzip' else None
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if compressor is not None:
+            self.send_header('Content-Encoding', 'gzip')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        if filename:
+            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-store')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+
+        def write(data):
+            if not data:
+                return
+            if chunked:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            else:
+                self.wfile.write(data)
+
+        try:
+            for chunk in chunks:
+                write(compressor.compress(chunk) if compressor is not None else chunk)
+            if compressor is not None:
+                write(compressor.flush())
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+        except Exception as e:
+            self.log_message('%s', f'stream aborted: {e}')
+            self.close_connection = True
+
+    def send_validators(self, response, encoding):
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('ETag', response.etag(encoding))
+        self.send_header('Cache-Control', self._cache_control)
+        if len(response.encodings) > 1:
+            self.send_header('Vary', 'Accept-Encoding')
 
     def log_message(self, format, *args):
         print(f"[{self.log_date_time_string()}] {args[0]}")
 
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that dispatches each connection to a bounded worker pool
+
+    Given `sock`, it serves on that already-listening socket (inherited from
+    the pre-fork supervisor) instead of binding its own.
+    """
+
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, server_address, handler_class, max_workers=MAX_WORKERS, sock=None):
+        super().__init__(server_address, handler_class, bind_and_activate=sock is None)
+        if sock is not None:
+            self.socket.close()
+            self.socket = sock
+            self.server_address = sock.getsockname()
+            self.server_name, self.server_port = self.server_address[:2]
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='windwalker-worker')
+        self.heartbeat = None
+        # Accepted connections not yet picked up by a worker thread
+        self.queued = 0
+        # Set by drain(): kept-alive connections close instead of waiting
+        self.draining = False
+        self._queued_lock = threading.Lock()
+
+    def get_request(self):
+        request, client_address = self.socket.accept()
+        # The shared listening socket is non-blocking; connections must not be
+        request.setblocking(True)
+        return request, client_address
+
+    def service_actions(self):
+        # Runs on every pass of the accept loop, so heartbeats stop if it hangs
+        if self.heartbeat is not None and not self.heartbeat.beat():
+            print("Supervisor has gone away; shutting down")
+            self.heartbeat = None
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def process_request(self, request, client_address):
+        # Called on the accept loop; hand off so the next accept isn't blocked
+        with self._queued_lock:
+            self.queued += 1
+        self.executor.submit(self.process_request_thread, request, client_address, time.monotonic())
+
+    def process_request_thread(self, request, client_address, accepted=None):
+        with self._queued_lock:
+            self.queued -= 1
+        _request_state.accepted_at = accepted
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self, timeout):
+        """Wait up to `timeout` seconds for accepted requests to finish
+
+        Idle kept-alive connections are closed within KEEPALIVE_POLL_INTERVAL,
+        and busy ones after their current response.
+        """
+        self.draining = True
+        waiter = threading.Thread(target=self.executor.shutdown, daemon=True)
+        waiter.start()
+        waiter.join(timeout)
+        return not waiter.is_alive()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def serve_worker(listen_fd, heartbeat_fd, metrics_dir):
+    """Pre-fork worker: serve on the supervisor's socket until SIGTERM"""
+    # Ctrl-C reaches the whole process group; the supervisor handles it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _boundaries_cache['shared'] = True
+    if metrics_dir:
+        metrics.share(metrics_dir, WORKER_METRICS_INTERVAL)
+
+    sock = socket.socket(fileno=listen_fd)
+    # Every worker wakes for each connection; the ones that lose the accept
+    # race must go straight back to the loop rather than block in accept()
+    sock.setblocking(False)
+    server = PooledHTTPServer(None, WindwalkerHandler, MAX_WORKERS, sock=sock)
+    server.heartbeat = prefork.Heartbeat(heartbeat_fd, WORKER_HEARTBEAT_INTERVAL)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(
+        target=server.shutdown, daemon=True).start())
+
+    warm_boundaries()
+    start_catalog()
+    refresh_suggest_async()
+    _static_assets.refresh()
+    try:
+        server.serve_forever()
+    finally:
+        if not server.drain(WORKER_SHUTDOWN_TIMEOUT):
+            print(f"Worker {os.getpid()}: requests still running after {WORKER_SHUTDOWN_TIMEOUT:.0f}s")
+        server.server_close()
+        if _db_pool is not None:
+            _db_pool.closeall()
+        metrics.stop_sharing()
+
+def serve_supervisor(workers):
+    """Bind the port and keep `workers` server processes running on it"""
+    sock = socket.create_server((HOST, PORT), backlog=LISTEN_BACKLOG)
+    # Where workers exchange metrics, so any of them can answer /metrics for all
+    metrics_dir = tempfile.mkdtemp(prefix='windwalker-metrics-')
+    supervisor = prefork.Supervisor(
+        sock, workers, [sys.executable, os.path.abspath(__file__), '--metrics-dir', metrics_dir],
+        heartbeat_interval=WORKER_HEARTBEAT_INTERVAL,
+        heartbeat_timeout=WORKER_HEARTBEAT_TIMEOUT,
+        shutdown_timeout=WORKER_SHUTDOWN_TIMEOUT,
+        tick=refresh_boundaries_snapshot)
+    try:
+        supervisor.run()
+    finally:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
 def main():
+    parser = argparse.ArgumentParser(description='Windwalker API server (Python fallback)')
+    parser.add_argument('--seed-tiles', type=int, metavar='MAX_ZOOM',
+                        help='pre-render vector tiles for zooms 0..MAX_ZOOM into the tile cache and exit')
+    parser.add_argument('--layers', default=','.join(TILE_LAYERS),
+                        help='comma-separated tile layers to seed (default: all)')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help='serve from N processes under a supervisor (default: 0, this process only)')
+    # Passed by the supervisor to its worker processes
+    parser.add_argument('--listen-fd', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--heartbeat-fd', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--metrics-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.listen_fd is not None:
+        serve_worker(args.listen_fd, args.heartbeat_fd, args.metrics_dir)
+        return
+
+    if args.seed_tiles is not None:
+        print(f"Seeding tiles z0-{args.seed_tiles} into {TILE_CACHE_DIR}")
+        if load_boundaries_snapshot():
+            _boundaries_cache['simplifier'].join()
+        seed_tiles(args.seed_tiles, [l for l in args.layers.split(',') if l in TILE_LAYERS])
+        return
+
     print(f"""
 ╦ ╦┬┌┐┌┌┬┐┬ ┬┌─┐┬  ┬┌─┌─┐┬─┐
 ║║║││││ ││││├─┤│  ├┴┐├┤ ├┬┘
@@ -370,14 +3335,28 @@ Native Treaty Mapping Initiative
 Starting server on http://{HOST}:{PORT}
 API available at http://{HOST}:{PORT}/api/v1/
 Static files from {STATIC_DIR}
+Worker threads: {MAX_WORKERS}{f" per process, {args.workers} processes" if args.workers > 0 else ""}
     """)
 
-    server = HTTPServer((HOST, PORT), WindwalkerHandler)
+    if args.workers > 0:
+        serve_supervisor(args.workers)
+        return
+
+    warm_boundaries()
+    start_catalog()
+    refresh_suggest_async()
+    _static_assets.refresh()
+
+    server = PooledHTTPServer((HOST, PORT), WindwalkerHandler, MAX_WORKERS)
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print("\nShutting down...")
         server.shutdown()
+    finally:
+        server.server_close()
+        if _db_pool is not None:
+            _db_pool.closeall()
 
 if __name__ == '__main__':
     main()
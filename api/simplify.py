@@ -0,0 +1,278 @@
+"""
+Windwalker geometry simplification (Python fallback)
+
+Douglas-Peucker simplification of boundary polygons into one variant per
+zoom band, so national views don't ship full-resolution coastlines. Band
+tolerances follow simplify_for_zoom in api/src/routes/tiles.sigil.
+Simplified rings are checked against themselves and their neighbours, so
+simplification never makes a valid polygon self-intersecting.
+
+NumPy is used for the distance computations when it is installed; the
+pure-Python path gives identical results, just more slowly.
+"""
+
+from mvt import simplify_for_zoom
+
+try:
+    import numpy as np
+except ImportError:  # optional: falls back to the pure-Python loop
+    np = None
+
+# (first zoom, last zoom) of each simplified band; zooms past the last band
+# are served at full resolution
+ZOOM_BANDS = ((0, 2), (3, 5), (6, 8), (9, 11))
+
+# Attempts at halving the tolerance before keeping a ring unsimplified
+_MAX_RETRIES = 3
+
+# Below this many points NumPy's per-call overhead outweighs vectorization
+_NUMPY_MIN_POINTS = 512
+
+def band_for_zoom(zoom):
+    """Index into ZOOM_BANDS for a zoom level, or None for full resolution"""
+    for band, (lo, hi) in enumerate(ZOOM_BANDS):
+        if lo <= zoom <= hi:
+            return band
+    return None
+
+def band_tolerance(band):
+    return simplify_for_zoom(ZOOM_BANDS[band][0])
+
+def _keep_mask_numpy(ring, tolerance):
+    pts = np.asarray(ring, dtype=float)[:, :2]
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    tol2 = tolerance * tolerance
+    stack = [(0, len(pts) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a = pts[start]
+        d = pts[end] - a
+        rel = pts[start + 1:end] - a
+        length2 = d @ d
+        if length2 == 0:
+            dist2 = (rel * rel).sum(axis=1)
+        else:
+            cross = rel[:, 0] * d[1] - rel[:, 1] * d[0]
+            dist2 = cross * cross / length2
+        i = int(dist2.argmax())
+        if dist2[i] > tol2:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep.tolist()
+
+def _keep_mask_python(ring, tolerance):
+    keep = [False] * len(ring)
+    keep[0] = keep[-1] = True
+    tol2 = tolerance * tolerance
+    stack = [(0, len(ring) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        ax, ay = ring[start][0], ring[start][1]
+        dx = ring[end][0] - ax
+        dy = ring[end][1] - ay
+        length2 = dx * dx + dy * dy
+        best = -1.0
+        split = start
+        for i in range(start + 1, end):
+            rx = ring[i][0] - ax
+            ry = ring[i][1] - ay
+            if length2 == 0:
+                dist2 = rx * rx + ry * ry
+            else:
+                cross = rx * dy - ry * dx
+                dist2 = cross * cross / length2
+            if dist2 > best:
+                best = dist2
+                split = i
+        if best > tol2:
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+def _area(ring):
+    area = 0.0
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        area += ring[j][0] * ring[i][1] - ring[i][0] * ring[j][1]
+        j = i
+    return area / 2.0
+
+def _bbox(ring):
+    xs = [p[0] for p in ring]
+    ys = [p[1] for p in ring]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def _bboxes_overlap(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+def _orientation(a, b, c):
+    value = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+    return (value > 0) - (value < 0)
+
+def _within(a, b, p):
+    """Whether `p`, collinear with segment a-b, lies on it"""
+    return (min(a[0], b[0]) <= p[0] <= max(a[0], b[0])
+            and min(a[1], b[1]) <= p[1] <= max(a[1], b[1]))
+
+def _segments_meet(a, b, c, d):
+    """Whether segments a-b and c-d cross or touch"""
+    o1 = _orientation(a, b, c)
+    o2 = _orientation(a, b, d)
+    o3 = _orientation(c, d, a)
+    o4 = _orientation(c, d, b)
+    if o1 * o2 < 0 and o3 * o4 < 0:
+        return True
+    return ((o1 == 0 and _within(a, b, c)) or (o2 == 0 and _within(a, b, d))
+            or (o3 == 0 and _within(c, d, a)) or (o4 == 0 and _within(c, d, b)))
+
+def rings_meet(ring, others=()):
+    """Whether closed `ring` crosses or touches itself or any of `others`
+
+    Pairs of segments are found by sweeping over x; pairs between two of
+    `others` are not checked.
+    """
+    segments = []
+    for ring_id, r in enumerate([ring, *others]):
+        for i in range(len(r) - 1):
+            a, b = r[i], r[i + 1]
+            if a[1] <= b[1]:
+                y_min, y_max = a[1], b[1]
+            else:
+                y_min, y_max = b[1], a[1]
+            segments.append((min(a[0], b[0]), max(a[0], b[0]), y_min, y_max, ring_id, i, a, b))
+    segments.sort(key=lambda segment: segment[0])
+    last = len(ring) - 2
+    active = []
+    for segment in segments:
+        x_min, _, y_min, y_max, ring_id, i, a, b = segment
+        active = [s for s in active if s[1] >= x_min]
+        for _, _, other_y_min, other_y_max, other_id, j, c, d in active:
+            if (ring_id and other_id) or other_y_max < y_min or other_y_min > y_max:
+                continue
+            # Neighbouring segments of the ring share a point
+            if ring_id == other_id and (abs(i - j) == 1 or {i, j} == {0, last}):
+                continue
+            if _segments_meet(a, b, c, d):
+                return True
+        active.append(segment)
+    return False
+
+def _contains(ring, point):
+    """Whether `point` is inside closed `ring` (even-odd rule)"""
+    x, y = point[0], point[1]
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+def simplify_ring(ring, tolerance, siblings=(), valid=None):
+    """Douglas-Peucker a closed ring; returns None if it collapses
+
+    A result is only kept if it has the original orientation and neither
+    crosses nor touches itself or any of `siblings` (the other rings it
+    must stay apart from). It must also pass `valid`, if given. A result
+    that fails is retried at half the tolerance a few times before the
+    ring is kept as-is.
+    """
+    if len(ring) <= 4:
+        return ring
+    if np is not None and len(ring) >= _NUMPY_MIN_POINTS:
+        keep_mask = _keep_mask_numpy
+    else:
+        keep_mask = _keep_mask_python
+    original = _area(ring)
+    # A simplified ring keeps a subset of the points, so it stays in their bbox
+    bbox = _bbox(ring)
+    siblings = [r for r in siblings if r and _bboxes_overlap(bbox, _bbox(r))]
+
+    for _ in range(_MAX_RETRIES + 1):
+        mask = keep_mask(ring, tolerance)
+        out = [p for p, keep in zip(ring, mask) if keep]
+        if len(out) == len(ring):
+            return ring
+        if len(out) < 4:
+            return None
+        area = _area(out)
+        if (area != 0 and (area > 0) == (original > 0) and not rings_meet(out, siblings)
+                and (valid is None or valid(out))):
+            return out
+        tolerance /= 2.0
+    return ring
+
+def simplify_polygon(rings, tolerance, neighbours=()):
+    """Simplify a polygon's rings; the exterior is never dropped
+
+    Rings are simplified one at a time, each kept apart from the others as
+    they stand by then, and from `neighbours` (rings of the other polygons
+    of a MultiPolygon). The simplified exterior must still contain every
+    hole, and each simplified hole must still lie inside the exterior.
+    Holes that collapse are dropped; they are smaller than the tolerance.
+    Empty holes are dropped too, and a polygon without an exterior is
+    returned as it is.
+    """
+    if not rings or not rings[0]:
+        return rings
+    holes = [hole for hole in rings[1:] if hole]
+    exterior = simplify_ring(rings[0], tolerance, holes + list(neighbours),
+                             lambda out: all(_contains(out, hole[0]) for hole in holes)) or rings[0]
+    kept = []
+    for n, hole in enumerate(holes):
+        out = simplify_ring(hole, tolerance, [exterior, *kept, *holes[n + 1:], *neighbours],
+                            lambda out: _contains(exterior, out[0]))
+        if out:
+            kept.append(out)
+    return [exterior] + kept
+
+def simplify_geometry(geometry, tolerance):
+    """Simplified copy of a Polygon or MultiPolygon; other geometries as-is
+
+    A MultiPolygon's polygons are kept from crossing each other the same
+    way a polygon's rings are. Empty polygons and rings pass through
+    rather than failing the whole feature.
+    """
+    if not geometry:
+        return geometry
+    kind = geometry.get('type')
+    if kind == 'Polygon':
+        coordinates = simplify_polygon(geometry.get('coordinates') or [], tolerance)
+    elif kind == 'MultiPolygon':
+        polygons = list(geometry.get('coordinates') or [])
+        # Simplified or not, a polygon stays within its exterior's bbox;
+        # an empty one has none and neighbours nothing
+        boxes = [_bbox(polygon[0]) if polygon and polygon[0] else None for polygon in polygons]
+        coordinates = []
+        for n, polygon in enumerate(polygons):
+            neighbours = [ring for m, other in enumerate(coordinates + polygons[n:])
+                          if m != n and boxes[n] and boxes[m] and _bboxes_overlap(boxes[n], boxes[m])
+                          for ring in other]
+            coordinates.append(simplify_polygon(polygon, tolerance, neighbours))
+    else:
+        return geometry
+    return {'type': kind, 'coordinates': coordinates}
+
+def build_levels(features):
+    """One simplified copy of `features` per zoom band
+
+    Features are shallow-copied; only `geometry` differs from the input.
+    """
+    levels = []
+    for band in range(len(ZOOM_BANDS)):
+        tolerance = band_tolerance(band)
+        levels.append([
+            {**feature, 'geometry': simplify_geometry(feature.get('geometry'), tolerance)}
+            for feature in features
+        ])
+    return levels
@@ -0,0 +1,176 @@
+"""
+Windwalker spatial index (Python fallback)
+
+In-memory grid index over the treaty boundary features, so bbox and
+point-in-polygon lookups only examine the few features near the query
+instead of scanning the whole Native-Land GeoJSON.
+"""
+
+import re
+
+# Features spanning more cells than this are kept on a short list that every
+# query checks, rather than being copied into thousands of grid cells
+MAX_CELLS_PER_FEATURE = 4096
+
+_YEAR_RE = re.compile(r'\b(1[7-9]\d{2})\b')
+
+def feature_year(feature):
+    """Year a boundary feature belongs to, taken from its name (like app.js)"""
+    name = (feature.get('properties') or {}).get('Name') or ''
+    match = _YEAR_RE.search(name)
+    return int(match.group(1)) if match else None
+
+def feature_id(feature, index):
+    """Stable identifier for a boundary feature"""
+    if feature.get('id') is not None:
+        return feature['id']
+    props = feature.get('properties') or {}
+    for key in ('ID', 'id', 'Slug'):
+        if props.get(key) is not None:
+            return props[key]
+    return index
+
+def _polygons(geometry):
+    """Flatten a geometry into a list of polygons, each a list of rings"""
+    if not geometry:
+        return []
+    kind = geometry.get('type')
+    if kind == 'Polygon':
+        return [geometry['coordinates']]
+    if kind == 'MultiPolygon':
+        return list(geometry['coordinates'])
+    if kind == 'GeometryCollection':
+        polygons = []
+        for part in geometry.get('geometries', []):
+            polygons.extend(_polygons(part))
+        return polygons
+    return []
+
+def _positions(geometry):
+    """Yield every position of a geometry, whatever its type"""
+    if not geometry:
+        return
+    if geometry.get('type') == 'GeometryCollection':
+        for part in geometry.get('geometries', []):
+            yield from _positions(part)
+        return
+
+    stack = [geometry.get('coordinates')]
+    while stack:
+        item = stack.pop()
+        if not item:
+            continue
+        if isinstance(item[0], (int, float)):
+            yield item
+        else:
+            stack.extend(item)
+
+def geometry_bbox(geometry):
+    """(min_x, min_y, max_x, max_y) of a geometry, or None if it is empty"""
+    xs = []
+    ys = []
+    for position in _positions(geometry):
+        xs.append(position[0])
+        ys.append(position[1])
+    if not xs:
+        return None
+    return (min(xs), min(ys), max(xs), max(ys))
+
+def _ring_contains(ring, x, y):
+    # Even-odd ray casting
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+def polygon_contains(rings, x, y):
+    """Point-in-polygon test for one GeoJSON polygon (outer ring plus holes)"""
+    if not rings or not _ring_contains(rings[0], x, y):
+        return False
+    return not any(_ring_contains(hole, x, y) for hole in rings[1:])
+
+class BoundaryIndex:
+    """Uniform grid over feature bounding boxes
+
+    `cell_size` is in degrees. Queries return feature positions in the
+    `features` list, in ascending order.
+    """
+
+    def __init__(self, features, cell_size=1.0):
+        self.features = features
+        self.cell_size = cell_size
+        self.ids = []
+        self.years = []
+        self.bboxes = []
+        self.cells = {}
+        self.large = []
+
+        for i, feature in enumerate(features):
+            self.ids.append(feature_id(feature, i))
+            self.years.append(feature_year(feature))
+            bbox = geometry_bbox(feature.get('geometry'))
+            self.bboxes.append(bbox)
+            if bbox is None:
+                continue
+
+            x0, y0, x1, y1 = self._cell_range(bbox)
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_CELLS_PER_FEATURE:
+                self.large.append(i)
+                continue
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    self.cells.setdefault((cx, cy), []).append(i)
+
+    def __len__(self):
+        return len(self.features)
+
+    def _cell(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def _cell_range(self, bbox):
+        x0, y0 = self._cell(bbox[0], bbox[1])
+        x1, y1 = self._cell(bbox[2], bbox[3])
+        return x0, y0, x1, y1
+
+    def query_bbox(self, min_x, min_y, max_x, max_y):
+        """Features whose bounding box intersects the query box"""
+        x0, y0, x1, y1 = self._cell_range((min_x, min_y, max_x, max_y))
+        candidates = set(self.large)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            # Query covers more cells than are populated: walk the grid instead
+            for (cx, cy), members in self.cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    candidates.update(members)
+        else:
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    candidates.update(self.cells.get((cx, cy), ()))
+
+        hits = []
+        for i in candidates:
+            bx0, by0, bx1, by1 = self.bboxes[i]
+            if bx0 <= max_x and bx1 >= min_x and by0 <= max_y and by1 >= min_y:
+                hits.append(i)
+        hits.sort()
+        return hits
+
+    def query_point(self, x, y):
+        """Features whose geometry contains the point"""
+        candidates = set(self.large)
+        candidates.update(self.cells.get(self._cell(x, y), ()))
+
+        hits = []
+        for i in candidates:
+            bx0, by0, bx1, by1 = self.bboxes[i]
+            if not (bx0 <= x <= bx1 and by0 <= y <= by1):
+                continue
+            geometry = self.features[i].get('geometry')
+            if any(polygon_contains(rings, x, y) for rings in _polygons(geometry)):
+                hits.append(i)
+        hits.sort()
+        return hits
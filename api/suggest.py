@@ -0,0 +1,86 @@
+"""
+Windwalker autocomplete index (Python fallback)
+
+Sorted-array prefix index over treaty titles and tribe names (including
+alternate names), so type-ahead suggestions are a bisect into memory
+rather than a database query. Matches the suggest route described in
+api/src/routes/search.sigil.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+
+_NON_WORD_RE = re.compile(r'[^\w]+')
+
+def normalize(text):
+    """Lowercase, accent-free, single-spaced form used for keys and queries"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD_RE.sub(' ', text.casefold()).strip()
+
+def _word_starts(key):
+    yield 0
+    for match in re.finditer(' ', key):
+        yield match.end()
+
+class SuggestIndex:
+    """Prefix index over (entity_type, id, text) entries
+
+    Every word of every text is a key start, so "chero" finds "Treaty with
+    the Cherokee" as well as "Cherokee Nation". Keys that start at the
+    beginning of the text rank ahead of mid-text matches.
+
+    Keys are kept in one sorted array per (entity type, mid-text), so a
+    type filter never has to step over other types' keys, and mid-text
+    keys are only read when the text-start matches don't fill the limit.
+    """
+
+    def __init__(self, entries):
+        keys = {}
+        self.entries = []
+        for entity_type, entity_id, text in entries:
+            key = normalize(text)
+            if not key:
+                continue
+            entry = len(self.entries)
+            self.entries.append((entity_type, entity_id, text))
+            for start in _word_starts(key):
+                keys.setdefault((entity_type, start > 0), []).append((key[start:], entry))
+        # (entity_type, mid_text) -> (sorted keys, entry of each key)
+        self.keys = {}
+        for bucket, pairs in keys.items():
+            pairs.sort()
+            self.keys[bucket] = ([k for k, _ in pairs], [entry for _, entry in pairs])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def suggest(self, query, limit=10, types=None):
+        """Up to `limit` entries with a word starting with `query`, best first"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        candidates = {}
+        for mid_text in (False, True):
+            # Every entity found at a text start already outranks anything
+            # found only mid-text
+            if len(candidates) >= limit:
+                break
+            for (entity_type, bucket_mid_text), (keys, entries) in self.keys.items():
+                if bucket_mid_text != mid_text or (types is not None and entity_type not in types):
+                    continue
+                i = bisect_left(keys, prefix)
+                while i < len(keys) and keys[i].startswith(prefix):
+                    entry = entries[i]
+                    entity_id, text = self.entries[entry][1:]
+                    # One suggestion per entity: its best-ranked name
+                    rank = (mid_text, len(text), text)
+                    best = candidates.get((entity_type, entity_id))
+                    if best is None or rank < best[0]:
+                        candidates[(entity_type, entity_id)] = (rank, entry)
+                    i += 1
+
+        ranked = sorted(candidates.values())[:limit]
+        return [self.entries[entry] for _, entry in ranked]
@@ -0,0 +1,67 @@
+"""Shared fixtures for the Python fallback API tests
+
+Nothing here needs PostgreSQL. DATABASE_URL points at a port nothing
+listens on, so any code path that reaches for the database fails fast.
+Routes under test are served from fixture data, such as an in-memory
+catalog.
+"""
+
+import json
+import os
+import sys
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DATABASE_URL', 'postgresql://127.0.0.1:1/windwalker_test')
+# The catalog is installed by the tests that want it, never loaded
+os.environ.setdefault('CATALOG', '0')
+
+import server  # noqa: E402
+from fixture_rows import build_catalog  # noqa: E402
+
+
+class Client:
+    """Minimal JSON client for a server started by the `api` fixture"""
+
+    def __init__(self, port):
+        self.root = f'http://127.0.0.1:{port}'
+
+    def request(self, path, body=None):
+        data = None if body is None else json.dumps(body).encode()
+        request = Request(self.root + path, data=data, method='GET' if body is None else 'POST')
+        try:
+            with urlopen(request) as response:
+                return response.status, json.load(response)
+        except HTTPError as e:
+            return e.code, json.load(e)
+
+    def get(self, path):
+        return self.request(path)
+
+    def post(self, path, body):
+        return self.request(path, body)
+
+
+@pytest.fixture
+def api():
+    httpd = server.PooledHTTPServer(('127.0.0.1', 0), server.WindwalkerHandler, 4)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield Client(httpd.server_address[1])
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        server._response_cache.clear()
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    """The fixture catalog, installed as the server's current one"""
+    catalog = build_catalog()
+    monkeypatch.setitem(server._catalog, 'catalog', catalog)
+    return catalog
@@ -0,0 +1,87 @@
+"""Fixture rows shaped like the catalog and listing queries return them
+
+Three tribes and a handful of treaties. There are dated treaties across
+several years, two treaties signed on the same day (so ties break on
+id), and undated treaties that sort last. One party has no linked tribe.
+"""
+
+from catalog import Catalog, TreatyRecord, TribeRecord
+
+SOURCE = ('Kappler', 0.98)
+
+TRIBES = [
+    # (id, name)
+    ('30000000-0000-0000-0000-000000000002', 'Cherokee'),
+    ('30000000-0000-0000-0000-000000000001', 'Osage'),
+    ('30000000-0000-0000-0000-000000000003', 'Ute'),
+]
+CHEROKEE, OSAGE, UTE = (tribe_id for tribe_id, _ in TRIBES)
+
+TREATIES = [
+    # (id, signed_date, linked tribe ids)
+    ('10000000-0000-0000-0000-000000000005', '1785-11-28', [CHEROKEE]),
+    ('10000000-0000-0000-0000-000000000002', '1808-11-10', [OSAGE]),
+    ('10000000-0000-0000-0000-000000000001', '1808-11-10', [OSAGE, CHEROKEE]),
+    ('10000000-0000-0000-0000-000000000004', '1825-06-02', [OSAGE]),
+    ('10000000-0000-0000-0000-000000000003', '1868-03-02', [UTE]),
+    ('10000000-0000-0000-0000-000000000007', None, [CHEROKEE]),
+    ('10000000-0000-0000-0000-000000000006', None, []),
+]
+
+
+def tribe_row(tribe_id, name):
+    """A raw_tribes row as SELECT * returns it (the detail page's columns)"""
+    return {
+        'id': tribe_id,
+        'source_id': '20000000-0000-0000-0000-000000000001',
+        'name': name,
+        'name_evidentiality': 'reported',
+        'alternate_names': [f'{name} Nation'],
+        'region': 'Eastern Oklahoma',
+        'state': 'OK',
+        'federally_recognized': True,
+        'treaty_count': sum(tribe_id in linked for _, _, linked in TREATIES),
+    }
+
+
+def treaty_row(treaty_id, signed_date, linked):
+    """A treaty row with both the list-view and the detail-view columns"""
+    names = dict(TRIBES)
+    validated = treaty_id[-1] in '135'
+    return {
+        'id': treaty_id,
+        'name': f'Treaty {treaty_id[-1]}',
+        'signed_date': signed_date,
+        'date_signed_text': signed_date,
+        'ratified_date': None,
+        'tribes': [names[tribe_id] for tribe_id in linked] + ['Unlinked Band'],
+        'tribe_links': [{'id': tribe_id, 'party': names[tribe_id]} for tribe_id in linked] or None,
+        'us_commissioners': ['A. Commissioner'],
+        'signatories': None,
+        'preamble': 'Articles of a treaty',
+        'articles': [{'number': 1, 'text': 'Peace'}],
+        'statutes_at_large_citation': '7 Stat. 1',
+        'kappler_volume': 2,
+        'kappler_page': int(treaty_id[-1]),
+        'is_validated': validated,
+        'status': 'Active' if validated else 'Unknown',
+        'certainty': 'Verified' if validated else 'Reported',
+        'source_url': f'https://example.org/kappler/{treaty_id[-1]}',
+        'source_name': SOURCE[0],
+        'source_reliability': SOURCE[1],
+    }
+
+
+def tribe_rows():
+    return [tribe_row(*tribe) for tribe in TRIBES]
+
+
+def treaty_rows():
+    return [treaty_row(*treaty) for treaty in TREATIES]
+
+
+def build_catalog():
+    import server
+    treaties = [TreatyRecord(row, server.treaty_tribes(row), SOURCE) for row in treaty_rows()]
+    tribes = tribe_rows()
+    return Catalog(treaties, [TribeRecord(row) for row in tribes], list(tribes[0]))
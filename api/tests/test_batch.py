@@ -0,0 +1,46 @@
+import server
+from fixture_rows import CHEROKEE, OSAGE
+
+BATCHABLE = [
+    '/api/v1/treaties?limit=3',
+    '/api/v1/treaties?year=1800&year_end=1830&fields=name',
+    '/api/v1/treaties/10000000-0000-0000-0000-000000000001',
+    '/api/v1/treaties/not-a-uuid',
+    '/api/v1/tribes?limit=2',
+    f'/api/v1/tribes/{OSAGE}',
+    f'/api/v1/tribes/{CHEROKEE}/treaties',
+    '/api/v1/nowhere',
+]
+
+
+def test_batched_responses_match_unbatched(api, catalog):
+    status, batched = api.post('/api/v1/batch', {'requests': [{'path': p} for p in BATCHABLE]})
+    assert status == 200
+    assert [item['path'] for item in batched['responses']] == BATCHABLE
+    for path, item in zip(BATCHABLE, batched['responses']):
+        assert (item['status'], item['body']) == api.get(path), path
+
+
+def test_batch_reads_data_version_once_outside_its_snapshot(api, catalog, monkeypatch):
+    reads = []
+
+    def read_data_version():
+        reads.append(getattr(server._request_state, 'batch', None))
+        return 'v1'
+
+    monkeypatch.setattr(server, '_read_data_version', read_data_version)
+    monkeypatch.setattr(server, 'DATA_VERSION_TTL', 0)
+    monkeypatch.setitem(server._data_version, 'value', None)
+    monkeypatch.setitem(server._data_version, 'checked', 0.0)
+
+    status, batched = api.post('/api/v1/batch', {'requests': [{'path': p} for p in BATCHABLE[:5]]})
+    assert status == 200
+    assert [item['status'] for item in batched['responses']] == [200, 200, 200, 404, 200]
+    assert reads == [None]
+
+
+def test_batch_rejects_unbatchable_paths(api):
+    status, body = api.post('/api/v1/batch', {'requests': [{'path': '/api/v1/export'}]})
+    assert status == 400
+    status, body = api.post('/api/v1/batch', {'requests': []})
+    assert status == 400
@@ -0,0 +1,318 @@
+from collections import namedtuple
+from contextlib import contextmanager
+
+import pytest
+
+import server
+from catalog import Catalog, TreatyRecord, TribeRecord
+from fixture_rows import CHEROKEE, OSAGE, SOURCE, build_catalog, treaty_rows, tribe_row, tribe_rows
+
+# Listing order of the fixture treaties: dated by (date, id), then undated by id
+DATED = [
+    '10000000-0000-0000-0000-000000000005',
+    '10000000-0000-0000-0000-000000000001',
+    '10000000-0000-0000-0000-000000000002',
+    '10000000-0000-0000-0000-000000000004',
+    '10000000-0000-0000-0000-000000000003',
+]
+UNDATED = [
+    '10000000-0000-0000-0000-000000000006',
+    '10000000-0000-0000-0000-000000000007',
+]
+
+
+def ids(records):
+    return [record.id for record in records]
+
+
+def walk_treaties(catalog, limit, year=None, year_end=None):
+    """Every treaty id the catalog lists, `limit` at a time, as the handler pages"""
+    seen, after = [], None
+    while True:
+        page, _ = catalog.treaty_page(year, year_end, after, limit + 1)
+        seen += ids(page[:limit])
+        if len(page) <= limit:
+            return seen
+        last = page[limit - 1]
+        after = (last.signed_date, last.id)
+
+
+@pytest.mark.parametrize('year, year_end, expected', [
+    (None, None, DATED + UNDATED),
+    (1808, 1808, DATED[1:3]),
+    (1800, None, DATED[1:]),
+    (None, 1808, DATED[:3]),
+    (1809, 1824, []),
+    (1830, 1820, []),
+])
+def test_treaty_page_year_bounds(year, year_end, expected):
+    page, total = build_catalog().treaty_page(year, year_end, limit=100)
+    assert ids(page) == expected
+    assert total == len(expected)
+
+
+def test_treaty_page_moves_from_dated_to_undated_after_the_last_dated_treaty():
+    catalog = build_catalog()
+    last_dated = catalog.treaties[DATED[-1]]
+    page, total = catalog.treaty_page(after=(last_dated.signed_date, last_dated.id), limit=10)
+    assert ids(page) == UNDATED
+    assert total == len(DATED) + len(UNDATED)
+
+    page, _ = catalog.treaty_page(after=(None, UNDATED[0]), limit=10)
+    assert ids(page) == UNDATED[1:]
+
+
+def test_treaty_page_leaves_undated_out_of_year_ranges_after_a_cursor():
+    catalog = build_catalog()
+    last_dated = catalog.treaties[DATED[-1]]
+    page, total = catalog.treaty_page(1800, None, (last_dated.signed_date, last_dated.id), limit=10)
+    assert page == []
+    assert total == len(DATED) - 1
+
+
+def test_treaty_page_limit_landing_on_the_dated_undated_boundary():
+    catalog = build_catalog()
+    # The extra row that says another page follows is the first undated one
+    page, _ = catalog.treaty_page(limit=len(DATED) + 1)
+    assert ids(page) == DATED + UNDATED[:1]
+    page, _ = catalog.treaty_page(limit=len(DATED))
+    assert ids(page) == DATED
+
+
+@pytest.mark.parametrize('limit', range(1, 9))
+def test_treaty_pages_cover_every_treaty_once(limit):
+    assert walk_treaties(build_catalog(), limit) == DATED + UNDATED
+    assert walk_treaties(build_catalog(), limit, 1800, 1830) == DATED[1:4]
+
+
+def test_tribe_page_keeps_the_order_it_was_loaded_in():
+    # As a case-insensitive collation orders them; code-point order would not
+    rows = [tribe_row('40000000-0000-0000-0000-000000000002', 'abenaki'),
+            tribe_row('40000000-0000-0000-0000-000000000001', 'Cherokee'),
+            tribe_row('40000000-0000-0000-0000-000000000003', 'Ézé')]
+    catalog = Catalog([], [TribeRecord(row) for row in rows], list(rows[0]))
+    page, total = catalog.tribe_page(limit=10)
+    assert [t.name for t in page] == ['abenaki', 'Cherokee', 'Ézé']
+    assert total == 3
+
+    page, _ = catalog.tribe_page(('abenaki', rows[0]['id']), limit=1)
+    assert [t.name for t in page] == ['Cherokee']
+    page, _ = catalog.tribe_page(('Cherokee', rows[1]['id']), limit=10)
+    assert [t.name for t in page] == ['Ézé']
+    page, _ = catalog.tribe_page(('Ézé', rows[2]['id']), limit=10)
+    assert page == []
+
+
+def test_tribe_page_defers_to_the_database_for_a_tribe_it_cannot_place():
+    catalog = build_catalog()
+    assert catalog.tribe_page(('Osage', '40000000-0000-0000-0000-00000000000f'), limit=10) is None
+    # Renamed since the cursor was issued
+    assert catalog.tribe_page(('Great Osage', OSAGE), limit=10) is None
+
+
+def test_tribe_treaties_in_listing_order():
+    catalog = build_catalog()
+    assert ids(catalog.tribe_treaties[CHEROKEE]) == [DATED[0], DATED[1], UNDATED[1]]
+    assert ids(catalog.tribe_treaties[OSAGE]) == DATED[1:4]
+
+
+# ----------------------------------------------------------------------------
+# Catalog and SQL paths of the handlers, on the same fixture rows
+# ----------------------------------------------------------------------------
+
+def _bound(value):
+    return {'-infinity': '0000-00-00', 'infinity': '9999-99-99'}.get(value, value)
+
+
+class FixtureCursor:
+    """Answers the listing and detail PREPARED_QUERIES from the fixture rows,
+    following what each query's SQL says it does"""
+
+    def __init__(self):
+        self.treaties = treaty_rows()
+        self.tribes = tribe_rows()
+        self.rows = []
+
+    def run(self, name, params):
+        dated = sorted((t for t in self.treaties if t['signed_date']), key=lambda t: (t['signed_date'], t['id']))
+        undated = sorted((t for t in self.treaties if not t['signed_date']), key=lambda t: t['id'])
+        if name == 'treaty_count':
+            since, until, with_undated = params
+            self.rows = [{'total': sum(_bound(since) <= t['signed_date'] < _bound(until) for t in dated)
+                          + (len(undated) if with_undated else 0)}]
+        elif name == 'treaty_page':
+            since, until, after_date, after_id, after_undated, limit = params
+            page = [t for t in dated if _bound(since) <= t['signed_date'] < _bound(until)
+                    and (t['signed_date'], t['id']) > (_bound(after_date), after_id)]
+            if after_undated is not None:
+                page += [t for t in undated if t['id'] > after_undated]
+            self.rows = page[:limit]
+        elif name == 'treaty_detail':
+            self.rows = [t for t in self.treaties if t['id'] == params[0]]
+        elif name == 'tribe_count':
+            self.rows = [{'total': len(self.tribes)}]
+        elif name == 'tribe_page':
+            after_name, after_id, limit = params
+            self.rows = [dict(t, certainty=t['name_evidentiality']) for t in self.tribes
+                         if (t['name'], t['id']) > (after_name, after_id)][:limit]
+        elif name == 'tribe_detail':
+            self.rows = [t for t in self.tribes if t['id'] == params[0]]
+        elif name == 'tribe_treaties':
+            self.rows = [t for t in dated + undated
+                         if any(link['id'] == params[0] for link in t['tribe_links'] or [])]
+        else:
+            raise AssertionError(f'unexpected query {name}')
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+def use_sql_path(monkeypatch):
+    """Serve the handlers' database path from FixtureCursor"""
+    @contextmanager
+    def db_cursor():
+        yield FixtureCursor()
+
+    monkeypatch.setattr(server, 'db_cursor', db_cursor)
+    monkeypatch.setattr(server, 'execute_prepared', lambda cur, name, params=(): cur.run(name, params))
+    monkeypatch.setitem(server._catalog, 'catalog', None)
+
+
+ROUTES = [
+    '/api/v1/treaties',
+    '/api/v1/treaties?limit=2',
+    '/api/v1/treaties?limit=5',
+    '/api/v1/treaties?year=1808&year_end=1830',
+    '/api/v1/treaties?year=1800&fields=name,tribes',
+    f'/api/v1/treaties/{DATED[1]}',
+    f'/api/v1/treaties/{UNDATED[0].upper()}',
+    '/api/v1/treaties/10000000-0000-0000-0000-0000000000ff',
+    '/api/v1/treaties/nope',
+    '/api/v1/tribes',
+    '/api/v1/tribes?limit=1',
+    f'/api/v1/tribes/{OSAGE}',
+    f'/api/v1/tribes/{CHEROKEE}/treaties',
+    '/api/v1/tribes/nope/treaties',
+]
+
+
+def with_cursor(path, cursor):
+    return f"{path}{'&' if '?' in path else '?'}cursor={cursor}"
+
+
+def responses(api, paths):
+    """Responses to `paths`, following each listing's next_cursor to the end"""
+    result = []
+    for path in paths:
+        page = path
+        while page:
+            status, body = api.get(page)
+            result.append((page, status, body))
+            page = body.get('next_cursor') and with_cursor(path.split('cursor=')[0].rstrip('?&'), body['next_cursor'])
+    return result
+
+
+def test_catalog_and_sql_paths_serve_the_same_responses(api, catalog, monkeypatch):
+    from_catalog = responses(api, ROUTES)
+    use_sql_path(monkeypatch)
+    assert responses(api, ROUTES) == from_catalog
+
+
+@pytest.mark.parametrize('path, key', [
+    ('/api/v1/treaties?limit=3', 'treaties'),
+    ('/api/v1/treaties?limit=5', 'treaties'),
+    ('/api/v1/treaties?limit=6', 'treaties'),
+    ('/api/v1/tribes?limit=1', 'tribes'),
+])
+def test_catalog_cursor_continues_on_the_sql_path(api, catalog, monkeypatch, path, key):
+    _, whole = api.get(path.split('?')[0] + '?limit=100')
+    _, first = api.get(path)
+    use_sql_path(monkeypatch)
+    rest = [item for _, _, body in responses(api, [with_cursor(path, first['next_cursor'])]) for item in body[key]]
+    assert first[key] + rest == whole[key]
+
+
+# ----------------------------------------------------------------------------
+# Reloads
+# ----------------------------------------------------------------------------
+
+Column = namedtuple('Column', 'name')
+
+
+class SnapshotCursor:
+    """Cursor over the fixture rows for CATALOG_QUERIES, recording what ran"""
+
+    def __init__(self, ran):
+        self.ran = ran
+        self.rows = []
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if sql == server.CATALOG_QUERIES['treaties']:
+            self.ran.append('treaties')
+            self.rows = treaty_rows()
+        else:
+            self.ran.append('tribes')
+            self.rows = tribe_rows()
+            self.description = [Column(name) for name in self.rows[0]]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+@pytest.fixture
+def snapshot_queries(monkeypatch):
+    ran = []
+
+    class Connection:
+        def cursor(self):
+            return SnapshotCursor(ran)
+
+    @contextmanager
+    def db_snapshot():
+        yield Connection()
+
+    monkeypatch.setattr(server, 'db_snapshot', db_snapshot)
+    monkeypatch.setitem(server._catalog, 'catalog', None)
+    return ran
+
+
+@pytest.mark.parametrize('changed, reads', [
+    (None, ['treaties', 'tribes']),
+    ({'raw_tribes'}, ['tribes']),
+    ({'raw_treaties', 'data_sources'}, ['treaties']),
+    ({'treaty_tribes', 'raw_tribes'}, ['treaties', 'tribes']),
+    ({'something_else'}, ['treaties', 'tribes']),
+])
+def test_reload_reads_only_what_changed(snapshot_queries, changed, reads):
+    first = server.reload_catalog()
+    assert snapshot_queries == ['treaties', 'tribes']
+    del snapshot_queries[:]
+
+    second = server.reload_catalog(changed)
+    assert snapshot_queries == reads
+    assert second.generation == first.generation + 1
+    assert server._catalog['catalog'] is second
+    if 'treaties' not in reads:
+        assert second.treaties[DATED[0]] is first.treaties[DATED[0]]
+    if 'tribes' not in reads:
+        assert second.tribes[OSAGE] is first.tribes[OSAGE]
+    assert ids(second.tribe_treaties[OSAGE]) == DATED[1:4]
+
+
+def test_treaty_detail_matches_the_rows_it_was_built_from():
+    row = treaty_rows()[1]
+    detail = TreatyRecord(row, server.treaty_tribes(row), SOURCE).detail()
+    assert detail['tribes'] == [{'id': OSAGE, 'name': 'Osage'}, {'id': 'Unlinked Band', 'name': 'Unlinked Band'}]
+    assert detail['sources'][0]['reliability'] == SOURCE[1]
+    assert detail['kappler_citation'] == f"Kappler Vol. 2, p. {row['kappler_page']}"
+    assert TreatyRecord(row, server.treaty_tribes(row), SOURCE).summary() == server.treaty_summary(row)
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+import metrics
+from metrics import Counter, Gauge, Histogram, Registry, SharedDirectory
+
+
+def registry():
+    r = Registry()
+    requests = r.register(Counter('requests_total', 'Requests', ('route', 'status')))
+    latency = r.register(Histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0)))
+    r.register(Gauge('pool_connections', 'Connections', ('state',), lambda: [(('idle',), 2)]))
+    return r, requests, latency
+
+
+def test_render_exposition_format():
+    r, requests, latency = registry()
+    requests.inc('/a', 200)
+    requests.inc('/a', 200, amount=2)
+    requests.inc('/b"\n', 500)
+    latency.observe(0.05, '/a')
+    latency.observe(0.5, '/a')
+    latency.observe(3, '/a')
+
+    assert r.render().splitlines() == [
+        '# HELP requests_total Requests',
+        '# TYPE requests_total counter',
+        'requests_total{route="/a",status="200"} 3',
+        'requests_total{route="/b\\"\\n",status="500"} 1',
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 3.55',
+        'latency_seconds_count{route="/a"} 3',
+        '# HELP pool_connections Connections',
+        '# TYPE pool_connections gauge',
+        'pool_connections{state="idle"} 2',
+    ]
+
+
+@pytest.mark.parametrize('collect', [lambda: None, lambda: 1 / 0])
+def test_gauge_without_a_value_has_no_samples(collect):
+    assert list(Gauge('g', 'G', collect=collect).samples()) == []
+
+
+def test_request_db_time_is_per_thread_request():
+    metrics.record_statement('SELECT 1', 1.0)  # outside a request: ignored
+    metrics.begin_request(keep_statements=True)
+    metrics.record_statement('SELECT 1', 0.25)
+    metrics.record_statement('SELECT 2', 0.5)
+    assert metrics.end_request() == (0.75, [('SELECT 1', 0.25), ('SELECT 2', 0.5)])
+    assert metrics.end_request() == (0.0, None)
+
+
+def test_shared_render_sums_every_process(tmp_path, monkeypatch):
+    # Two "workers" in one test process, told apart by the pid they write as
+    pids = iter([101, 102])
+    monkeypatch.setattr(os, 'getpid', lambda: next(pids))
+    first, first_requests, first_latency = registry()
+    first.shared = SharedDirectory(first, str(tmp_path))
+    second, second_requests, second_latency = registry()
+    second.shared = SharedDirectory(second, str(tmp_path))
+
+    first_requests.inc('/a', 200, amount=2)
+    first_latency.observe(0.05, '/a')
+    second_requests.inc('/a', 200)
+    second_requests.inc('/b', 404)
+    second_latency.observe(0.5, '/a')
+    second.shared.write()
+
+    # 102 has exited: its counts stay, its gauges go
+    monkeypatch.setattr(os, 'getpid', lambda: 101)
+    monkeypatch.setattr(metrics, '_pid_alive', lambda pid: False)
+    lines = first.render().splitlines()
+    assert 'requests_total{route="/a",status="200"} 3' in lines
+    assert 'requests_total{route="/b",status="404"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_sum{route="/a"} 0.55' in lines
+    assert [line for line in lines if line.startswith('pool_connections')] == [
+        'pool_connections{state="idle",worker="101"} 2']
+
+    monkeypatch.setattr(metrics, '_pid_alive', lambda pid: True)
+    lines = first.render().splitlines()
+    assert 'pool_connections{state="idle",worker="102"} 2' in lines
+    # Rendering merges into a copy, never into the live counts
+    assert first_requests.state() == {('/a', 200): 2}
+
+
+def test_shared_directory_close_leaves_final_counts(tmp_path):
+    r, requests, _ = registry()
+    shared = SharedDirectory(r, str(tmp_path), interval=60)
+    shared.start()
+    requests.inc('/a', 200)
+    shared.close()
+    assert os.listdir(tmp_path) == [f'{os.getpid()}.json']
+    assert '"requests_total": [[["/a", 200], 1]]' in (tmp_path / f'{os.getpid()}.json').read_text()
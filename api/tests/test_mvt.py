@@ -0,0 +1,247 @@
+import struct
+
+import pytest
+
+import mvt
+
+# ----------------------------------------------------------------------------
+# A minimal MVT reader, independent of the encoder's helpers
+# ----------------------------------------------------------------------------
+
+def read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def read_message(buf):
+    """[(field number, value)]; length-delimited values are left as bytes"""
+    fields, pos = [], 0
+    while pos < len(buf):
+        key, pos = read_varint(buf, pos)
+        number, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, pos = read_varint(buf, pos)
+        elif wire_type == 1:
+            value, pos = struct.unpack('<d', buf[pos:pos + 8])[0], pos + 8
+        elif wire_type == 2:
+            length, pos = read_varint(buf, pos)
+            value, pos = buf[pos:pos + length], pos + length
+        else:
+            raise AssertionError(f'unexpected wire type {wire_type}')
+        fields.append((number, value))
+    return fields
+
+
+def read_packed(buf):
+    values, pos = [], 0
+    while pos < len(buf):
+        value, pos = read_varint(buf, pos)
+        values.append(value)
+    return values
+
+
+def unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def decode_geometry(commands):
+    """Absolute paths: one per MoveTo point, extended by LineTo, closed by ClosePath"""
+    paths, x, y, i = [], 0, 0, 0
+    while i < len(commands):
+        command, count = commands[i] & 0x7, commands[i] >> 3
+        i += 1
+        if command == 7:
+            paths[-1].append(paths[-1][0])
+            continue
+        for _ in range(count):
+            x += unzigzag(commands[i])
+            y += unzigzag(commands[i + 1])
+            i += 2
+            if command == 1:
+                paths.append([(x, y)])
+            else:
+                paths[-1].append((x, y))
+    return paths
+
+
+def decode_value(buf):
+    (number, value), = read_message(buf)
+    return {1: lambda v: v.decode('utf-8'), 3: float, 5: int, 6: unzigzag, 7: bool}[number](value)
+
+
+def decode_tile(data):
+    """{layer name: {'version', 'extent', 'keys', 'values', 'features'}}"""
+    layers = {}
+    for number, layer_buf in read_message(data):
+        assert number == 3
+        fields = read_message(layer_buf)
+        layer = dict(fields)
+        keys = [v.decode('utf-8') for n, v in fields if n == 3]
+        values = [decode_value(v) for n, v in fields if n == 4]
+        features = []
+        for n, feature_buf in fields:
+            if n != 2:
+                continue
+            feature = dict(read_message(feature_buf))
+            tags = read_packed(feature.get(2, b''))
+            features.append({
+                'id': feature.get(1),
+                'type': feature[3],
+                'properties': {keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)},
+                'geometry': decode_geometry(read_packed(feature[4])),
+            })
+        layers[layer[1].decode('utf-8')] = {
+            'version': layer[15], 'extent': layer[5], 'keys': keys, 'values': values, 'features': features,
+        }
+    return layers
+
+# ----------------------------------------------------------------------------
+# Encoding
+# ----------------------------------------------------------------------------
+
+SQUARE = [(0, 0), (0, 100), (100, 100), (100, 0)]
+HOLE = [(20, 20), (80, 20), (80, 80), (20, 80)]
+
+
+def test_polygon_with_hole_round_trips():
+    layer = mvt.Layer('treaties')
+    layer.add_feature(mvt.GEOM_POLYGON, mvt.encode_polygon_geometry([[SQUARE, HOLE]]),
+                      {'name': 'Treaty', 'year': 1825}, feature_id=7)
+    tile = decode_tile(mvt.encode_tile([layer]))
+
+    assert list(tile) == ['treaties']
+    treaties = tile['treaties']
+    assert (treaties['version'], treaties['extent']) == (2, mvt.TILE_EXTENT)
+    feature, = treaties['features']
+    assert feature['id'] == 7
+    assert feature['type'] == mvt.GEOM_POLYGON
+    assert feature['properties'] == {'name': 'Treaty', 'year': 1825}
+    exterior, hole = feature['geometry']
+    # Closed, exterior clockwise on screen (positive area), hole the other way
+    assert exterior[0] == exterior[-1] and hole[0] == hole[-1]
+    assert mvt.ring_area(exterior[:-1]) > 0 > mvt.ring_area(hole[:-1])
+    assert set(exterior) == set(SQUARE)
+    assert set(hole) == set(HOLE)
+
+
+def test_rings_are_reoriented_only_when_needed():
+    clockwise = mvt.encode_polygon_geometry([[SQUARE]])
+    counter = mvt.encode_polygon_geometry([[SQUARE[::-1]]])
+    assert decode_geometry(clockwise) == decode_geometry(counter)
+
+
+def test_geometry_cursor_carries_across_polygons():
+    far = [(3000, 3000), (3000, 3100), (3100, 3100), (3100, 3000)]
+    paths = decode_geometry(mvt.encode_polygon_geometry([[SQUARE], [far]]))
+    assert [set(path) for path in paths] == [set(SQUARE), set(far)]
+
+
+def test_points_and_negative_coordinates():
+    layer = mvt.Layer('tribes')
+    layer.add_feature(mvt.GEOM_POINT, mvt.encode_point_geometry([(-5, 4100), (10, -64)]), {})
+    feature, = decode_tile(mvt.encode_tile([layer]))['tribes']['features']
+    assert feature['id'] is None
+    assert feature['properties'] == {}
+    assert feature['geometry'] == [[(-5, 4100)], [(10, -64)]]
+
+
+def test_property_values_and_deduplication():
+    layer = mvt.Layer('tribes')
+    properties = {'name': 'Osage', 'count': 300, 'delta': -3, 'share': 0.25,
+                  'recognized': True, 'one': 1, 'missing': None}
+    layer.add_feature(mvt.GEOM_POINT, mvt.encode_point_geometry([(1, 1)]), properties)
+    layer.add_feature(mvt.GEOM_POINT, mvt.encode_point_geometry([(2, 2)]), {'name': 'Osage', 'count': 1})
+    tribes = decode_tile(mvt.encode_tile([layer]))['tribes']
+
+    first, second = tribes['features']
+    expected = {k: v for k, v in properties.items() if v is not None}
+    assert first['properties'] == expected
+    assert type(first['properties']['recognized']) is bool
+    assert type(first['properties']['one']) is int
+    assert second['properties'] == {'name': 'Osage', 'count': 1}
+    # True and 1 are different values; repeats share one entry
+    assert tribes['keys'] == ['name', 'count', 'delta', 'share', 'recognized', 'one']
+    assert tribes['values'] == ['Osage', 300, -3, 0.25, True, 1]
+
+
+def test_empty_geometry_is_skipped_and_layers_concatenate():
+    first, second = mvt.Layer('a'), mvt.Layer('b', extent=512)
+    first.add_feature(mvt.GEOM_POLYGON, [], {'name': 'nothing'})
+    second.add_feature(mvt.GEOM_POINT, mvt.encode_point_geometry([(1, 2)]), {})
+    tile = decode_tile(mvt.encode_tile([first, second]))
+    assert tile['a']['features'] == []
+    assert tile['b']['extent'] == 512
+    assert len(first) == 0 and len(second) == 1
+
+
+@pytest.mark.parametrize('n', [0, 1, 127, 128, 300, 2 ** 32])
+def test_varint(n):
+    assert read_varint(mvt._varint(n), 0) == (n, len(mvt._varint(n)))
+
+# ----------------------------------------------------------------------------
+# Tile math and clipping
+# ----------------------------------------------------------------------------
+
+def test_tile_to_bbox():
+    lon_min, lat_min, lon_max, lat_max = mvt.tile_to_bbox(0, 0, 0)
+    assert (lon_min, lon_max) == (-180, 180)
+    assert lat_max == pytest.approx(mvt.MAX_LATITUDE) and lat_min == pytest.approx(-mvt.MAX_LATITUDE)
+    assert mvt.tile_to_bbox(1, 1, 0) == pytest.approx((0, 0, 180, mvt.MAX_LATITUDE))
+
+
+def test_project_and_tiles_covering():
+    assert mvt.project(0, 0) == pytest.approx((0.5, 0.5))
+    assert mvt.project(-180, 90) == pytest.approx((0, 0))
+    # Kansas, at zoom 4
+    assert mvt.tiles_covering((-102.05, 36.99, -94.59, 40.0), 4) == (3, 6, 3, 6)
+    assert mvt.tiles_covering((-180, -90, 180, 90), 2) == (0, 0, 3, 3)
+
+
+def test_buffered_tile_bbox_contains_the_tile():
+    inner = mvt.tile_to_bbox(5, 7, 12)
+    outer = mvt.buffered_tile_bbox(5, 7, 12)
+    assert outer[0] < inner[0] and outer[1] < inner[1] and outer[2] > inner[2] and outer[3] > inner[3]
+
+
+def test_clip_ring():
+    # A diamond over the square, cutting 3x3 triangles off its corners
+    clipped = mvt.clip_ring([(5, -2), (12, 5), (5, 12), (-2, 5)], 0, 10)
+    assert all(0 <= x <= 10 and 0 <= y <= 10 for x, y in clipped)
+    assert len(clipped) == 8
+    assert abs(mvt.ring_area(clipped)) == pytest.approx(100 - 4 * 4.5)
+
+
+def test_tile_polygons_clips_to_the_buffered_tile():
+    # A world-sized square: the tile is entirely inside it
+    world = [[[(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)]]]
+    (ring,), = mvt.tile_polygons(world, 3, 2, 5)
+    lo, hi = -mvt.TILE_BUFFER, mvt.TILE_EXTENT + mvt.TILE_BUFFER
+    assert sorted(ring) == [(lo, lo), (lo, hi), (hi, lo), (hi, hi)]
+
+
+def test_tile_polygons_drops_what_falls_outside_or_collapses():
+    inside = [(0.1, 0.1), (0.2, 0.1), (0.2, 0.2), (0.1, 0.2)]
+    outside = [(0.6, 0.6), (0.7, 0.6), (0.7, 0.7), (0.6, 0.7)]
+    speck = [(0.15, 0.15), (0.15000001, 0.15), (0.15, 0.15000001)]
+    # An exterior outside the tile takes its holes with it
+    assert mvt.tile_polygons([[outside, inside]], 1, 0, 0) == []
+    polygons = mvt.tile_polygons([[inside, speck, outside]], 1, 0, 0)
+    assert len(polygons) == 1 and len(polygons[0]) == 1
+
+
+def test_drop_collinear():
+    assert mvt._drop_collinear([(0, 0), (5, 0), (10, 0), (10, 10), (0, 10)]) == [(0, 0), (10, 0), (10, 10), (0, 10)]
+    # The tip of a zero-width spike goes too
+    assert mvt._drop_collinear([(0, 0), (10, 0), (10, 5), (15, 5), (10, 5), (10, 10), (0, 10)]) == \
+        [(0, 0), (10, 0), (10, 10), (0, 10)]
+
+
+def test_tile_point():
+    assert mvt.tile_point(0, 0, 1, 1, 1) == (0, 0)
+    assert mvt.tile_point(0, 0, 1, 0, 0) == (mvt.TILE_EXTENT, mvt.TILE_EXTENT)
@@ -0,0 +1,86 @@
+import threading
+import time
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+import server
+
+
+def serve(handler_class, max_workers):
+    httpd = server.PooledHTTPServer(('127.0.0.1', 0), handler_class, max_workers)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def connect(httpd):
+    return HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=10)
+
+
+def test_a_slow_request_does_not_hold_up_others():
+    release = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/slow':
+                release.wait(10)
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = serve(Handler, 2)
+    try:
+        slow = connect(httpd)
+        slow.request('GET', '/slow')
+        fast = connect(httpd)
+        started = time.monotonic()
+        fast.request('GET', '/fast')
+        assert fast.getresponse().status == 200
+        assert time.monotonic() - started < 2
+        assert not release.is_set()
+        release.set()
+        assert slow.getresponse().status == 200
+    finally:
+        release.set()
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def one_thread():
+    """The API on a single worker thread"""
+    httpd = serve(server.WindwalkerHandler, 1)
+    yield httpd
+    httpd.server_close()
+    server._response_cache.clear()
+
+
+def test_idle_keep_alive_connection_gives_up_its_thread(one_thread):
+    idle = connect(one_thread)
+    idle.request('GET', '/api/v1/nowhere')
+    response = idle.getresponse()
+    response.read()
+    assert response.getheader('Connection') != 'close'
+
+    # The only thread is idling on `idle`; this must not wait KEEPALIVE_TIMEOUT
+    other = connect(one_thread)
+    started = time.monotonic()
+    other.request('GET', '/api/v1/nowhere')
+    assert other.getresponse().status == 404
+    assert time.monotonic() - started < server.KEEPALIVE_TIMEOUT / 2
+    one_thread.shutdown()
+
+
+def test_drain_closes_idle_keep_alive_connections(one_thread):
+    idle = connect(one_thread)
+    idle.request('GET', '/api/v1/nowhere')
+    idle.getresponse().read()
+
+    one_thread.shutdown()
+    started = time.monotonic()
+    assert one_thread.drain(server.KEEPALIVE_TIMEOUT)
+    assert time.monotonic() - started < server.KEEPALIVE_TIMEOUT / 2
@@ -0,0 +1,115 @@
+import math
+import random
+
+import pytest
+
+import simplify
+from simplify import rings_meet, simplify_geometry, simplify_polygon, simplify_ring
+
+SQUARE = [(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)]
+
+# A square whose bottom edge bulges out to y=-1.2 (or in, to y=1.2), less
+# than the 1.5 tolerance, so plain Douglas-Peucker straightens it
+BULGING = [(0, 0), (3, 0), (5, -1.2), (7, 0), (10, 0), (10, 10), (0, 10), (0, 0)]
+NOTCHED = [(0, 0), (3, 0), (5, 1.2), (7, 0), (10, 0), (10, 10), (0, 10), (0, 0)]
+# Reaches down into the bulge, or up into the notch, past y=0
+HOLE = [(4, -0.5), (4, 3), (6, 3), (6, -0.5), (4, -0.5)]
+BELOW = [(4, -3), (6, -3), (6, 0.5), (4, 0.5), (4, -3)]
+
+
+def test_band_for_zoom():
+    assert [simplify.band_for_zoom(z) for z in (0, 2, 3, 8, 11, 12)] == [0, 0, 1, 2, 3, None]
+
+
+def test_rings_meet():
+    assert not rings_meet(SQUARE)
+    assert rings_meet([(0, 0), (10, 10), (10, 0), (0, 10), (0, 0)])
+    assert rings_meet(SQUARE, [[(2, 2), (12, 2), (12, 4), (2, 4), (2, 2)]])
+    # Touching counts
+    assert rings_meet(SQUARE, [[(10, 2), (12, 2), (12, 4), (10, 4), (10, 2)]])
+    assert not rings_meet(SQUARE, [[(2, 2), (4, 2), (4, 4), (2, 4), (2, 2)]])
+
+
+def test_simplify_ring_drops_points_within_tolerance():
+    assert simplify_ring(BULGING, 1.5) == SQUARE
+    assert simplify_ring(BULGING, 1.0) == [(0, 0), (5, -1.2), (10, 0), (10, 10), (0, 10), (0, 0)]
+
+
+def test_simplify_ring_collapse():
+    assert simplify_ring([(0, 0), (1, 0), (1, 0.1), (0.5, 0.2), (0, 0.1), (0, 0)], 1.0) is None
+
+
+def test_simplify_ring_does_not_cross_itself():
+    # A spike up into a bump in the top edge: the bump is within tolerance,
+    # but straightening the top edge would cut the spike off
+    ring = [(0, 0), (4.8, 0), (5, 10.5), (5.2, 0), (10, 0), (10, 10),
+            (6, 10), (5, 10.8), (4, 10), (0, 10), (0, 0)]
+    out = simplify_ring(ring, 1.0)
+    assert (5, 10.8) in out
+    assert not rings_meet(out)
+
+
+def test_exterior_is_not_simplified_through_a_hole():
+    exterior, hole = simplify_polygon([BULGING, HOLE], 1.5)
+    assert (5, -1.2) in exterior
+    assert hole == HOLE
+    assert not rings_meet(exterior, [hole])
+
+
+def test_simplify_ring_keeps_the_ring_when_no_result_is_valid():
+    assert simplify_ring(BULGING, 1.5, valid=lambda out: False) == BULGING
+
+
+def test_collapsed_holes_are_dropped():
+    tiny = [(5, 5), (5.1, 5), (5.1, 5.1), (5.05, 5.12), (5, 5.1), (5, 5)]
+    assert simplify_polygon([SQUARE, tiny], 1.0) == [SQUARE]
+
+
+def test_multipolygon_parts_are_kept_apart():
+    geometry = {'type': 'MultiPolygon', 'coordinates': [[NOTCHED], [BELOW]]}
+    first, second = simplify_geometry(geometry, 1.5)['coordinates']
+    assert (5, 1.2) in first[0]
+    assert not rings_meet(first[0], second)
+    # Alone, the notch would be straightened
+    assert simplify_geometry({'type': 'Polygon', 'coordinates': [NOTCHED]}, 1.5)['coordinates'] == [SQUARE]
+
+
+def test_other_geometries_pass_through():
+    point = {'type': 'Point', 'coordinates': [1, 2]}
+    assert simplify_geometry(point, 1.0) is point
+    assert simplify_geometry(None, 1.0) is None
+
+
+def test_empty_polygons_and_rings_pass_through():
+    assert simplify_geometry({'type': 'Polygon', 'coordinates': []}, 1.5) == {'type': 'Polygon', 'coordinates': []}
+    assert simplify_polygon([[]], 1.5) == [[]]
+    assert simplify_polygon([BULGING, []], 1.5) == [SQUARE]
+    geometry = {'type': 'MultiPolygon', 'coordinates': [[], [[]], [BULGING, []]]}
+    assert simplify_geometry(geometry, 1.5)['coordinates'] == [[], [[]], [SQUARE]]
+
+
+@pytest.mark.skipif(simplify.np is None, reason='NumPy not installed')
+def test_numpy_and_python_masks_agree():
+    rng = random.Random(7)
+    ring = [(math.cos(a) * rng.uniform(0.7, 1), math.sin(a) * rng.uniform(0.7, 1))
+            for a in (2 * math.pi * k / 2000 for k in range(2000))]
+    ring.append(ring[0])
+    for tolerance in (0.001, 0.01, 0.1):
+        assert simplify._keep_mask_numpy(ring, tolerance) == simplify._keep_mask_python(ring, tolerance)
+
+
+def test_build_levels_copies_features():
+    feature = {'type': 'Feature', 'id': 'a', 'properties': {'Name': 'A'},
+               'geometry': {'type': 'Polygon', 'coordinates': [BULGING]}}
+    levels = simplify.build_levels([feature])
+    assert len(levels) == len(simplify.ZOOM_BANDS)
+    assert all(level[0]['properties'] is feature['properties'] for level in levels)
+    assert feature['geometry']['coordinates'] == [BULGING]
+
+
+def test_build_levels_survives_empty_geometries():
+    empty = {'type': 'Feature', 'id': 'e', 'geometry': {'type': 'Polygon', 'coordinates': []}}
+    feature = {'type': 'Feature', 'id': 'a', 'geometry': {'type': 'Polygon', 'coordinates': [BULGING]}}
+    for level in simplify.build_levels([empty, feature]):
+        assert level[0]['geometry'] == empty['geometry']
+        assert level[1]['geometry']['coordinates'] != []
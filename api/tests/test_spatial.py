@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+import spatial
+from spatial import BoundaryIndex, feature_id, feature_year, geometry_bbox, polygon_contains
+
+SQUARE = [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]
+HOLE = [[4, 4], [6, 4], [6, 6], [4, 6], [4, 4]]
+
+
+def feature(geometry, name='', **extra):
+    return {'type': 'Feature', 'properties': {'Name': name, **extra}, 'geometry': geometry}
+
+
+def square(x, y, size):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+def random_features(count=300, seed=3):
+    rng = random.Random(seed)
+    features = []
+    for _ in range(count):
+        x, y, size = rng.uniform(-125, -70), rng.uniform(25, 50), rng.uniform(0.1, 4)
+        if rng.random() < 0.3:
+            geometry = {'type': 'MultiPolygon', 'coordinates': [[square(x, y, size)], [square(x + 5, y, size)]]}
+        else:
+            geometry = {'type': 'Polygon', 'coordinates': [square(x, y, size)]}
+        features.append(feature(geometry))
+    return features
+
+
+def test_feature_year_and_id():
+    assert feature_year(feature(None, 'Treaty of Fort Laramie 1851')) == 1851
+    assert feature_year(feature(None, 'Treaty 2001 (amended 1868)')) == 1868
+    assert feature_year({'properties': None}) is None
+    assert feature_id({'id': 0, 'properties': {'ID': 'x'}}, 5) == 0
+    assert feature_id({'properties': {'Slug': 'fort-laramie'}}, 5) == 'fort-laramie'
+    assert feature_id({}, 5) == 5
+
+
+def test_geometry_bbox():
+    assert geometry_bbox({'type': 'Polygon', 'coordinates': [SQUARE, HOLE]}) == (0, 0, 10, 10)
+    collection = {'type': 'GeometryCollection', 'geometries': [
+        {'type': 'Point', 'coordinates': [-3, 20]},
+        {'type': 'Polygon', 'coordinates': [SQUARE]},
+    ]}
+    assert geometry_bbox(collection) == (-3, 0, 10, 20)
+    assert geometry_bbox(None) is None
+    assert geometry_bbox({'type': 'Polygon', 'coordinates': []}) is None
+
+
+def test_polygon_contains_respects_holes():
+    rings = [SQUARE, HOLE]
+    assert polygon_contains(rings, 2, 2)
+    assert not polygon_contains(rings, 5, 5)
+    assert not polygon_contains(rings, 11, 5)
+    assert not polygon_contains([], 5, 5)
+
+
+@pytest.mark.parametrize('cell_size', [0.5, 1.0, 7.0])
+def test_queries_match_a_full_scan(cell_size):
+    features = random_features()
+    index = BoundaryIndex(features, cell_size)
+    rng = random.Random(11)
+    for _ in range(200):
+        x0, y0 = rng.uniform(-130, -65), rng.uniform(20, 55)
+        x1, y1 = x0 + rng.uniform(0, 10), y0 + rng.uniform(0, 10)
+        assert index.query_bbox(x0, y0, x1, y1) == [
+            i for i, (bx0, by0, bx1, by1) in enumerate(index.bboxes)
+            if bx0 <= x1 and bx1 >= x0 and by0 <= y1 and by1 >= y0]
+        assert index.query_point(x0, y0) == [
+            i for i, f in enumerate(features)
+            if any(polygon_contains(rings, x0, y0) for rings in spatial._polygons(f['geometry']))]
+
+
+def test_large_features_and_whole_world_queries(monkeypatch):
+    monkeypatch.setattr(spatial, 'MAX_CELLS_PER_FEATURE', 16)
+    features = [
+        feature({'type': 'Polygon', 'coordinates': [square(-180, -80, 300)]}, 'Everywhere 1800'),
+        feature({'type': 'Polygon', 'coordinates': [SQUARE, HOLE]}, 'Holed 1825'),
+        feature(None, 'No geometry'),
+    ]
+    index = BoundaryIndex(features, 5.0)
+    assert index.large == [0]
+    assert index.years == [1800, 1825, None]
+    assert index.query_point(5, 5) == [0]
+    assert index.query_point(2, 2) == [0, 1]
+    assert index.query_bbox(-180, -90, 180, 90) == [0, 1]
+    assert index.query_bbox(50, 50, 51, 51) == [0]
+    assert len(index) == 3
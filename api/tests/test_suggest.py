@@ -0,0 +1,59 @@
+from suggest import SuggestIndex, normalize
+
+ENTRIES = [
+    ('treaty', 't1', 'Treaty with the Cherokee, 1785'),
+    ('treaty', 't2', 'Treaty of Fort Laramie'),
+    ('tribe', 'c', 'Cherokee Nation'),
+    ('tribe', 'c', 'Tsalagi'),
+    ('tribe', 'c', 'Cherokee'),
+    ('tribe', 'o', 'Osage'),
+    ('tribe', 'x', '  ...  '),
+    ('tribe', 'q', 'Québec Wyandot'),
+]
+
+
+def test_normalize():
+    assert normalize('  Treaty with the CHEROKEE,  1785 ') == 'treaty with the cherokee 1785'
+    assert normalize('Québec') == 'quebec'
+    assert normalize(None) == ''
+
+
+def test_suggest_ranks_name_starts_first_and_one_per_entity():
+    index = SuggestIndex(ENTRIES)
+    assert len(index) == 7
+    # "Cherokee" is the tribe's shortest matching name, and starts the text
+    assert index.suggest('chero') == [('tribe', 'c', 'Cherokee'),
+                                      ('treaty', 't1', 'Treaty with the Cherokee, 1785')]
+    assert index.suggest('TSAL') == [('tribe', 'c', 'Tsalagi')]
+
+
+def test_suggest_matches_word_starts_only():
+    index = SuggestIndex(ENTRIES)
+    assert index.suggest('laramie') == [('treaty', 't2', 'Treaty of Fort Laramie')]
+    assert index.suggest('aramie') == []
+    assert index.suggest('quebec w') == [('tribe', 'q', 'Québec Wyandot')]
+    assert index.suggest('  ,') == []
+
+
+def test_suggest_filters_and_limits():
+    index = SuggestIndex(ENTRIES)
+    assert index.suggest('treaty', types={'tribe'}) == []
+    assert index.suggest('t', types={'treaty'}) == [('treaty', 't2', 'Treaty of Fort Laramie'),
+                                                     ('treaty', 't1', 'Treaty with the Cherokee, 1785')]
+    assert len(index.suggest('t', limit=1)) == 1
+
+
+def test_suggest_ranks_every_prefix_match():
+    # 300 treaty keys ("osage ford ...") sort ahead of the tribe's key
+    index = SuggestIndex([('treaty', f't{i}', f'Treaty at Osage Ford {i:03}') for i in range(300)]
+                         + [('tribe', 'o', 'Osage Nation')])
+    assert index.suggest('osage', types={'tribe'}) == [('tribe', 'o', 'Osage Nation')]
+    assert index.suggest('osage', limit=2) == [('tribe', 'o', 'Osage Nation'),
+                                               ('treaty', 't0', 'Treaty at Osage Ford 000')]
+
+
+def test_suggest_reads_mid_text_keys_only_to_fill_the_limit():
+    index = SuggestIndex([('tribe', str(i), f'Band {i:02}') for i in range(10)]
+                         + [('treaty', 't', 'Treaty with the Band')])
+    assert [entity_id for _, entity_id, _ in index.suggest('band', limit=3)] == ['0', '1', '2']
+    assert index.suggest('band', limit=11)[-1] == ('treaty', 't', 'Treaty with the Band')
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Windwalker load driver
+
+Drives each /api/v1/* route (plus tiles, /health and /metrics) with
+concurrent clients for a fixed time and reports throughput and latency
+percentiles per route. With --scraper it also times the Kappler scraper's
+fetch stage against the CONTENTdm stand-in, cold and with a warm response
+cache. Results are written as JSON; given a --baseline from an earlier
+run, routes whose p99 or throughput regressed beyond --tolerance are
+listed and the exit status is 1.
+
+    python3 api/server.py &                     # BOUNDARIES_URL -> stand-in
+    python3 bench/load.py --api http://127.0.0.1:8080 --output bench.json
+    python3 bench/load.py --baseline bench.json --scraper --standins http://127.0.0.1:8089
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+SOURCING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sourcing')
+
+SEARCH_TERMS = ('cherokee', 'treaty of peace', 'annuities', 'sioux band', 'blacksmith',
+                'fort', 'lands ceded', 'choctaw', 'chippewa', 'reservation')
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Client:
+    """One keep-alive connection, reopened whenever the server closes it"""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def get(self, path):
+        """(status, body bytes) for GET `path`"""
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+            response = self.conn.getresponse()
+            body = response.read()
+        except Exception:
+            self.conn.close()
+            self.conn = None
+            raise
+        if response.will_close:
+            self.conn.close()
+            self.conn = None
+        return response.status, body
+
+    def get_json(self, path):
+        status, body = self.get(path)
+        if status != 200:
+            raise RuntimeError(f'GET {path}: HTTP {status}')
+        return json.loads(body.decode('utf-8'))
+
+
+def discover(base_url):
+    """Ids and years to build request paths from"""
+    client = Client(base_url)
+    try:
+        treaties = client.get_json('/api/v1/treaties?limit=1000&fields=id,signed_date')['treaties']
+        tribes = client.get_json('/api/v1/tribes?limit=1000&fields=id,name')['tribes']
+    except Exception as e:
+        # Database-backed routes will fail; boundary routes can still be driven
+        print(f"Could not list treaties and tribes ({e}); using placeholder ids", file=sys.stderr)
+        treaties, tribes = [], []
+    years = sorted({int(t['signed_date'][:4]) for t in treaties if t.get('signed_date')})
+    return {
+        'treaty_ids': [t['id'] for t in treaties] or ['00000000-0000-0000-0000-000000000000'],
+        'tribe_ids': [t['id'] for t in tribes] or ['00000000-0000-0000-0000-000000000000'],
+        'tribe_names': [t['name'] for t in tribes] or ['Cherokee'],
+        'years': years or [1778, 1883],
+    }
+
+
+def _year_range(ctx, rng):
+    first, last = ctx['years'][0], ctx['years'][-1]
+    start = rng.randint(first, last)
+    return start, rng.randint(start, last)
+
+
+def _tile(rng, layer):
+    z = rng.randint(3, 7)
+    # Mostly tiles over the continental US, where the data is
+    n = 1 << z
+    x = rng.randint(int(n * 0.17), int(n * 0.30))
+    y = rng.randint(int(n * 0.35), int(n * 0.42))
+    return f'/tiles/{layer}/{z}/{x}/{y}.mvt'
+
+
+# name -> (path builder, relative weight of concurrency); heavy routes get
+# fewer clients so they don't drown the rest of the run
+ROUTES = {
+    'treaties': (lambda ctx, rng: '/api/v1/treaties', 1),
+    'treaties_page': (lambda ctx, rng: '/api/v1/treaties?year={}&year_end={}&limit=50'.format(
+        *_year_range(ctx, rng)), 1),
+    'treaty_detail': (lambda ctx, rng: f"/api/v1/treaties/{rng.choice(ctx['treaty_ids'])}", 1),
+    'timeline': (lambda ctx, rng: '/api/v1/treaties/timeline?from={}&to={}'.format(
+        *_year_range(ctx, rng)), 1),
+    'tribes': (lambda ctx, rng: '/api/v1/tribes', 1),
+    'tribe_detail': (lambda ctx, rng: f"/api/v1/tribes/{rng.choice(ctx['tribe_ids'])}", 1),
+    'tribe_treaties': (lambda ctx, rng: f"/api/v1/tribes/{rng.choice(ctx['tribe_ids'])}/treaties", 1),
+    'search': (lambda ctx, rng: f"/api/v1/search?q={quote(rng.choice(SEARCH_TERMS))}", 1),
+    'suggest': (lambda ctx, rng: "/api/v1/suggest?q=" + quote(
+        rng.choice(ctx['tribe_names'])[:rng.randint(2, 5)]), 1),
+    'sources': (lambda ctx, rng: '/api/v1/sources', 1),
+    'boundaries': (lambda ctx, rng: f"/api/v1/boundaries?zoom={rng.randint(2, 8)}", 0.5),
+    'geo_point': (lambda ctx, rng: '/api/v1/geo/point?lng={:.3f}&lat={:.3f}'.format(
+        rng.uniform(-120, -80), rng.uniform(32, 47)), 1),
+    'geo_bbox': (lambda ctx, rng: '/api/v1/geo/bbox?bbox={:.2f},{:.2f},{:.2f},{:.2f}'.format(
+        *(lambda x, y: (x, y, x + 5, y + 4))(rng.uniform(-120, -85), rng.uniform(32, 43))), 1),
+    'export': (lambda ctx, rng: '/api/v1/export?table=treaties&format=' + rng.choice(
+        ('ndjson', 'csv', 'geojson')), 0.25),
+    'tiles_boundaries': (lambda ctx, rng: _tile(rng, 'boundaries'), 1),
+    'tiles_tribes': (lambda ctx, rng: _tile(rng, 'tribes'), 1),
+    'health': (lambda ctx, rng: '/health', 1),
+    'metrics': (lambda ctx, rng: '/metrics', 0.5),
+}
+
+
+def run_route(base_url, name, ctx, duration, concurrency, seed):
+    """Drive one route; returns its result record"""
+    build, weight = ROUTES[name]
+    clients = max(1, int(round(concurrency * weight)))
+    latencies = []
+    statuses = {}
+    errors = [0]
+    received = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(i):
+        rng = random.Random(seed * 1000 + i)
+        client = Client(base_url)
+        mine, codes, failed, size = [], {}, 0, 0
+        while time.monotonic() < deadline:
+            path = build(ctx, rng)
+            started = time.perf_counter()
+            try:
+                status, body = client.get(path)
+            except Exception:
+                failed += 1
+                continue
+            mine.append(time.perf_counter() - started)
+            codes[status] = codes.get(status, 0) + 1
+            size += len(body)
+            if status >= 500:
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            for code, count in codes.items():
+                statuses[code] = statuses.get(code, 0) + count
+            errors[0] += failed
+            received[0] += size
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    ms = lambda v: None if v is None else round(v * 1000, 3)
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'clients': clients,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0,
+        'bytes_per_request': round(received[0] / len(latencies)) if latencies else 0,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p90_ms': ms(percentile(latencies, 90)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+    }
+
+
+# Run in sourcing/ against the CONTENTdm stand-in: list the volume, then
+# fetch every item through the scraper's own fetcher and process_item
+SCRAPER_FETCH = """
+import json, time
+import scrape_kappler as k
+started = time.perf_counter()
+treaties = k.get_treaty_list()
+rows = list(k.get_fetcher().map(lambda t: k.process_item(t, None, 0, False), treaties))
+print(json.dumps({'items': len(rows), 'seconds': time.perf_counter() - started}))
+"""
+
+
+def run_scraper(standins_url, min_delay_ms, workers):
+    """Time the scraper's fetch stage cold, then against its warm cache"""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='windwalker-bench-') as tmp:
+        env = dict(os.environ,
+                   CONTENTDM_BASE_URL=standins_url.rstrip('/'),
+                   FETCH_CACHE_DIR=os.path.join(tmp, 'http'),
+                   KAPPLER_STATE_DIR=os.path.join(tmp, 'kappler'),
+                   MIN_DELAY_MS=str(min_delay_ms),
+                   FETCH_WORKERS=str(workers))
+        for phase in ('cold', 'warm'):
+            proc = subprocess.run([sys.executable, '-c', SCRAPER_FETCH], cwd=SOURCING_DIR, env=env,
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                raise RuntimeError(f'scraper {phase} run failed:\n{proc.stderr[-2000:]}')
+            stats = json.loads(proc.stdout.strip().splitlines()[-1])
+            results[f'scraper_fetch_{phase}'] = {
+                'requests': stats['items'],
+                'errors': 0,
+                'seconds': round(stats['seconds'], 3),
+                'throughput_rps': round(stats['items'] / stats['seconds'], 2) if stats['seconds'] else 0,
+            }
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of `results` against `baseline`, as readable lines"""
+    regressions = []
+    for name, current in results['routes'].items():
+        before = baseline.get('routes', {}).get(name)
+        if not before:
+            continue
+        if before.get('p99_ms') and current.get('p99_ms') is not None:
+            if current['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+                regressions.append(f"{name}: p99 {before['p99_ms']}ms -> {current['p99_ms']}ms")
+        if before.get('throughput_rps') and current['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current['errors'] > before.get('errors', 0):
+            regressions.append(f"{name}: errors {before.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Windwalker API and scraper load driver')
+    parser.add_argument('--api', default='http://127.0.0.1:8080', help='API server base URL')
+    parser.add_argument('--routes', default=','.join(ROUTES),
+                        help='comma-separated routes to drive (default: all)')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per route')
+    parser.add_argument('--concurrency', type=int, default=8, help='clients per route')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--scraper', action='store_true', help='also time the scraper fetch stage')
+    parser.add_argument('--standins', default='http://127.0.0.1:8089',
+                        help='stand-in server (standins.py) for --scraper')
+    parser.add_argument('--scraper-min-delay-ms', type=int, default=0,
+                        help='MIN_DELAY_MS for the scraper run (0: no rate limit)')
+    parser.add_argument('--scraper-workers', type=int, default=4)
+    parser.add_argument('--label', default='', help='free-form label stored with the results')
+    parser.add_argument('--output', help='write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', help='results JSON from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed relative p99/throughput regression (default 0.2)')
+    args = parser.parse_args()
+
+    names = [n for n in args.routes.split(',') if n]
+    unknown = [n for n in names if n not in ROUTES]
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(unknown)}")
+
+    results = {
+        'label': args.label,
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'api': args.api,
+        'python': platform.python_version(),
+        'duration': args.duration,
+        'concurrency': args.concurrency,
+        'routes': {},
+    }
+
+    ctx = discover(args.api)
+    results['corpus'] = {'treaties': len(ctx['treaty_ids']), 'tribes': len(ctx['tribe_ids'])}
+    for name in names:
+        print(f"{name} ...", file=sys.stderr, end=' ', flush=True)
+        result = run_route(args.api, name, ctx, args.duration, args.concurrency, args.seed)
+        results['routes'][name] = result
+        print(f"{result['throughput_rps']} req/s, p50 {result['p50_ms']}ms, "
+              f"p99 {result['p99_ms']}ms, {result['errors']} errors", file=sys.stderr)
+
+    if args.scraper:
+        print("scraper ...", file=sys.stderr, flush=True)
+        results['routes'].update(run_scraper(args.standins, args.scraper_min_delay_ms, args.scraper_workers))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions against {args.baseline}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Seed a benchmark database with synthetic treaties and tribes
+
+Loads bench/synth.py data at 1x, 10x or 100x the size of the real corpus
+into raw_treaties and raw_tribes (under their own data sources, replacing
+any earlier bench rows), links treaty parties with sourcing/link_tribes.py,
+and optionally writes a synthetic boundaries GeoJSON for the stand-in
+Native-Land server.
+
+Use a dedicated database with the sourcing migrations applied:
+
+    createdb windwalker_bench
+    for f in sourcing/migrations/*.sql; do psql windwalker_bench < $f; done
+    DATABASE_URL=postgresql://localhost/windwalker_bench python3 bench/seed.py --scale 10
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+import synth
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sourcing'))
+import link_tribes  # noqa: E402
+
+DATABASE_URL = os.environ.get('DATABASE_URL', 'postgresql://localhost/windwalker_bench')
+
+# (source_id, name, source_type) for the bench rows
+TREATY_SOURCE = ('bench_kappler', 'Synthetic Kappler treaties (benchmark)', 'kappler')
+TRIBE_SOURCE = ('bench_bia', 'Synthetic BIA tribes (benchmark)', 'bia')
+
+
+def ensure_source(cur, source):
+    source_id, name, source_type = source
+    cur.execute("""
+        INSERT INTO data_sources (source_id, name, source_type, base_url, reliability)
+        VALUES (%s, %s, %s, 'http://localhost/', 0.50)
+        ON CONFLICT (source_id) DO UPDATE SET updated_at = NOW()
+        RETURNING id
+    """, (source_id, name, source_type))
+    return cur.fetchone()['id']
+
+
+def _copy(cur, table, columns, rows):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def seed(conn, scale, seed_value):
+    """Replace the bench rows with data at `scale`; returns (treaties, tribes)"""
+    cur = conn.cursor()
+    treaty_source = ensure_source(cur, TREATY_SOURCE)
+    tribe_source = ensure_source(cur, TRIBE_SOURCE)
+    cur.execute("DELETE FROM raw_treaties WHERE source_id = %s", (treaty_source,))
+    cur.execute("DELETE FROM raw_tribes WHERE source_id = %s", (tribe_source,))
+
+    treaties = list(synth.treaties(scale, seed_value))
+    _copy(cur, 'raw_treaties', (
+        'source_id', 'source_url', 'scraped_at', 'kappler_volume', 'kappler_page',
+        'title', 'date_signed_text', 'date_signed', 'tribal_parties_text',
+        'preamble', 'articles_text', 'raw_html', 'is_validated', 'is_normalized',
+    ), (
+        (treaty_source, f"http://localhost/digital/collection/kapplers/id/{t['pointer']}",
+         'now', 2, int(t['pointer']), t['title'], t['date_text'],
+         t['date'].isoformat() if t['date'] else None, json.dumps(t['tribes']),
+         t['preamble'], json.dumps(t['articles']), '', t['index'] % 2 == 0, True)
+        for t in treaties
+    ))
+
+    tribes = list(synth.tribes(scale, seed_value))
+    _copy(cur, 'raw_tribes', (
+        'source_id', 'source_url', 'scraped_at', 'bia_id', 'name', 'alternate_names',
+        'region', 'state', 'headquarters_location', 'federally_recognized',
+    ), (
+        (tribe_source, 'http://localhost/bia', 'now', f"BENCH{t['index']:06d}", t['name'],
+         json.dumps(t['alternate_names']), t['region'], t['state'],
+         f"SRID=4326;POINT({t['lng']} {t['lat']})", t['federally_recognized'])
+        for t in tribes
+    ))
+    cur.execute("ANALYZE raw_treaties")
+    cur.execute("ANALYZE raw_tribes")
+    return len(treaties), len(tribes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed synthetic benchmark data')
+    parser.add_argument('--scale', type=int, default=1,
+                        help='multiple of the real corpus size (1, 10, 100)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed')
+    parser.add_argument('--boundaries', metavar='PATH',
+                        help='also write a synthetic boundaries GeoJSON here')
+    parser.add_argument('--boundary-vertices', type=int, default=200,
+                        help='vertices per synthetic boundary polygon')
+    parser.add_argument('--no-db', action='store_true',
+                        help='only write --boundaries; leave the database alone')
+    args = parser.parse_args()
+
+    if args.boundaries:
+        started = time.monotonic()
+        data = synth.boundaries(synth.NATIVE_LAND_BOUNDARIES * args.scale,
+                                args.boundary_vertices, args.seed)
+        with open(args.boundaries, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        print(f"Wrote {len(data['features'])} boundaries to {args.boundaries} "
+              f"in {time.monotonic() - started:.1f}s")
+
+    if args.no_db:
+        return
+
+    started = time.monotonic()
+    conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    try:
+        treaty_count, tribe_count = seed(conn, args.scale, args.seed)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    print(f"Seeded {treaty_count} treaties and {tribe_count} tribes "
+          f"in {time.monotonic() - started:.1f}s")
+
+    started = time.monotonic()
+    link_tribes.DATABASE_URL = DATABASE_URL
+    relinked, written, _, unmatched = link_tribes.run(everything=True)
+    print(f"Linked {relinked} treaties ({written} links, {len(unmatched)} unmatched names) "
+          f"in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the upstream services Windwalker depends on
+
+Serves synthetic data (bench/synth.py) in the shapes of:
+
+  - Native-Land's treaties GeoJSON, at /treaties.geojson
+    (point the API's BOUNDARIES_URL here)
+  - the CONTENTdm web services scrape_kappler.py reads
+    (point CONTENTDM_BASE_URL at the server root)
+
+Responses carry strong ETags and honour If-None-Match, so cache
+revalidation paths get exercised. --latency-ms and --error-rate add
+upstream delay and transient 503s; /__stats reports requests served.
+
+    python3 bench/standins.py --port 8089 --scale 10
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import synth
+
+CONTENTDM_PATH = '/digital/bl/dmwebservices/index.php'
+VOLUME_POINTER = '29743'  # matches VOL2_POINTER in scrape_kappler.py
+
+
+class Upstream:
+    """Encoded stand-in documents and request counters"""
+
+    def __init__(self, scale=1, seed=1, boundaries_path=None, vertices=200):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.documents = {}
+
+        treaties = list(synth.treaties(scale, seed))
+        self._add(('contentdm', 'index'), synth.contentdm_index(treaties))
+        for treaty in treaties:
+            self._add(('contentdm', treaty['pointer']), synth.contentdm_item(treaty))
+
+        if boundaries_path:
+            with open(boundaries_path, 'rb') as f:
+                body = f.read()
+            self.documents[('native-land', 'treaties')] = (body, self._etag(body))
+        else:
+            self._add(('native-land', 'treaties'),
+                      synth.boundaries(synth.NATIVE_LAND_BOUNDARIES * scale, vertices, seed))
+
+    @staticmethod
+    def _etag(body):
+        return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    def _add(self, key, document):
+        body = json.dumps(document, separators=(',', ':')).encode('utf-8')
+        self.documents[key] = (body, self._etag(body))
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        upstream = self.server.upstream
+        parts = urlsplit(self.path)
+
+        if parts.path == '/__stats':
+            with upstream.lock:
+                self.send_body(200, json.dumps(upstream.counts).encode('utf-8'))
+            return
+
+        key = None
+        if parts.path == '/treaties.geojson':
+            key = ('native-land', 'treaties')
+        elif parts.path == CONTENTDM_PATH:
+            query = parse_qs(parts.query).get('q', [''])[0].split('/')
+            if len(query) == 4 and query[0] == 'dmGetCompoundObjectInfo' and query[2] == VOLUME_POINTER:
+                key = ('contentdm', 'index')
+            elif len(query) == 4 and query[0] == 'dmGetItemInfo':
+                key = ('contentdm', query[2])
+        document = upstream.documents.get(key) if key else None
+        if document is None:
+            upstream.count('not_found')
+            self.send_body(404, b'{"message":"not found"}')
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            upstream.count(f'{key[0]}_503')
+            self.send_body(503, b'{"message":"try again"}', {'Retry-After': '0'})
+            return
+
+        body, etag = document
+        if self.headers.get('If-None-Match') == etag:
+            upstream.count(f'{key[0]}_304')
+            self.send_body(304, b'', {'ETag': etag})
+            return
+        upstream.count(f'{key[0]}_200')
+        self.send_body(200, body, {'ETag': etag})
+
+    def send_body(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=8089, scale=1, seed=1, boundaries_path=None, latency_ms=0, error_rate=0.0,
+          host='127.0.0.1'):
+    """Start the stand-ins on a background thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.daemon_threads = True
+    server.upstream = Upstream(scale, seed, boundaries_path)
+    server.latency = latency_ms / 1000.0
+    server.error_rate = error_rate
+    threading.Thread(target=server.serve_forever, name='standins', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in Native-Land and CONTENTdm servers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--scale', type=int, default=1, help='multiple of the real corpus size')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--boundaries', metavar='PATH',
+                        help='serve this GeoJSON (from seed.py --boundaries) instead of generating one')
+    parser.add_argument('--latency-ms', type=float, default=0, help='delay added to every response')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered 503')
+    args = parser.parse_args()
+
+    server = serve(args.port, args.scale, args.seed, args.boundaries,
+                   args.latency_ms, args.error_rate, args.host)
+    root = f"http://{args.host}:{args.port}"
+    print(f"Stand-ins on {root}")
+    print(f"  BOUNDARIES_URL={root}/treaties.geojson")
+    print(f"  CONTENTDM_BASE_URL={root}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
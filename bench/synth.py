@@ -0,0 +1,155 @@
+"""
+Synthetic Windwalker data for benchmarks
+
+Deterministic (seeded) treaties, tribes and treaty boundaries shaped like
+the real sources: Kappler Volume II entries as CONTENTdm serves them, BIA
+tribe records, and a Native-Land treaties FeatureCollection. Scale 1 is
+the size of the real corpus; 10 and 100 are for seeing how costs grow.
+"""
+
+import math
+import random
+from datetime import date
+
+# Size of the real sources at scale 1
+KAPPLER_TREATIES = 375
+BIA_TRIBES = 574
+NATIVE_LAND_BOUNDARIES = 1000
+
+# Kappler pages used for synthetic treaties start here, well clear of the
+# real volume's page numbers
+FIRST_PAGE = 100000
+
+BASE_NAMES = (
+    'Cherokee', 'Choctaw', 'Chickasaw', 'Creek', 'Seminole', 'Delaware',
+    'Shawnee', 'Wyandot', 'Ottawa', 'Chippewa', 'Potawatomi', 'Miami',
+    'Kickapoo', 'Sac', 'Fox', 'Iowa', 'Osage', 'Kansa', 'Omaha', 'Ponca',
+    'Pawnee', 'Oto', 'Missouria', 'Quapaw', 'Menominee', 'Winnebago',
+    'Sioux', 'Cheyenne', 'Arapaho', 'Crow', 'Blackfeet', 'Shoshone',
+    'Bannock', 'Ute', 'Navajo', 'Apache', 'Comanche', 'Kiowa', 'Nez Perce',
+    'Yakama', 'Walla Walla', 'Umatilla', 'Klamath', 'Modoc', 'Makah',
+    'Nisqually', 'Puyallup', 'Dwamish', 'Mandan', 'Arikara',
+)
+QUALIFIERS = ('', 'Northern ', 'Southern ', 'Eastern ', 'Western ', 'Upper ', 'Lower ')
+KINDS = ('{} Nation', '{} Tribe', 'Band of {} Indians', '{} Tribe of Indians', '{} Nation of Oklahoma')
+STATES = ('OK', 'KS', 'NE', 'SD', 'ND', 'MN', 'WI', 'MI', 'MT', 'WY', 'ID', 'WA', 'OR', 'AZ', 'NM', 'NY', 'NC')
+REGIONS = ('Eastern', 'Eastern Oklahoma', 'Great Plains', 'Midwest', 'Northwest', 'Rocky Mountain', 'Southwest', 'Navajo')
+MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July',
+          'August', 'September', 'October', 'November', 'December')
+ARTICLE = ("The United States agree to pay the said tribe the sum of {n} dollars annually, "
+           "in money or goods, for the term of {y} years, and to furnish a blacksmith, "
+           "farming utensils and cattle for the use of the tribe.")
+
+def party_names(count):
+    """`count` distinct tribal party names, the plain base names first"""
+    names = []
+    for qualifier in QUALIFIERS:
+        for base in BASE_NAMES:
+            names.append(f'{qualifier}{base}')
+            if len(names) == count:
+                return names
+    # Beyond the qualified names, number the bands
+    n = 2
+    while len(names) < count:
+        for base in BASE_NAMES:
+            names.append(f'{base} Band No. {n}')
+            if len(names) == count:
+                break
+        n += 1
+    return names
+
+def tribes(scale=1, seed=1):
+    """BIA-like tribe records: name, alternate names, location"""
+    rng = random.Random(seed)
+    count = BIA_TRIBES * scale
+    for i, party in enumerate(party_names(count)):
+        yield {
+            'index': i,
+            'name': KINDS[i % len(KINDS)].format(party),
+            'alternate_names': [party, f'{party}s'] if i % 3 else [party],
+            'region': rng.choice(REGIONS),
+            'state': rng.choice(STATES),
+            'lng': round(rng.uniform(-124.0, -75.0), 5),
+            'lat': round(rng.uniform(30.0, 48.5), 5),
+            'federally_recognized': i % 9 != 0,
+        }
+
+def treaties(scale=1, seed=1):
+    """Kappler-like treaties: title, date text and date, parties, articles"""
+    rng = random.Random(seed)
+    parties = party_names(BIA_TRIBES * scale)
+    count = KAPPLER_TREATIES * scale
+    for i in range(count):
+        year = 1778 + (i * 105) // count
+        month = rng.randrange(1, 13)
+        day = rng.randrange(1, 29)
+        names = rng.sample(parties, rng.choice((1, 1, 1, 2, 2, 3)))
+        title = f"Treaty with the {', '.join(names[:-1]) + ' and ' if len(names) > 1 else ''}{names[-1]}, {year}"
+        # A few treaties have only a year, and a few none at all
+        if i % 40 == 0:
+            date_text, signed = None, None
+        elif i % 15 == 0:
+            date_text, signed = str(year), date(year, 1, 1)
+        else:
+            date_text, signed = f'{MONTHS[month - 1]} {day}, {year}', date(year, month, day)
+        yield {
+            'index': i,
+            'pointer': str(FIRST_PAGE + i),
+            'title': title,
+            'date_text': date_text,
+            'date': signed,
+            'tribes': names,
+            'preamble': f'Articles of a treaty made and concluded between the United States and the {names[0]}.',
+            'articles': [ARTICLE.format(n=rng.randrange(500, 20000), y=rng.randrange(5, 30))
+                         for _ in range(rng.randrange(3, 12))],
+        }
+
+def boundaries(count=NATIVE_LAND_BOUNDARIES, vertices=200, seed=1):
+    """Native-Land-like treaty boundaries: jagged polygons over the US"""
+    rng = random.Random(seed)
+    features = []
+    for i in range(count):
+        cx, cy = rng.uniform(-122.0, -77.0), rng.uniform(31.0, 47.5)
+        radius = rng.uniform(0.2, 3.0)
+        ring = []
+        for k in range(vertices):
+            angle = 2 * math.pi * k / vertices
+            r = radius * rng.uniform(0.7, 1.0)
+            ring.append([round(cx + r * math.cos(angle), 5), round(cy + r * math.sin(angle), 5)])
+        ring.append(ring[0])
+        year = 1778 + (i * 105) // count
+        features.append({
+            'type': 'Feature',
+            'id': f'bench-{i}',
+            'properties': {
+                'Name': f'Synthetic Treaty {i} {year}',
+                'ID': f'bench-{i}',
+                'Slug': f'synthetic-treaty-{i}',
+                'description': 'https://native-land.ca/',
+                'color': '#%06x' % rng.randrange(0x1000000),
+            },
+            'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+# ============================================================================
+# CONTENTdm shapes (see sourcing/scrape_kappler.py)
+# ============================================================================
+
+def contentdm_index(items):
+    """dmGetCompoundObjectInfo for the volume: one node of pages"""
+    return {'type': 'Monograph', 'node': {'nodetitle': 'Treaties', 'node': [{
+        'nodetitle': 'Synthetic treaties',
+        'page': [{'pagetitle': t['title'], 'pageptr': t['pointer'], 'pagefile': f"{t['pointer']}.pdfpage"}
+                 for t in items],
+    }]}}
+
+def contentdm_item(treaty):
+    """dmGetItemInfo for one treaty page; empty fields are {} as in CONTENTdm"""
+    return {
+        'title': treaty['title'],
+        'date': treaty['date_text'] or {},
+        'subjec': '; '.join(treaty['tribes']),
+        'descri': treaty['preamble'],
+        'dmrecord': treaty['pointer'],
+    }
@@ -0,0 +1,355 @@
+"""
+Polite concurrent HTTP fetching for the sourcing scrapers
+
+One Fetcher owns a pool of keep-alive connections per host, a token
+bucket that spaces requests at least MIN_DELAY_MS apart on average, and
+retry with exponential backoff for transient failures. `Fetcher.map` runs
+a function over many items on a few worker threads, so while one response
+is in flight the next request is already waiting on the rate limit
+instead of on the previous request's latency.
+
+With a ResponseCache attached, `Fetcher.get_cached` revalidates stored
+responses with conditional requests (or, offline, skips the network
+entirely), so unchanged documents cost a 304 rather than a download.
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import queue
+import random
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# Respectful scraping settings: the average request rate never exceeds one
+# per MIN_DELAY_MS, however many workers are running
+MIN_DELAY_MS = int(os.environ.get('MIN_DELAY_MS', '500'))
+FETCH_BURST = int(os.environ.get('FETCH_BURST', '1'))
+FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', '4'))
+FETCH_TIMEOUT = float(os.environ.get('FETCH_TIMEOUT', '30'))
+FETCH_RETRIES = int(os.environ.get('FETCH_RETRIES', '4'))
+FETCH_BACKOFF = float(os.environ.get('FETCH_BACKOFF', '1.0'))
+FETCH_BACKOFF_MAX = float(os.environ.get('FETCH_BACKOFF_MAX', '60'))
+# The CONTENTdm host has served an incomplete certificate chain, so
+# verification is off unless asked for
+FETCH_VERIFY_TLS = os.environ.get('FETCH_VERIFY_TLS', '0') == '1'
+
+USER_AGENT = "Windwalker/0.1.0 (Native Treaty Mapping Initiative)"
+
+# On-disk response cache (see ResponseCache)
+FETCH_CACHE_DIR = os.environ.get('FETCH_CACHE_DIR', os.path.join('.cache', 'http'))
+
+# Statuses worth retrying; anything else is returned to the caller as is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """A request that failed permanently, or ran out of retries"""
+
+    def __init__(self, url, message, status=None):
+        super().__init__(f"{url}: {message}")
+        self.url = url
+        self.status = status
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ConnectionPool:
+    """Idle keep-alive connections, per (scheme, host, port)"""
+
+    def __init__(self, timeout=FETCH_TIMEOUT, verify_tls=FETCH_VERIFY_TLS, max_idle=FETCH_WORKERS):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ssl_context = ssl.create_default_context()
+        if not verify_tls:
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def _queue(self, key):
+        with self.lock:
+            return self.idle.setdefault(key, queue.LifoQueue())
+
+    def get(self, scheme, host, port):
+        """An idle connection to the host if there is one, else a new one"""
+        try:
+            return self._queue((scheme, host, port)).get_nowait()
+        except queue.Empty:
+            pass
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def put(self, scheme, host, port, conn):
+        """Return a connection whose last response was fully read"""
+        idle = self._queue((scheme, host, port))
+        if idle.qsize() >= self.max_idle:
+            conn.close()
+        else:
+            idle.put(conn)
+
+    def close(self):
+        with self.lock:
+            queues, self.idle = list(self.idle.values()), {}
+        for idle in queues:
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+class Response:
+    """Status, headers and fully-read body of one HTTP response"""
+
+    __slots__ = ('url', 'status', 'headers', 'body')
+
+    def __init__(self, url, status, headers, body):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class CachedResponse:
+    """Body of a cached (or just revalidated) response and its content digest"""
+
+    __slots__ = ('url', 'body', 'digest', 'fetched_at')
+
+    def __init__(self, url, body, digest, fetched_at):
+        self.url = url
+        self.body = body
+        self.digest = digest
+        self.fetched_at = fetched_at
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+
+class ResponseCache:
+    """Content-addressed response bodies plus per-URL validators, on disk
+
+    Bodies live under objects/ named by their SHA-256, so identical
+    responses are stored once and a changed response is visible as a
+    changed digest. urls/ maps each URL to its digest, ETag and
+    Last-Modified for revalidation. Every write is atomic, so an
+    interrupted run never leaves a torn entry behind.
+    """
+
+    def __init__(self, root=FETCH_CACHE_DIR):
+        self.root = root
+
+    def _meta_path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, 'urls', key[:2], f"{key}.json")
+
+    def _body_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def lookup(self, url):
+        """Validators and cached body for `url`, or None if it isn't cached"""
+        try:
+            with open(self._meta_path(url), 'rb') as f:
+                meta = json.loads(f.read())
+            with open(self._body_path(meta['digest']), 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        return meta, body
+
+    def store(self, url, body, headers):
+        """Record a 200 response; returns its metadata"""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._body_path(digest)
+        if not os.path.exists(path):
+            _write_atomic(path, body)
+        meta = {
+            'url': url,
+            'digest': digest,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+        }
+        _write_atomic(self._meta_path(url), json.dumps(meta).encode('utf-8'))
+        return meta
+
+    def touch(self, url, meta):
+        """Record that a cached response was revalidated (304) just now"""
+        meta = {**meta, 'fetched_at': time.time()}
+        _write_atomic(self._meta_path(url), json.dumps(meta).encode('utf-8'))
+        return meta
+
+
+class Fetcher:
+    """Rate-limited, retrying HTTP GETs over pooled keep-alive connections"""
+
+    def __init__(self, min_delay_ms=MIN_DELAY_MS, burst=FETCH_BURST, workers=FETCH_WORKERS,
+                 retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, user_agent=USER_AGENT,
+                 cache=None, offline=False):
+        rate = 1000.0 / min_delay_ms if min_delay_ms > 0 else float('inf')
+        self.bucket = TokenBucket(rate, burst) if min_delay_ms > 0 else None
+        self.pool = ConnectionPool(max_idle=workers)
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.user_agent = user_agent
+        self.cache = cache
+        self.offline = offline
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _request(self, url, headers):
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+
+        conn = self.pool.get(scheme, parts.hostname, port)
+        try:
+            conn.request('GET', target, headers={
+                'User-Agent': self.user_agent,
+                'Accept-Encoding': 'identity',
+                'Connection': 'keep-alive',
+                **headers,
+            })
+            response = conn.getresponse()
+            body = response.read()
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            self.pool.put(scheme, parts.hostname, port, conn)
+        return Response(url, response.status, response.headers, body)
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), FETCH_BACKOFF_MAX)
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(FETCH_BACKOFF_MAX, self.backoff * (2 ** attempt)))
+
+    def get(self, url, headers=None):
+        """GET `url`, retrying connection errors, timeouts, 429 and 5xx
+
+        Returns the final Response (which may still be an error status);
+        raises FetchError once retries are exhausted on network errors.
+        """
+        headers = headers or {}
+        for attempt in range(self.retries + 1):
+            if self.bucket is not None:
+                self.bucket.acquire()
+            try:
+                response = self._request(url, headers)
+            except (OSError, http.client.HTTPException) as e:
+                # Includes timeouts, resets and keep-alive connections the
+                # server closed while they were idle
+                if attempt == self.retries:
+                    raise FetchError(url, str(e)) from e
+                time.sleep(self._delay(attempt))
+                continue
+
+            if response.status in RETRY_STATUSES and attempt < self.retries:
+                time.sleep(self._delay(attempt, response))
+                continue
+            return response
+
+    def get_json(self, url):
+        """GET and decode a JSON document; raises FetchError on any failure"""
+        response = self.get(url)
+        if response.status != 200:
+            raise FetchError(url, f"HTTP {response.status}", response.status)
+        try:
+            return response.json()
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise FetchError(url, f"invalid JSON: {e}", response.status) from e
+
+    def get_cached(self, url, max_age=0):
+        """GET through the response cache, returning a CachedResponse
+
+        A cached response younger than `max_age` seconds (or any cached
+        response when offline) is returned without a request; otherwise it
+        is revalidated with If-None-Match / If-Modified-Since. Raises
+        FetchError if there is neither a usable response nor a cached copy.
+        """
+        cached = self.cache.lookup(url)
+        if cached is not None:
+            meta, body = cached
+            if self.offline or time.time() - meta['fetched_at'] < max_age:
+                return CachedResponse(url, body, meta['digest'], meta['fetched_at'])
+        elif self.offline:
+            raise FetchError(url, 'not in the response cache (offline)')
+
+        headers = {}
+        if cached is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self.get(url, headers)
+        if response.status == 304 and cached is not None:
+            meta = self.cache.touch(url, meta)
+            return CachedResponse(url, body, meta['digest'], meta['fetched_at'])
+        if response.status != 200:
+            raise FetchError(url, f"HTTP {response.status}", response.status)
+        meta = self.cache.store(url, response.body, response.headers)
+        return CachedResponse(url, response.body, meta['digest'], meta['fetched_at'])
+
+    def map(self, func, items):
+        """Yield func(item) for each item, in order, computed on the worker pool"""
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fetch')
+        try:
+            yield from pool.map(func, items)
+        finally:
+            # A consumer that stops early shouldn't wait for the whole crawl
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Treaty Party Linker
+
+Resolves the free-text parties of each treaty (raw_treaties.tribal_parties_text)
+to raw_tribes rows and stores the links in treaty_tribes (migration 004).
+
+Names are matched against an alias index over every tribe's name and
+alternate names: first exactly, then with generic words ("Nation", "Band
+of ... Indians") removed, then by trigram similarity. Only treaties whose
+parties changed since they were last linked are revisited, unless the
+tribe aliases themselves changed (or --all is given).
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import unicodedata
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from normalize import normalize_tribe_name
+
+DATABASE_URL = os.environ.get('DATABASE_URL', 'postgresql://localhost/windwalker_staging')
+
+# Minimum trigram similarity (0-1) for a fuzzy match
+FUZZY_THRESHOLD = float(os.environ.get('LINK_FUZZY_THRESHOLD', '0.5'))
+
+# Score recorded for a match on the name with generic words removed
+STRIPPED_SCORE = 0.95
+
+# Part of the aliases digest; bump whenever what a link records changes, so
+# every treaty is relinked once
+LINK_FORMAT = 1
+
+# Words that say what kind of polity a name is rather than which one
+GENERIC_WORDS = frozenset({
+    'the', 'of', 'and', 'tribe', 'tribes', 'nation', 'band', 'bands',
+    'indian', 'indians', 'people', 'confederated', 'community',
+})
+
+_NON_WORD_RE = re.compile(r'[^\w]+')
+
+
+def name_key(name):
+    """Lowercase, accent-free, punctuation-free form of a name"""
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return _NON_WORD_RE.sub(' ', name.casefold()).strip()
+
+
+def stripped_key(key):
+    """name_key without generic words (or the key itself if nothing else is left)"""
+    words = [w for w in key.split() if w not in GENERIC_WORDS]
+    return ' '.join(words) if words else key
+
+
+def trigrams(key):
+    """pg_trgm-style trigrams: each word padded with two spaces before, one after"""
+    grams = set()
+    for word in key.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class AliasIndex:
+    """Every name a tribe is known by, for resolving treaty parties
+
+    `tribes` yields (tribe_id, name, alternate_names). resolve() results
+    are memoized, since the same party names recur across treaties.
+    """
+
+    def __init__(self, tribes):
+        self.exact = {}
+        self.stripped = {}
+        self.aliases = []
+        self.grams = {}
+        self._resolved = {}
+
+        for tribe_id, name, alternate_names in tribes:
+            names = [name] + [n for n in (alternate_names or []) if isinstance(n, str)]
+            for alias in names:
+                key = name_key(alias)
+                if not key:
+                    continue
+                self.exact.setdefault(key, set()).add(tribe_id)
+                short = stripped_key(key)
+                self.stripped.setdefault(short, set()).add(tribe_id)
+
+                position = len(self.aliases)
+                alias_grams = trigrams(short)
+                self.aliases.append((tribe_id, alias_grams))
+                for gram in alias_grams:
+                    self.grams.setdefault(gram, []).append(position)
+
+    def _fuzzy(self, key):
+        grams = trigrams(key)
+        if not grams:
+            return []
+        shared = {}
+        for gram in grams:
+            for position in self.grams.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        best = {}
+        for position, common in shared.items():
+            tribe_id, alias_grams = self.aliases[position]
+            score = common / float(len(grams) + len(alias_grams) - common)
+            if score >= FUZZY_THRESHOLD and score > best.get(tribe_id, 0):
+                best[tribe_id] = score
+        if not best:
+            return []
+
+        top = max(best.values())
+        winners = [tribe_id for tribe_id, score in best.items() if score == top]
+        # A tie between different tribes is ambiguous; leave it unlinked
+        if len(winners) > 1:
+            return []
+        return [(winners[0], 'fuzzy', round(top, 3))]
+
+    def resolve(self, party):
+        """[(tribe_id, method, score)] for a party name; [] if unmatched
+
+        Exact and stripped-name matches link every tribe sharing the name
+        (e.g. all successor nations of a historical party).
+        """
+        key = name_key(party)
+        if key in self._resolved:
+            return self._resolved[key]
+
+        if key in self.exact:
+            result = [(tribe_id, 'exact', 1.0) for tribe_id in sorted(self.exact[key])]
+        else:
+            short = stripped_key(key)
+            if short in self.stripped:
+                result = [(tribe_id, 'exact', STRIPPED_SCORE) for tribe_id in sorted(self.stripped[short])]
+            else:
+                result = self._fuzzy(short)
+        self._resolved[key] = result
+        return result
+
+
+def digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def link_treaty(index, parties):
+    """(links, unmatched) for one treaty's parties; one link per tribe
+
+    Parties are looked up by their normalized name, but links and
+    unmatched names record the party exactly as tribal_parties_text has
+    it, which is what the API matches links against.
+    """
+    links = {}
+    unmatched = []
+    for party in parties or []:
+        if not isinstance(party, str):
+            continue
+        name = normalize_tribe_name(party)
+        if not name:
+            continue
+        matches = index.resolve(name)
+        if not matches:
+            unmatched.append(party)
+        for tribe_id, method, score in matches:
+            if tribe_id not in links or score > links[tribe_id][2]:
+                links[tribe_id] = (party, method, score)
+    return links, unmatched
+
+
+def _copy(cur, table, columns, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerows(rows)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def write_links(conn, results, aliases_digest):
+    """Replace the links of the relinked treaties in one transaction
+
+    `results` maps treaty_id -> (parties_digest, links, unmatched). Links
+    that didn't change are left in place, so treaty counts only move for
+    tribes that actually gained or lost a treaty.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TEMP TABLE link_state (
+            treaty_id UUID PRIMARY KEY,
+            parties_digest TEXT NOT NULL,
+            unmatched_parties JSONB NOT NULL
+        ) ON COMMIT DROP
+    """)
+    cur.execute("""
+        CREATE TEMP TABLE link_results (
+            treaty_id UUID NOT NULL,
+            tribe_id UUID NOT NULL,
+            party_name TEXT NOT NULL,
+            match_method TEXT NOT NULL,
+            match_score REAL NOT NULL
+        ) ON COMMIT DROP
+    """)
+    _copy(cur, 'link_state', ('treaty_id', 'parties_digest', 'unmatched_parties'), (
+        (treaty_id, parties_digest, json.dumps(unmatched))
+        for treaty_id, (parties_digest, _, unmatched) in results.items()
+    ))
+    _copy(cur, 'link_results', ('treaty_id', 'tribe_id', 'party_name', 'match_method', 'match_score'), (
+        (treaty_id, tribe_id, name, method, score)
+        for treaty_id, (_, links, _) in results.items()
+        for tribe_id, (name, method, score) in links.items()
+    ))
+
+    cur.execute("""
+        DELETE FROM treaty_tribes tt
+        USING link_state s
+        WHERE tt.treaty_id = s.treaty_id
+          AND NOT EXISTS (
+              SELECT 1 FROM link_results r
+              WHERE r.treaty_id = tt.treaty_id AND r.tribe_id = tt.tribe_id
+          )
+    """)
+    removed = cur.rowcount
+    cur.execute("""
+        INSERT INTO treaty_tribes (treaty_id, tribe_id, party_name, match_method, match_score)
+        SELECT treaty_id, tribe_id, party_name, match_method, match_score FROM link_results
+        ON CONFLICT (treaty_id, tribe_id) DO UPDATE SET
+            party_name = EXCLUDED.party_name,
+            match_method = EXCLUDED.match_method,
+            match_score = EXCLUDED.match_score,
+            linked_at = NOW()
+        WHERE (treaty_tribes.party_name, treaty_tribes.match_method, treaty_tribes.match_score)
+            IS DISTINCT FROM (EXCLUDED.party_name, EXCLUDED.match_method, EXCLUDED.match_score)
+    """)
+    written = cur.rowcount
+    cur.execute("""
+        INSERT INTO treaty_party_links (treaty_id, parties_digest, aliases_digest, unmatched_parties)
+        SELECT treaty_id, parties_digest, %s, unmatched_parties FROM link_state
+        ON CONFLICT (treaty_id) DO UPDATE SET
+            parties_digest = EXCLUDED.parties_digest,
+            aliases_digest = EXCLUDED.aliases_digest,
+            unmatched_parties = EXCLUDED.unmatched_parties,
+            linked_at = NOW()
+    """, (aliases_digest,))
+    return written, removed
+
+
+def run(everything=False):
+    """Link treaties whose parties or the tribe aliases changed
+
+    Returns (treaties relinked, links written, links removed, unmatched names).
+    """
+    conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id::text, name, alternate_names FROM raw_tribes ORDER BY id")
+        tribes = [(row['id'], row['name'], row['alternate_names']) for row in cur.fetchall()]
+        index = AliasIndex(tribes)
+        aliases_digest = digest([LINK_FORMAT, tribes])
+
+        cur.execute("""
+            SELECT t.id::text, t.tribal_parties_text, l.parties_digest, l.aliases_digest
+            FROM raw_treaties t
+            LEFT JOIN treaty_party_links l ON l.treaty_id = t.id
+        """)
+        results = {}
+        unmatched_names = set()
+        for row in cur.fetchall():
+            parties_digest = digest(row['tribal_parties_text'])
+            if (not everything and row['parties_digest'] == parties_digest
+                    and row['aliases_digest'] == aliases_digest):
+                continue
+            links, unmatched = link_treaty(index, row['tribal_parties_text'])
+            results[row['id']] = (parties_digest, links, unmatched)
+            unmatched_names.update(unmatched)
+
+        written = removed = 0
+        if results:
+            written, removed = write_links(conn, results, aliases_digest)
+        conn.commit()
+        return len(results), written, removed, sorted(unmatched_names)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Link treaty parties to raw_tribes')
+    parser.add_argument('--all', action='store_true',
+                        help='relink every treaty, not just those whose parties changed')
+    args = parser.parse_args()
+
+    relinked, written, removed, unmatched = run(args.all)
+    print(f"Relinked {relinked} treaties ({written} links written, {removed} removed)")
+    if unmatched:
+        print(f"{len(unmatched)} party names matched no tribe:")
+        for name in unmatched:
+            print(f"  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+-- Windwalker Sourcing: Search Indexes
+-- Migration 002: Full-text and trigram indexes for /api/v1/search
+--
+-- Replaces unindexable ILIKE '%q%' scans with:
+-- - Weighted tsvectors over treaty titles, preambles and article text, and
+--   over tribe names and alternate names (GIN)
+-- - Trigram indexes on treaty titles and tribe names, for partial-word and
+--   misspelled queries (pg_trgm, GIN)
+--
+-- The search documents are built by the IMMUTABLE functions below and
+-- indexed as expressions, so the tables keep their columns and queries
+-- must call the same functions to use the indexes.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- ============================================================================
+-- SEARCH DOCUMENTS
+-- ============================================================================
+
+-- String elements of a JSONB array, space separated ('' for anything else)
+CREATE OR REPLACE FUNCTION jsonb_array_text(arr JSONB)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT CASE WHEN jsonb_typeof(arr) = 'array'
+        THEN COALESCE((SELECT string_agg(value, ' ') FROM jsonb_array_elements_text(arr)), '')
+        ELSE ''
+    END
+$$;
+
+-- Title (A) > preamble (B) > articles (C)
+CREATE OR REPLACE FUNCTION treaty_search_vector(title TEXT, preamble TEXT, articles JSONB)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT setweight(to_tsvector('english', COALESCE(title, '')), 'A')
+        || setweight(to_tsvector('english', COALESCE(preamble, '')), 'B')
+        || setweight(jsonb_to_tsvector('english', COALESCE(articles, '[]'), '["string"]'), 'C')
+$$;
+
+-- Name (A) > alternate names (B)
+CREATE OR REPLACE FUNCTION tribe_search_vector(name TEXT, alternate_names JSONB)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT setweight(to_tsvector('english', COALESCE(name, '')), 'A')
+        || setweight(to_tsvector('english', jsonb_array_text(alternate_names)), 'B')
+$$;
+
+-- Every name a tribe is known by, for trigram matching
+CREATE OR REPLACE FUNCTION tribe_search_names(name TEXT, alternate_names JSONB)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT COALESCE(name, '') || ' ' || jsonb_array_text(alternate_names)
+$$;
+
+-- ============================================================================
+-- INDEXES
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_raw_treaties_search
+    ON raw_treaties USING GIN (treaty_search_vector(title, preamble, articles_text));
+CREATE INDEX IF NOT EXISTS idx_raw_treaties_title_trgm
+    ON raw_treaties USING GIN (title gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_raw_tribes_search
+    ON raw_tribes USING GIN (tribe_search_vector(name, alternate_names));
+CREATE INDEX IF NOT EXISTS idx_raw_tribes_names_trgm
+    ON raw_tribes USING GIN (tribe_search_names(name, alternate_names) gin_trgm_ops);
+
+COMMENT ON FUNCTION treaty_search_vector(TEXT, TEXT, JSONB) IS 'Full-text search document for raw_treaties (indexed)';
+COMMENT ON FUNCTION tribe_search_vector(TEXT, JSONB) IS 'Full-text search document for raw_tribes (indexed)';
+COMMENT ON FUNCTION tribe_search_names(TEXT, JSONB) IS 'All names of a tribe, for trigram search (indexed)';
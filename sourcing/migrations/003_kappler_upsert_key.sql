@@ -0,0 +1,26 @@
+-- Windwalker Sourcing: Kappler Upsert Key
+-- Migration 003: One raw_treaties row per Kappler volume and page
+--
+-- The Kappler loader upserts on (kappler_volume, kappler_page) instead of
+-- deleting and re-inserting the whole source, which needs a unique index.
+-- Duplicates left by repeated runs of the old loader are removed first,
+-- keeping the most recently scraped copy.
+
+DELETE FROM raw_treaties
+WHERE id IN (
+    SELECT id
+    FROM (
+        SELECT
+            id,
+            ROW_NUMBER() OVER (
+                PARTITION BY kappler_volume, kappler_page
+                ORDER BY scraped_at DESC, updated_at DESC, id
+            ) AS copy_number
+        FROM raw_treaties
+        WHERE kappler_volume IS NOT NULL AND kappler_page IS NOT NULL
+    ) copies
+    WHERE copy_number > 1
+);
+
+DROP INDEX IF EXISTS idx_raw_treaties_kappler;
+CREATE UNIQUE INDEX idx_raw_treaties_kappler ON raw_treaties(kappler_volume, kappler_page);
@@ -0,0 +1,86 @@
+-- Windwalker Sourcing: Treaty Parties
+-- Migration 004: Links from treaty parties to raw_tribes
+--
+-- Treaty parties are scraped as free text (raw_treaties.tribal_parties_text).
+-- sourcing/link_tribes.py resolves them against an alias index built from
+-- raw_tribes.name and alternate_names and stores the result here, so tribe
+-- pages and per-tribe treaty lists are indexed lookups rather than text
+-- scans. The linker only revisits treaties whose parties (or the tribe
+-- aliases) changed since they were last linked.
+
+-- ============================================================================
+-- LINKS
+-- ============================================================================
+
+CREATE TABLE treaty_tribes (
+    treaty_id UUID NOT NULL REFERENCES raw_treaties(id) ON DELETE CASCADE,
+    tribe_id UUID NOT NULL REFERENCES raw_tribes(id) ON DELETE CASCADE,
+
+    -- The party as named on the treaty, and how it was matched
+    party_name TEXT NOT NULL,
+    match_method TEXT NOT NULL, -- exact, fuzzy
+    match_score REAL NOT NULL,
+
+    linked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (treaty_id, tribe_id)
+);
+
+CREATE INDEX idx_treaty_tribes_tribe ON treaty_tribes(tribe_id, treaty_id);
+
+-- What each treaty was last linked from, for incremental relinking
+CREATE TABLE treaty_party_links (
+    treaty_id UUID PRIMARY KEY REFERENCES raw_treaties(id) ON DELETE CASCADE,
+    parties_digest TEXT NOT NULL,
+    aliases_digest TEXT NOT NULL,
+    unmatched_parties JSONB NOT NULL DEFAULT '[]',
+    linked_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- ============================================================================
+-- PRECOMPUTED TREATY COUNTS
+-- ============================================================================
+
+ALTER TABLE raw_tribes ADD COLUMN treaty_count INTEGER NOT NULL DEFAULT 0;
+
+-- Kept in step with treaty_tribes per statement, including deletes that
+-- cascade from raw_treaties
+CREATE OR REPLACE FUNCTION treaty_tribes_count_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE raw_tribes t
+    SET treaty_count = t.treaty_count + n.links
+    FROM (SELECT tribe_id, COUNT(*) AS links FROM new_links GROUP BY tribe_id) n
+    WHERE t.id = n.tribe_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION treaty_tribes_count_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE raw_tribes t
+    SET treaty_count = t.treaty_count - o.links
+    FROM (SELECT tribe_id, COUNT(*) AS links FROM old_links GROUP BY tribe_id) o
+    WHERE t.id = o.tribe_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER treaty_tribes_count_insert
+    AFTER INSERT ON treaty_tribes
+    REFERENCING NEW TABLE AS new_links
+    FOR EACH STATEMENT EXECUTE FUNCTION treaty_tribes_count_insert();
+
+CREATE TRIGGER treaty_tribes_count_delete
+    AFTER DELETE ON treaty_tribes
+    REFERENCING OLD TABLE AS old_links
+    FOR EACH STATEMENT EXECUTE FUNCTION treaty_tribes_count_delete();
+
+-- ============================================================================
+-- COMMENTS
+-- ============================================================================
+
+COMMENT ON TABLE treaty_tribes IS 'Treaty parties resolved to raw_tribes (written by link_tribes.py)';
+COMMENT ON TABLE treaty_party_links IS 'Inputs each treaty was last linked from, for incremental relinking';
+COMMENT ON COLUMN raw_tribes.treaty_count IS 'Number of treaty_tribes rows, maintained by trigger';
@@ -0,0 +1,14 @@
+-- Windwalker Sourcing: Listing Keys
+-- Migration 005: Keyset pagination indexes for treaty and tribe listings
+--
+-- /api/v1/treaties pages through (date_signed, id) and /api/v1/tribes
+-- through (name, id), each page starting where the previous one's cursor
+-- left off. With the tie-breaking id in the index, every page is a single
+-- index range scan however deep into the listing it is. These supersede
+-- the single-column indexes on the same leading columns.
+
+CREATE INDEX idx_raw_treaties_date_signed_id ON raw_treaties(date_signed, id);
+DROP INDEX IF EXISTS idx_raw_treaties_date_signed;
+
+CREATE INDEX idx_raw_tribes_name_id ON raw_tribes(name, id);
+DROP INDEX IF EXISTS idx_raw_tribes_name;
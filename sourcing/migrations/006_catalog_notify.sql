@@ -0,0 +1,46 @@
+-- Windwalker Sourcing: Catalog Notifications
+-- Migration 006: NOTIFY the API servers when served rows change
+--
+-- The API servers hold every treaty and tribe in an in-memory catalog
+-- (api/catalog.py) and LISTEN on the windwalker_catalog channel to know
+-- when to reload it. The triggers fire once per statement rather than per
+-- row, and Postgres delivers notifications on commit with duplicates in a
+-- transaction folded together, so a scrape or a linking run costs the
+-- servers a handful of reloads however many rows it touches. The payload
+-- is the name of the table that changed.
+
+-- ============================================================================
+-- NOTIFICATIONS
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION notify_catalog_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('windwalker_catalog', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER raw_treaties_notify_catalog
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON raw_treaties
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_change();
+
+CREATE TRIGGER raw_tribes_notify_catalog
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON raw_tribes
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_change();
+
+-- Links decide which tribes a treaty lists and which treaties a tribe has
+CREATE TRIGGER treaty_tribes_notify_catalog
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON treaty_tribes
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_change();
+
+-- Source names and reliabilities appear on treaty pages
+CREATE TRIGGER data_sources_notify_catalog
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON data_sources
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_change();
+
+-- ============================================================================
+-- COMMENTS
+-- ============================================================================
+
+COMMENT ON FUNCTION notify_catalog_change() IS 'Tells LISTENing API servers to reload their treaty catalog';
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Treaty Normalization Stage
+
+Python counterpart of sourcing/src/normalize.sigil: parses date text into
+dates and canonicalizes tribal names, for single values (the scraper uses
+the same functions while loading) and as a batch job over raw_treaties.
+
+The batch job reads rows in chunks from a server-side cursor, normalizes
+them on a pool of worker processes, writes the results back with one
+COPY and one UPDATE, and marks the rows is_normalized. Re-running it with
+--all after a rule change re-normalizes the whole corpus without a
+re-scrape.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+from multiprocessing import Pool
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+DATABASE_URL = os.environ.get('DATABASE_URL', 'postgresql://localhost/windwalker_staging')
+
+# Rows per chunk handed to a worker process
+BATCH_SIZE = int(os.environ.get('NORMALIZE_BATCH_SIZE', '500'))
+
+# ============================================================================
+# Patterns (compiled once per process)
+# ============================================================================
+
+MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4,
+    'may': 5, 'june': 6, 'july': 7, 'august': 8,
+    'september': 9, 'october': 10, 'november': 11, 'december': 12,
+}
+_MONTH = '(' + '|'.join(MONTHS) + ')'
+
+_FULL_DATE_RE = re.compile(_MONTH + r'\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(1[78]\d{2})', re.IGNORECASE)
+_DAY_MONTH_YEAR_RE = re.compile(r'(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?' + _MONTH + r',?\s+(1[78]\d{2})', re.IGNORECASE)
+_MONTH_YEAR_RE = re.compile(_MONTH + r',?\s+(1[78]\d{2})', re.IGNORECASE)
+_APPROXIMATE_RE = re.compile(r'(?:circa|c\.|~|about|approximately)\s*(1[78]\d{2})', re.IGNORECASE)
+_DECADE_RE = re.compile(r'\b(1[78]\d)0s\b', re.IGNORECASE)
+_YEAR_RE = re.compile(r'(1[78]\d{2})')
+
+_TREATY_WITH_RE = re.compile(r'Treaty with the ([^,]+)', re.IGNORECASE)
+_ETC_RE = re.compile(r',?\s*etc\.?', re.IGNORECASE)
+_TRIBE_SPLIT_RE = re.compile(r'\s+and\s+|,\s*')
+_LEADING_THE_RE = re.compile(r'^the(?:\s+|$)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+
+# ============================================================================
+# Dates
+# ============================================================================
+
+ParsedDate = namedtuple('ParsedDate', 'year month day precision original_text')
+ParsedDate.__doc__ = """Parsed date; precision is exact, month_year, year, decade or approximate"""
+
+
+def _valid_day(year, month, day):
+    try:
+        date(year, month, day)
+        return True
+    except ValueError:
+        return False
+
+
+@lru_cache(maxsize=4096)
+def parse_date(text):
+    """Parse date text ("July 2, 1791", "2 July 1791", "1790s", ...) or None"""
+    if not text:
+        return None
+    text = str(text).strip()
+
+    match = _FULL_DATE_RE.search(text)
+    if match:
+        month, day, year = MONTHS[match.group(1).lower()], int(match.group(2)), int(match.group(3))
+        if _valid_day(year, month, day):
+            return ParsedDate(year, month, day, 'exact', text)
+        return ParsedDate(year, month, None, 'month_year', text)
+
+    match = _DAY_MONTH_YEAR_RE.search(text)
+    if match:
+        day, month, year = int(match.group(1)), MONTHS[match.group(2).lower()], int(match.group(3))
+        if _valid_day(year, month, day):
+            return ParsedDate(year, month, day, 'exact', text)
+        return ParsedDate(year, month, None, 'month_year', text)
+
+    match = _MONTH_YEAR_RE.search(text)
+    if match:
+        return ParsedDate(int(match.group(2)), MONTHS[match.group(1).lower()], None, 'month_year', text)
+
+    match = _APPROXIMATE_RE.search(text)
+    if match:
+        return ParsedDate(int(match.group(1)), None, None, 'approximate', text)
+
+    match = _DECADE_RE.search(text)
+    if match:
+        return ParsedDate(int(match.group(1)) * 10, None, None, 'decade', text)
+
+    match = _YEAR_RE.search(text)
+    if match:
+        return ParsedDate(int(match.group(1)), None, None, 'year', text)
+
+    return None
+
+
+def to_date(parsed):
+    """DATE column value for a ParsedDate (unknown month/day become 1)"""
+    if parsed is None:
+        return None
+    return date(parsed.year, parsed.month or 1, parsed.day or 1)
+
+
+def format_iso_date(parsed):
+    """ISO 8601 at the date's precision: YYYY-MM-DD, YYYY-MM or YYYY"""
+    if parsed.month and parsed.day:
+        return f"{parsed.year:04d}-{parsed.month:02d}-{parsed.day:02d}"
+    if parsed.month:
+        return f"{parsed.year:04d}-{parsed.month:02d}"
+    return f"{parsed.year:04d}"
+
+# ============================================================================
+# Text and tribal names
+# ============================================================================
+
+
+def clean_text(text):
+    """Collapse whitespace and straighten curly quotes"""
+    return _WHITESPACE_RE.sub(' ', text).strip().translate(_QUOTES)
+
+
+@lru_cache(maxsize=None)
+def normalize_tribe_name(name):
+    """Canonical form of a tribal name, or None if nothing usable is left
+
+    Idempotent, so names that are already canonical come back unchanged.
+    """
+    cleaned = _LEADING_THE_RE.sub('', clean_text(name or '')).strip(' .,;:')
+    if len(cleaned) <= 2:
+        return None
+    # Title-case names scraped in all capitals or all lowercase
+    if cleaned.isupper() or cleaned.islower():
+        cleaned = cleaned.title()
+    return cleaned
+
+
+@lru_cache(maxsize=4096)
+def extract_tribes(title):
+    """Canonical tribal names from a "Treaty with the X, Y and Z, 1825" title"""
+    match = _TREATY_WITH_RE.search(title or '')
+    if not match:
+        return ()
+    tribe_part = _ETC_RE.sub('', match.group(1).strip())
+    tribes = []
+    for part in _TRIBE_SPLIT_RE.split(tribe_part):
+        tribe = normalize_tribe_name(part)
+        if tribe and tribe not in tribes:
+            tribes.append(tribe)
+    return tuple(tribes)
+
+# ============================================================================
+# Batch job
+# ============================================================================
+
+# Columns written back by the batch job, in COPY order
+RESULT_COLUMNS = ('id', 'date_signed', 'date_ratified', 'date_proclaimed', 'tribal_parties_text')
+
+
+def normalize_row(row):
+    """Normalized column values for one raw_treaties row"""
+    tribes = list(extract_tribes(row['title']))
+    if not tribes:
+        parties = row['tribal_parties_text'] or []
+        for name in parties:
+            tribe = normalize_tribe_name(name) if isinstance(name, str) else None
+            if tribe and tribe not in tribes:
+                tribes.append(tribe)
+    return (
+        row['id'],
+        to_date(parse_date(row['date_signed_text'])),
+        to_date(parse_date(row['date_ratified_text'])),
+        to_date(parse_date(row['date_proclaimed_text'])),
+        tribes,
+    )
+
+
+def normalize_rows(rows):
+    """Worker entry point: normalize a chunk of rows"""
+    return [normalize_row(row) for row in rows]
+
+
+def _result_csv(results):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row_id, signed, ratified, proclaimed, tribes in results:
+        writer.writerow([
+            row_id,
+            signed.isoformat() if signed else None,
+            ratified.isoformat() if ratified else None,
+            proclaimed.isoformat() if proclaimed else None,
+            json.dumps(tribes),
+        ])
+    buf.seek(0)
+    return buf
+
+
+def read_batches(conn, everything, batch_size=BATCH_SIZE):
+    """Yield lists of rows to normalize from a server-side cursor"""
+    cur = conn.cursor('normalize_rows', cursor_factory=RealDictCursor)
+    cur.itersize = batch_size
+    cur.execute(f"""
+        SELECT id::text, title, date_signed_text, date_ratified_text,
+               date_proclaimed_text, tribal_parties_text
+        FROM raw_treaties
+        {'' if everything else 'WHERE NOT is_normalized'}
+    """)
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        yield [dict(row) for row in rows]
+    cur.close()
+
+
+def write_results(conn, results):
+    """Apply normalized values and set is_normalized; returns rows changed
+
+    Only rows whose values differ are rewritten, so an unchanged corpus
+    doesn't bump updated_at.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TEMP TABLE normalize_results (
+            id UUID PRIMARY KEY,
+            date_signed DATE,
+            date_ratified DATE,
+            date_proclaimed DATE,
+            tribal_parties_text JSONB NOT NULL
+        ) ON COMMIT DROP
+    """)
+    cur.copy_expert(
+        f"COPY normalize_results ({', '.join(RESULT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        _result_csv(results),
+    )
+    cur.execute("""
+        UPDATE raw_treaties t
+        SET date_signed = r.date_signed,
+            date_ratified = r.date_ratified,
+            date_proclaimed = r.date_proclaimed,
+            tribal_parties_text = r.tribal_parties_text,
+            is_normalized = true
+        FROM normalize_results r
+        WHERE t.id = r.id
+          AND (NOT t.is_normalized
+               OR (t.date_signed, t.date_ratified, t.date_proclaimed, t.tribal_parties_text)
+                  IS DISTINCT FROM
+                  (r.date_signed, r.date_ratified, r.date_proclaimed, r.tribal_parties_text))
+    """)
+    return cur.rowcount
+
+
+def run(everything=False, workers=None, batch_size=BATCH_SIZE):
+    """Normalize raw_treaties; returns (rows processed, rows changed)
+
+    Everything is written in one transaction, so readers never see a
+    half-normalized corpus.
+    """
+    # Workers are started before connecting so they don't inherit the socket
+    with Pool(processes=workers) as pool:
+        conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+        try:
+            results = []
+            for chunk in pool.imap(normalize_rows, read_batches(conn, everything, batch_size)):
+                results.extend(chunk)
+            changed = write_results(conn, results) if results else 0
+            conn.commit()
+            return len(results), changed
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Normalize dates and tribal names in raw_treaties')
+    parser.add_argument('--all', action='store_true',
+                        help='re-normalize every row, not just rows not yet normalized')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='rows per chunk handed to a worker')
+    args = parser.parse_args()
+
+    processed, changed = run(args.all, args.workers, args.batch_size)
+    print(f"Normalized {processed} treaties ({changed} updated)")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,19 +10,22 @@ Status: Public Domain
 Coverage: 370+ treaties (1778-1883)
 """
 
-import re
-import time
+import argparse
+import csv
+import io
 import json
+import os
+import re
+
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from datetime import datetime
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
-import ssl
-import os
+
+import normalize
+from fetcher import Fetcher, FetchError, ResponseCache
 
 # Configuration
-BASE_URL = "https://dc.library.okstate.edu"
+# Point CONTENTDM_BASE_URL at a local stand-in server for testing
+BASE_URL = os.environ.get('CONTENTDM_BASE_URL', "https://dc.library.okstate.edu")
 API_BASE = f"{BASE_URL}/digital/bl/dmwebservices/index.php"
 COLLECTION = "kapplers"
 VOL2_POINTER = "29743"  # Volume 2 (Treaties)
@@ -30,35 +33,57 @@ SOURCE_ID = "kappler"
 SOURCE_NAME = "Kappler's Indian Affairs: Laws and Treaties"
 DATABASE_URL = os.environ.get('DATABASE_URL', 'postgresql://localhost/windwalker_staging')
 
-# Respectful scraping settings
-MIN_DELAY_MS = 500
-USER_AGENT = "Windwalker/0.1.0 (Native Treaty Mapping Initiative)"
+# Incremental runs: CONTENTdm responses are cached on disk (FETCH_CACHE_DIR,
+# see fetcher.py) and revalidated; the run checkpoint and the rows derived
+# from each item's last response live in STATE_DIR
+STATE_DIR = os.environ.get('KAPPLER_STATE_DIR', os.path.join('.cache', 'kappler'))
+CHECKPOINT_PATH = os.path.join(STATE_DIR, 'checkpoint.json')
+ITEMS_PATH = os.path.join(STATE_DIR, 'items.json')
+CHECKPOINT_EVERY = 25
+# Bump whenever build_treaty_row (or the normalize rules it uses) changes,
+# so stored rows are re-derived
+PARSER_VERSION = 3
 
+# Shared by every request so connections are reused and the rate limit
+# (MIN_DELAY_MS, see fetcher.py) covers all workers together
+_fetcher = None
 
-def fetch_json(url):
-    """Fetch JSON from a URL with respectful delay"""
-    time.sleep(MIN_DELAY_MS / 1000.0)
 
-    ctx = ssl.create_default_context()
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
+def get_fetcher(offline=False):
+    """Get the shared rate-limited, caching fetcher"""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = Fetcher(cache=ResponseCache(), offline=offline)
+    return _fetcher
 
-    req = Request(url, headers={'User-Agent': USER_AGENT})
 
+def fetch_cached(url, max_age=0):
+    """Fetch a response through the on-disk cache; None on failure"""
     try:
-        with urlopen(req, context=ctx, timeout=30) as response:
-            return json.loads(response.read().decode('utf-8'))
-    except (URLError, HTTPError, json.JSONDecodeError) as e:
-        print(f"  Error fetching {url}: {e}")
+        return get_fetcher().get_cached(url, max_age)
+    except FetchError as e:
+        print(f"  Error fetching {e}")
         return None
 
 
-def get_treaty_list():
+def fetch_json(url, max_age=0):
+    """Fetch JSON from a URL, within the shared rate limit"""
+    response = fetch_cached(url, max_age)
+    if response is None:
+        return None
+    try:
+        return response.json()
+    except ValueError as e:
+        print(f"  Invalid JSON from {url}: {e}")
+        return None
+
+
+def get_treaty_list(max_age=0):
     """Get list of all treaties from Volume 2"""
     print("Fetching treaty index from CONTENTdm API...")
 
     url = f"{API_BASE}?q=dmGetCompoundObjectInfo/{COLLECTION}/{VOL2_POINTER}/json"
-    data = fetch_json(url)
+    data = fetch_json(url, max_age)
 
     if not data:
         return []
@@ -103,61 +128,34 @@ def get_treaty_list():
     return treaties
 
 
-def get_treaty_metadata(pointer):
+def metadata_url(pointer):
+    return f"{API_BASE}?q=dmGetItemInfo/{COLLECTION}/{pointer}/json"
+
+
+def get_treaty_metadata(pointer, max_age=0):
     """Get full metadata for a treaty"""
-    url = f"{API_BASE}?q=dmGetItemInfo/{COLLECTION}/{pointer}/json"
-    return fetch_json(url)
+    return fetch_json(metadata_url(pointer), max_age)
 
 
-def parse_date(date_str):
-    """Parse a date string into a date object"""
-    if not date_str:
+def metadata_date(metadata):
+    """Date field of a dmGetItemInfo record, if it has a usable one"""
+    if not isinstance(metadata, dict):
         return None
+    # CONTENTdm returns empty fields as {}
+    date = metadata.get('date')
+    if isinstance(date, str) and parse_date(date):
+        return date.strip()
+    return None
 
-    # Extract year from various formats
-    year_match = re.search(r'(1[78]\d{2})', str(date_str))
-    if year_match:
-        year = int(year_match.group(1))
-        # Try to extract month and day
-        date_match = re.search(
-            r'(January|February|March|April|May|June|July|August|'
-            r'September|October|November|December)\s+(\d{1,2})',
-            str(date_str), re.IGNORECASE
-        )
-        if date_match:
-            month_names = {
-                'january': 1, 'february': 2, 'march': 3, 'april': 4,
-                'may': 5, 'june': 6, 'july': 7, 'august': 8,
-                'september': 9, 'october': 10, 'november': 11, 'december': 12
-            }
-            month = month_names.get(date_match.group(1).lower(), 1)
-            day = int(date_match.group(2))
-            try:
-                return datetime(year, month, day).date()
-            except ValueError:
-                return datetime(year, 1, 1).date()
-        return datetime(year, 1, 1).date()
 
-    return None
+def parse_date(date_str):
+    """Parse a date string into a date object"""
+    return normalize.to_date(normalize.parse_date(date_str))
 
 
 def extract_tribes_from_title(title):
     """Extract tribal names from treaty title"""
-    tribes = []
-
-    # Pattern: "Treaty with the X, 1778"
-    match = re.search(r'Treaty with the ([^,]+)', title, re.IGNORECASE)
-    if match:
-        tribe_part = match.group(1).strip()
-        # Handle "etc." cases
-        tribe_part = re.sub(r',?\s*etc\.?', '', tribe_part)
-        # Split on "and" or ","
-        for tribe in re.split(r'\s+and\s+|,\s*', tribe_part):
-            tribe = tribe.strip()
-            if tribe and len(tribe) > 2:
-                tribes.append(tribe)
-
-    return tribes
+    return list(normalize.extract_tribes(title))
 
 
 def get_db():
@@ -185,14 +183,81 @@ def ensure_source_exists(conn):
     return result['id']
 
 
-def insert_treaty(conn, source_id, treaty_data):
-    """Insert a treaty in the database"""
-    cur = conn.cursor()
+# Columns staged by load_treaties, in COPY order
+STAGE_COLUMNS = (
+    'source_url', 'title', 'date_signed_text', 'date_signed',
+    'tribal_parties_text', 'kappler_volume', 'kappler_page',
+)
+
 
-    date_signed = parse_date(treaty_data.get('date'))
-    tribes_json = json.dumps(treaty_data.get('tribes', []))
+def _stage_rows(treaties):
+    """CSV for COPY ... FROM STDIN (empty unquoted fields load as NULL)"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for treaty_data in treaties:
+        date_signed = parse_date(treaty_data.get('date'))
+        writer.writerow([
+            treaty_data['url'],
+            treaty_data['title'],
+            treaty_data.get('date'),
+            date_signed.isoformat() if date_signed else None,
+            json.dumps(treaty_data.get('tribes', [])),
+            2,  # Volume 2
+            treaty_data.get('page_num'),
+        ])
+    buf.seek(0)
+    return buf
+
+
+def load_treaties(conn, source_id, treaties):
+    """Replace this source's treaties with `treaties` in one transaction
+
+    Rows are COPYed into a temporary staging table and then upserted into
+    raw_treaties on (kappler_volume, kappler_page); treaties that are no
+    longer in the scrape are deleted. Readers see either the previous
+    dataset or the new one, never a partial load. Rows whose content is
+    unchanged are left alone so their updated_at (and the API caches keyed
+    on it) stay put.
+
+    Returns (inserted, updated, deleted).
+    """
+    # A page listed twice would make the upsert touch one row twice
+    by_page = {}
+    for treaty_data in treaties:
+        key = treaty_data.get('page_num')
+        by_page[key if key is not None else id(treaty_data)] = treaty_data
+    treaties = list(by_page.values())
 
+    cur = conn.cursor()
     try:
+        cur.execute("""
+            CREATE TEMP TABLE kappler_stage (
+                source_url TEXT NOT NULL,
+                title TEXT NOT NULL,
+                date_signed_text TEXT,
+                date_signed DATE,
+                tribal_parties_text JSONB NOT NULL,
+                kappler_volume INTEGER,
+                kappler_page INTEGER
+            ) ON COMMIT DROP
+        """)
+        cur.copy_expert(
+            f"COPY kappler_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            _stage_rows(treaties),
+        )
+
+        # Anything from this source that the new scrape doesn't have
+        cur.execute("""
+            DELETE FROM raw_treaties t
+            WHERE t.source_id = %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM kappler_stage s
+                  WHERE s.kappler_volume = t.kappler_volume
+                    AND s.kappler_page = t.kappler_page
+              )
+        """, (source_id,))
+        deleted = cur.rowcount
+
         cur.execute("""
             INSERT INTO raw_treaties (
                 source_id, source_url, title,
@@ -200,35 +265,156 @@ def insert_treaty(conn, source_id, treaty_data):
                 tribal_parties_text,
                 kappler_volume, kappler_page,
                 raw_html, is_validated, scraped_at
-            ) VALUES (
-                %s, %s, %s,
-                %s, %s,
-                %s::jsonb,
-                %s, %s,
-                '', true, NOW()
             )
-            RETURNING id
-        """, (
-            source_id,
-            treaty_data['url'],
-            treaty_data['title'],
-            treaty_data.get('date'),
-            date_signed,
-            tribes_json,
-            2,  # Volume 2
-            treaty_data.get('page_num'),
-        ))
+            SELECT
+                %s, source_url, title,
+                date_signed_text, date_signed,
+                tribal_parties_text,
+                kappler_volume, kappler_page,
+                '', true, NOW()
+            FROM kappler_stage
+            ON CONFLICT (kappler_volume, kappler_page) DO UPDATE SET
+                source_id = EXCLUDED.source_id,
+                source_url = EXCLUDED.source_url,
+                title = EXCLUDED.title,
+                date_signed_text = EXCLUDED.date_signed_text,
+                date_signed = EXCLUDED.date_signed,
+                tribal_parties_text = EXCLUDED.tribal_parties_text,
+                scraped_at = EXCLUDED.scraped_at,
+                is_normalized = false
+            WHERE (raw_treaties.source_id, raw_treaties.source_url, raw_treaties.title,
+                   raw_treaties.date_signed_text, raw_treaties.date_signed,
+                   raw_treaties.tribal_parties_text)
+                IS DISTINCT FROM
+                  (EXCLUDED.source_id, EXCLUDED.source_url, EXCLUDED.title,
+                   EXCLUDED.date_signed_text, EXCLUDED.date_signed,
+                   EXCLUDED.tribal_parties_text)
+            RETURNING (xmax = 0) AS inserted
+        """, (source_id,))
+        results = cur.fetchall()
+        inserted = sum(1 for row in results if row['inserted'])
 
-        result = cur.fetchone()
         conn.commit()
-        return result['id'] if result else None
+        return inserted, len(results) - inserted, deleted
     except Exception as e:
         conn.rollback()
         raise e
 
 
+def build_treaty_row(treaty, metadata):
+    """Row for load_treaties from a treaty list entry and its item metadata"""
+    title = treaty['title']
+    pointer = treaty['pointer']
+
+    # Prefer the item's own date field, falling back to the year in the title
+    date_text = metadata_date(metadata)
+    if not date_text:
+        date_match = re.search(r',\s*(1[78]\d{2})', title)
+        date_text = date_match.group(1) if date_match else None
+
+    return {
+        'title': title,
+        'url': f"{BASE_URL}/digital/collection/{COLLECTION}/id/{pointer}",
+        'date': date_text,
+        'tribes': extract_tribes_from_title(title),
+        'page_num': int(pointer) if pointer.isdigit() else None,
+    }
+
+
+def read_state(path):
+    """JSON state file contents, or None if missing or unreadable"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_state(path, data):
+    """Atomically replace a JSON state file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def start_run(conn, source_id, total, config, run_id=None):
+    """Record a run in scrape_runs (or mark an interrupted one running again)"""
+    cur = conn.cursor()
+    row = None
+    if run_id:
+        cur.execute("""
+            UPDATE scrape_runs
+            SET status = 'running', total_items = %s, config = %s::jsonb,
+                error_message = NULL, finished_at = NULL
+            WHERE id = %s
+            RETURNING id
+        """, (total, json.dumps(config), run_id))
+        row = cur.fetchone()
+    if row is None:
+        cur.execute("""
+            INSERT INTO scrape_runs (source_id, total_items, config)
+            VALUES (%s, %s, %s::jsonb)
+            RETURNING id
+        """, (source_id, total, json.dumps(config)))
+        row = cur.fetchone()
+    conn.commit()
+    return str(row['id'])
+
+
+def update_run(conn, run_id, processed, failed, status=None, error=None):
+    """Checkpoint a run's progress; a status other than running finishes it"""
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE scrape_runs
+        SET processed_items = %s, failed_items = %s,
+            status = COALESCE(%s, status),
+            error_message = COALESCE(%s, error_message),
+            finished_at = CASE WHEN %s IS NULL THEN finished_at ELSE NOW() END
+        WHERE id = %s
+    """, (processed, failed, status, error, status, run_id))
+    conn.commit()
+
+
+def process_item(treaty, previous, max_age, reprocess):
+    """Fetch (or revalidate) one item and derive its row
+
+    Returns (row, digest, changed). The stored row is reused when the
+    item's response and title are unchanged since the last completed run;
+    digest is None if the item could not be fetched.
+    """
+    response = fetch_cached(metadata_url(treaty['pointer']), max_age)
+    unchanged = (
+        previous is not None and not reprocess and previous['title'] == treaty['title']
+        and (response is None or previous['digest'] == response.digest)
+    )
+    if unchanged:
+        return previous['row'], response and response.digest, False
+
+    metadata = None
+    if response is not None:
+        try:
+            metadata = response.json()
+        except ValueError as e:
+            print(f"  Invalid JSON for item {treaty['pointer']}: {e}")
+    return build_treaty_row(treaty, metadata), response and response.digest, True
+
+
 def main():
     """Main scraping function"""
+    parser = argparse.ArgumentParser(description='Scrape Kappler Volume II into the staging database')
+    parser.add_argument('--offline', action='store_true',
+                        help='use cached CONTENTdm responses only; never touch the network')
+    parser.add_argument('--reprocess', action='store_true',
+                        help='re-derive every row from cached responses (implies --offline)')
+    parser.add_argument('--fresh', action='store_true',
+                        help="start a new run even if an interrupted run's checkpoint exists")
+    parser.add_argument('--max-age', type=float, default=0, metavar='SECONDS',
+                        help='use cached responses younger than this without revalidating')
+    args = parser.parse_args()
+    offline = args.offline or args.reprocess
+
     print("""
     ╦╔═┌─┐┌─┐┌─┐┬  ┌─┐┬─┐  ╔═╗┌─┐┬─┐┌─┐┌─┐┌─┐┬─┐
     ╠╩╗├─┤├─┘├─┘│  ├┤ ├┬┘  ╚═╗│  ├┬┘├─┤├─┘├┤ ├┬┘
@@ -243,66 +429,113 @@ def main():
     source_id = ensure_source_exists(conn)
     print(f"Source ID: {source_id}")
 
-    # Clear existing Kappler treaties to avoid duplicates with old sample data
-    cur = conn.cursor()
-    cur.execute("DELETE FROM raw_treaties WHERE source_id = %s", (source_id,))
-    conn.commit()
-    print("Cleared existing Kappler treaties")
+    # Resume an interrupted run: items it already fetched are read back from
+    # the cache instead of being revalidated
+    checkpoint = None if args.fresh else read_state(CHECKPOINT_PATH)
+    if checkpoint:
+        print(f"Resuming run {checkpoint['run_id']} ({len(checkpoint['done'])} items already fetched)")
+    else:
+        checkpoint = {'run_id': None, 'done': {}}
+    done = checkpoint['done']
+
+    state = read_state(ITEMS_PATH)
+    if not state or state.get('parser_version') != PARSER_VERSION:
+        state = {'parser_version': PARSER_VERSION, 'items': {}}
+    items = state['items']
+
+    fetcher = get_fetcher(offline=offline)
 
     # Fetch treaty list
-    treaties = get_treaty_list()
+    treaties = get_treaty_list(float('inf') if checkpoint['run_id'] else args.max_age)
 
     if not treaties:
         print("No treaties found!")
         return
 
-    # Process each treaty
-    success_count = 0
-    error_count = 0
-
-    for i, treaty in enumerate(treaties):
-        title = treaty['title']
-        pointer = treaty['pointer']
-
-        print(f"\n[{i+1}/{len(treaties)}] {title[:60]}...")
+    config = {'offline': offline, 'reprocess': args.reprocess, 'max_age': args.max_age,
+              'parser_version': PARSER_VERSION, 'base_url': BASE_URL}
+    run_id = start_run(conn, source_id, len(treaties), config, checkpoint['run_id'])
+    checkpoint['run_id'] = run_id
+    print(f"Run ID: {run_id}")
 
-        # Extract date from title
-        date_match = re.search(r',\s*(1[78]\d{2})', title)
-        date_text = date_match.group(1) if date_match else None
+    # Process each treaty; item metadata is fetched ahead on the worker pool
+    # while earlier treaties are being processed
+    rows = []
+    new_items = {}
+    changed_count = 0
+    failed_count = 0
 
-        # Extract tribes from title
-        tribes = extract_tribes_from_title(title)
+    def work(treaty):
+        pointer = treaty['pointer']
+        max_age = float('inf') if pointer in done else args.max_age
+        return process_item(treaty, items.get(pointer), max_age, args.reprocess)
 
-        # Build URL
-        url = f"{BASE_URL}/digital/collection/{COLLECTION}/id/{pointer}"
+    try:
+        results = fetcher.map(work, treaties)
+        for i, (treaty, (row, digest, changed)) in enumerate(zip(treaties, results)):
+            pointer = treaty['pointer']
+            rows.append(row)
+            if digest is None:
+                failed_count += 1
+            else:
+                done[pointer] = digest
+                new_items[pointer] = {'title': treaty['title'], 'digest': digest, 'row': row}
+            if changed:
+                changed_count += 1
+                print(f"\n[{i+1}/{len(treaties)}] {treaty['title'][:60]}...")
+                if row['tribes']:
+                    print(f"  Tribes: {', '.join(row['tribes'][:3])}")
+
+            if (i + 1) % CHECKPOINT_EVERY == 0:
+                write_state(CHECKPOINT_PATH, checkpoint)
+                update_run(conn, run_id, i + 1, failed_count)
+    except BaseException as e:
+        # Keep what was fetched; the next run picks up from here
+        write_state(CHECKPOINT_PATH, checkpoint)
+        status = 'cancelled' if isinstance(e, KeyboardInterrupt) else 'failed'
+        try:
+            update_run(conn, run_id, len(rows), failed_count, status, str(e) or type(e).__name__)
+        except psycopg2.Error as db_error:
+            print(f"Could not record run status: {db_error}")
+        conn.close()
+        fetcher.close()
+        print(f"\nRun {status} after {len(rows)} items; re-run to resume")
+        if status == 'failed':
+            raise
+        return
 
-        treaty_data = {
-            'title': title,
-            'url': url,
-            'date': date_text,
-            'tribes': tribes,
-            'page_num': int(pointer) if pointer.isdigit() else None,
-        }
+    fetcher.close()
 
-        try:
-            treaty_id = insert_treaty(conn, source_id, treaty_data)
-            if treaty_id:
-                print(f"  Saved: {title[:50]}")
-                if tribes:
-                    print(f"  Tribes: {', '.join(tribes[:3])}")
-                success_count += 1
-            else:
-                error_count += 1
-        except Exception as e:
-            print(f"  Error: {e}")
-            error_count += 1
+    # Save everything at once, so the API never serves a half-loaded source
+    print(f"\nLoading {len(rows)} treaties ({changed_count} changed or new)...")
+    try:
+        inserted, updated, deleted = load_treaties(conn, source_id, rows)
+    except Exception as e:
+        print(f"  Error: {e}")
+        print("Load rolled back; the previous data is unchanged")
+        write_state(CHECKPOINT_PATH, checkpoint)
+        update_run(conn, run_id, len(rows), failed_count, 'failed', str(e))
+        conn.close()
+        return
 
+    # Items that failed this time keep their previous row and digest
+    for treaty in treaties:
+        if treaty['pointer'] not in new_items and treaty['pointer'] in items:
+            new_items[treaty['pointer']] = items[treaty['pointer']]
+    state['items'] = new_items
+    write_state(ITEMS_PATH, state)
+    if os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    update_run(conn, run_id, len(rows), failed_count, 'completed')
     conn.close()
 
     print(f"\n{'='*50}")
     print(f"Scraping complete!")
-    print(f"  Successful: {success_count}")
-    print(f"  Errors: {error_count}")
+    print(f"  Inserted: {inserted}")
+    print(f"  Updated: {updated}")
+    print(f"  Unchanged: {len(rows) - inserted - updated}")
+    print(f"  Removed: {deleted}")
+    print(f"  Fetch errors: {failed_count}")
     print(f"  Total: {len(treaties)}")
 
 
@@ -0,0 +1,10 @@
+"""Shared setup for the sourcing pipeline tests
+
+The scripts are imported as modules; nothing here needs PostgreSQL or
+the network.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,72 @@
+from link_tribes import (FUZZY_THRESHOLD, STRIPPED_SCORE, AliasIndex, digest, link_treaty, name_key,
+                         stripped_key, trigrams)
+
+CHEROKEE = '30000000-0000-0000-0000-000000000002'
+OSAGE = '30000000-0000-0000-0000-000000000001'
+
+
+def alias_index():
+    return AliasIndex([
+        (CHEROKEE, 'Cherokee', ['Cherokee Nation', 'Tsalagi']),
+        (OSAGE, 'Osage', ['Great and Little Osage']),
+    ])
+
+
+def test_link_treaty_records_parties_as_written():
+    # normalize_tribe_name drops the leading "the" and title-cases these
+    links, unmatched = link_treaty(alias_index(), ['the CHEROKEE NATION', 'great and little osage', 'THE WYANDOT'])
+    assert links == {
+        CHEROKEE: ('the CHEROKEE NATION', 'exact', 1.0),
+        OSAGE: ('great and little osage', 'exact', 1.0),
+    }
+    assert unmatched == ['THE WYANDOT']
+
+
+def test_link_treaty_keeps_the_best_match_per_tribe():
+    links, _ = link_treaty(alias_index(), ['Cherokee Indians', 'Cherokee', None, 'a.'])
+    assert links == {CHEROKEE: ('Cherokee', 'exact', 1.0)}
+
+
+def test_name_keys():
+    assert name_key('  Cœur d’Alêne  Tribe ') == 'cœur d alene tribe'
+    assert stripped_key('the cherokee nation') == 'cherokee'
+    assert stripped_key('band of indians') == 'band of indians'
+    assert trigrams('ute') == {'  u', ' ut', 'ute', 'te '}
+
+
+def test_resolve_exact_and_stripped():
+    index = alias_index()
+    assert index.resolve('TSALAGI') == [(CHEROKEE, 'exact', 1.0)]
+    assert index.resolve('Cherokee Tribe of Indians') == [(CHEROKEE, 'exact', STRIPPED_SCORE)]
+
+
+def test_resolve_links_every_tribe_sharing_a_name():
+    index = AliasIndex([
+        ('b', 'Cherokee Nation', []),
+        ('a', 'Eastern Band of Cherokee Indians', ['Cherokee Nation']),
+    ])
+    assert index.resolve('Cherokee Nation') == [('a', 'exact', 1.0), ('b', 'exact', 1.0)]
+
+
+def test_resolve_fuzzy():
+    index = alias_index()
+    tribe_id, method, score = index.resolve('Cheroki')[0]
+    assert (tribe_id, method) == (CHEROKEE, 'fuzzy')
+    assert FUZZY_THRESHOLD <= score < 1
+    assert index.resolve('Wyandot') == []
+
+
+def test_resolve_leaves_fuzzy_ties_unlinked():
+    index = AliasIndex([('a', 'Sauk', []), ('b', 'Sauz', [])])
+    assert index.resolve('Sau') == []
+
+
+def test_resolve_ignores_unusable_alternate_names_and_memoizes():
+    index = AliasIndex([(OSAGE, 'Osage', [None, 3, '', 'Wazhazhe'])])
+    assert index.resolve('wazhazhe') == [(OSAGE, 'exact', 1.0)]
+    assert index.resolve('Wazhazhe!') is index.resolve('wazhazhe')
+
+
+def test_digest_is_order_independent_for_keys():
+    assert digest({'a': 1, 'b': 2}) == digest({'b': 2, 'a': 1})
+    assert digest(['a', 'b']) != digest(['b', 'a'])
@@ -0,0 +1,74 @@
+from datetime import date
+
+import pytest
+
+from normalize import (ParsedDate, extract_tribes, format_iso_date, normalize_row, normalize_tribe_name,
+                       parse_date, to_date)
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('Cherokee', 'Cherokee'),
+    ('the Cherokee Nation', 'Cherokee Nation'),
+    ('THE  CHEROKEE\nNATION.', 'Cherokee Nation'),
+    ('great and little osage', 'Great And Little Osage'),
+    ('Sac and Fox', 'Sac and Fox'),
+    ('“Delaware”,', '"Delaware"'),
+    ('Ki', None),
+    ('the ', None),
+    ('', None),
+    (None, None),
+])
+def test_normalize_tribe_name(name, expected):
+    assert normalize_tribe_name(name) == expected
+
+
+@pytest.mark.parametrize('name', ['Cherokee Nation', 'THE OSAGE', ' the  Sac and Fox; '])
+def test_normalize_tribe_name_is_idempotent(name):
+    once = normalize_tribe_name(name)
+    assert normalize_tribe_name(once) == once
+
+
+def test_extract_tribes():
+    assert extract_tribes('Treaty with the Wyandot, etc., 1785') == ('Wyandot',)
+    assert extract_tribes('Treaty with the Sioux and Arapaho, 1868') == ('Sioux', 'Arapaho')
+    assert extract_tribes('Treaty of Fort Laramie') == ()
+    assert extract_tribes(None) == ()
+
+
+@pytest.mark.parametrize('text, parsed', [
+    ('July 2, 1791', (1791, 7, 2, 'exact')),
+    ('Concluded at Hopewell, November 28th, 1785.', (1785, 11, 28, 'exact')),
+    ('the 2d day of July 1791', (1791, 7, None, 'month_year')),
+    ('2nd of July, 1791', (1791, 7, 2, 'exact')),
+    ('February 30, 1800', (1800, 2, None, 'month_year')),
+    ('Sept. 1817', (1817, None, None, 'year')),
+    ('September 1817', (1817, 9, None, 'month_year')),
+    ('circa 1790', (1790, None, None, 'approximate')),
+    ('1790s', (1790, None, None, 'decade')),
+    ('signed in 1805 at Fort Industry', (1805, None, None, 'year')),
+])
+def test_parse_date(text, parsed):
+    assert parse_date(text)[:4] == parsed
+
+
+def test_parse_date_without_a_date():
+    assert parse_date('undated') is None
+    assert parse_date('') is None
+
+
+def test_to_date_and_format_iso_date():
+    assert to_date(None) is None
+    assert to_date(ParsedDate(1791, 7, None, 'month_year', '')) == date(1791, 7, 1)
+    assert format_iso_date(ParsedDate(1791, 7, 2, 'exact', '')) == '1791-07-02'
+    assert format_iso_date(ParsedDate(1791, 7, None, 'month_year', '')) == '1791-07'
+    assert format_iso_date(ParsedDate(1790, None, None, 'decade', '')) == '1790'
+
+
+def test_normalize_row():
+    row = {'id': 'a', 'title': 'Treaty of Fort Laramie', 'date_signed_text': 'September 17, 1851',
+           'date_ratified_text': None, 'date_proclaimed_text': '1852',
+           'tribal_parties_text': ['the SIOUX', 'Sioux', 'Arapaho', 7, 'x']}
+    assert normalize_row(row) == ('a', date(1851, 9, 17), None, date(1852, 1, 1), ['Sioux', 'Arapaho'])
+    # Parties named in the title win over the scraped list
+    row['title'] = 'Treaty with the Crow, 1851'
+    assert normalize_row(row)[4] == ['Crow']
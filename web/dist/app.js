@@ -67,32 +67,106 @@ window.addEventListener('popstate', handleRoute);
 // API Calls
 // ============================================================================
 
+// Bumped on every fetchTreaties call, so a superseded load stops paging
+let treatyLoad = 0;
+
+// Load every treaty page by page, following the API's cursors. The views
+// are refreshed as each page arrives.
 async function fetchTreaties(yearEnd = null) {
+    const load = ++treatyLoad;
     try {
-        let url = `${API_BASE}/treaties`;
+        const params = new URLSearchParams();
         if (yearEnd) {
-            url += `?year_end=${yearEnd}`;
+            params.set('year_end', yearEnd);
         }
-        const res = await fetch(url);
-        const data = await res.json();
-        state.treaties = data.treaties || [];
-
-        // Update the appropriate view
-        if (state.currentView === 'map') {
-            renderTreatyList();
-            updateTreatyCount();
-        } else if (state.currentView === 'treaties' || state.currentView === 'tribes') {
-            // Re-render page content for views that depend on treaty data
-            const mapContainer = document.querySelector('.map-explorer');
-            if (mapContainer) {
-                mapContainer.innerHTML = renderViewContent();
+        let treaties = [];
+        let cursor = null;
+        do {
+            if (cursor) {
+                params.set('cursor', cursor);
             }
-        }
+            const res = await fetch(`${API_BASE}/treaties?${params}`);
+            const data = await res.json();
+            if (load !== treatyLoad) return;
+            treaties = treaties.concat(data.treaties || []);
+            state.treaties = treaties;
+            refreshTreatyViews();
+            cursor = data.next_cursor;
+        } while (cursor);
     } catch (err) {
         console.error('Failed to fetch treaties:', err);
     }
 }
 
+function refreshTreatyViews() {
+    // Update the appropriate view
+    if (state.currentView === 'map') {
+        renderTreatyList();
+        updateTreatyCount();
+    } else if (state.currentView === 'treaties' || state.currentView === 'tribes') {
+        // Re-render page content for views that depend on treaty data
+        const mapContainer = document.querySelector('.map-explorer');
+        if (mapContainer) {
+            mapContainer.innerHTML = renderViewContent();
+        }
+    }
+}
+
+// Year the treaty list and boundaries currently reflect (null: unfiltered)
+let timelineYear = null;
+let timelineTarget = null;
+let timelineBusy = false;
+
+// Move the timeline to `year`, fetching only what changed since the last
+// year shown. Requests run one at a time; while one is in flight, further
+// slider moves just update the target.
+async function syncTimeline(year) {
+    timelineTarget = year;
+    if (timelineBusy) return;
+    timelineBusy = true;
+    try {
+        while (timelineTarget !== timelineYear) {
+            const target = timelineTarget;
+            let url = `${API_BASE}/treaties/timeline?to=${target}`;
+            if (timelineYear !== null) {
+                url += `&from=${timelineYear}`;
+            }
+            const res = await fetch(url);
+            const delta = await res.json();
+            if (delta.error) {
+                throw new Error(delta.error);
+            }
+            applyTimelineDelta(delta, timelineYear === null);
+            timelineYear = target;
+        }
+    } catch (err) {
+        console.error('Failed to fetch timeline:', err);
+        // Fall back to full reloads; the next move starts from scratch
+        timelineYear = null;
+        fetchTreaties(timelineTarget);
+        filterBoundariesByYear(timelineTarget);
+    } finally {
+        timelineBusy = false;
+    }
+}
+
+function applyTimelineDelta(delta, initial) {
+    // Supersedes a full load that is still paging
+    treatyLoad++;
+    const { added, removed } = delta.treaties;
+    if (initial) {
+        state.treaties = added;
+    } else if (added.length || removed.length) {
+        // Visible treaties are a date-sorted prefix, so additions go at the end
+        const gone = new Set(removed);
+        state.treaties = state.treaties.filter(t => !gone.has(t.id)).concat(added);
+    }
+    if (initial || added.length || removed.length) {
+        refreshTreatyViews();
+    }
+    applyBoundaryDelta(delta.boundaries, delta.to);
+}
+
 function updateTreatyCount() {
     const countEl = document.getElementById('treaty-count');
     if (countEl) {
@@ -119,7 +193,16 @@ async function search(query) {
     }
 
     try {
-        const res = await fetch(`${API_BASE}/search?q=${encodeURIComponent(query)}`);
+        // Type-ahead comes from the in-memory name index; full-text search
+        // only runs when no name starts with the query
+        const q = encodeURIComponent(query);
+        const suggestRes = await fetch(`${API_BASE}/suggest?q=${q}`);
+        const suggestions = (await suggestRes.json()).suggestions || [];
+        if (suggestions.length > 0) {
+            renderSearchResults(suggestions.map(s => ({ entity_type: s.entity_type, id: s.id, title: s.text })));
+            return;
+        }
+        const res = await fetch(`${API_BASE}/search?q=${q}`);
         const data = await res.json();
         renderSearchResults(data.results || []);
     } catch (err) {
@@ -564,6 +647,7 @@ function renderSearchResults(results) {
             <span class="result-type type-${result.entity_type}">${result.entity_type}</span>
             <div class="result-content">
                 <span class="result-title">${result.title}</span>
+                ${result.snippet ? `<span class="result-snippet">${result.snippet}</span>` : ''}
             </div>
         </div>
     `).join('');
@@ -626,10 +710,8 @@ function handleResultClick(type, id) {
 
 function handleYearChange(year) {
     document.getElementById('current-year').textContent = year;
-    // Filter treaties by year (sidebar list)
-    fetchTreaties(year);
-    // Filter map boundaries by year
-    filterBoundariesByYear(parseInt(year));
+    // Filter treaties (sidebar list) and map boundaries by year
+    syncTimeline(parseInt(year));
 }
 
 function stepYear(delta) {
@@ -680,6 +762,8 @@ function filterByStatus(status) {
 
 let map;
 let boundariesGeoJSON = null;  // Store full boundaries data for filtering
+let boundariesById = null;     // Feature lookup for timeline deltas
+let visibleBoundaries = null;  // id -> feature currently on the map
 
 // Extract year from treaty name (e.g., "Fort Bridger Treaty, 1868" -> 1868)
 function extractYearFromName(name) {
@@ -702,9 +786,30 @@ function filterBoundariesByYear(maxYear) {
         })
     };
 
+    visibleBoundaries = new Map(filtered.features.map(f => [f.id, f]));
     map.getSource('treaty-boundaries').setData(filtered);
 }
 
+// Apply the boundary ids added/removed by a timeline delta
+function applyBoundaryDelta(delta, year) {
+    if (!boundariesGeoJSON || !map.getSource('treaty-boundaries')) return;
+    if (!delta || !visibleBoundaries) {
+        filterBoundariesByYear(year);
+        return;
+    }
+    if (!delta.added.length && !delta.removed.length) return;
+
+    delta.removed.forEach(id => visibleBoundaries.delete(id));
+    delta.added.forEach(id => {
+        const feature = boundariesById.get(id);
+        if (feature) visibleBoundaries.set(id, feature);
+    });
+    map.getSource('treaty-boundaries').setData({
+        type: 'FeatureCollection',
+        features: Array.from(visibleBoundaries.values())
+    });
+}
+
 async function loadTreatyBoundaries() {
     try {
         const res = await fetch(`${API_BASE}/boundaries`);
@@ -717,6 +822,7 @@ async function loadTreatyBoundaries() {
 
         // Store full data for filtering
         boundariesGeoJSON = geojson;
+        boundariesById = new Map(geojson.features.map(f => [f.id, f]));
 
         // Add the GeoJSON source
         map.addSource('treaty-boundaries', {